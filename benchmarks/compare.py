@@ -0,0 +1,157 @@
+"""
+Regression gate for benchmark results.
+
+Usage::
+
+    python -m benchmarks.compare BASELINE.json CURRENT.json [--threshold 0.10]
+                                 [--limit NAME=FRACTION ...]
+
+Prints every metric of ``CURRENT`` against ``BASELINE`` (both written by
+:mod:`benchmarks.suite`) and exits with status 1 when any metric grew by
+more than the threshold, e.g. 0.10 for 10%. ``--limit`` sets the
+threshold of one metric, or of every metric ending in ``/NAME``
+(``--limit cli/cold_start=0.5 --limit peak_memory=0.02``). Differences
+below a small absolute floor (a millisecond, 64 KiB) never count, so
+sub-millisecond metrics do not fail on timer noise.
+
+Results are only comparable when produced on the same machine with the
+same parameters; a mismatch is reported as a warning.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+NOISE_FLOOR = {"s": 0.001, "B": 64 * 1024}
+"""Increases smaller than this, per unit, are not regressions."""
+
+
+@dataclass(frozen=True)
+class Change:
+    name: str
+    unit: str
+    baseline: float | None
+    current: float | None
+    threshold: float
+
+    @property
+    def ratio(self) -> float | None:
+        if not self.baseline or self.current is None:
+            return None
+        return self.current / self.baseline - 1
+
+    @property
+    def regressed(self) -> bool:
+        if self.baseline is None or self.current is None:
+            return False
+        grew = self.current - self.baseline
+        return grew > NOISE_FLOOR.get(self.unit, 0) and grew > self.baseline * self.threshold
+
+
+def _threshold(name: str, default: float, limits: dict[str, float]) -> float:
+    if name in limits:
+        return limits[name]
+    for suffix, limit in limits.items():
+        if name.endswith("/" + suffix):
+            return limit
+    return default
+
+
+def compare(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float = 0.10,
+    limits: dict[str, float] | None = None,
+) -> list[Change]:
+    """One :class:`Change` per metric in either result, in the order of ``current``."""
+    limits = limits or {}
+    old, new = baseline["metrics"], current["metrics"]
+    names = list(new) + [name for name in old if name not in new]
+    changes = []
+    for name in names:
+        metric = new.get(name) or old[name]
+        changes.append(
+            Change(
+                name,
+                metric["unit"],
+                old[name]["value"] if name in old else None,
+                new[name]["value"] if name in new else None,
+                _threshold(name, threshold, limits),
+            )
+        )
+    return changes
+
+
+def _format(value: float | None, unit: str) -> str:
+    if value is None:
+        return "-"
+    return f"{value / 2**20:.2f} MiB" if unit == "B" else f"{value * 1000:.2f} ms"
+
+
+def _delta(change: Change) -> str:
+    if change.baseline is None:
+        return "new"
+    if change.current is None:
+        return "removed"
+    ratio = change.ratio
+    return f"{ratio:+.1%}" if ratio is not None else "-"
+
+
+def _parse_limit(text: str) -> tuple[str, float]:
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=FRACTION, got {text!r}")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}") from None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="fail when a metric grows by more than this fraction (default: 0.10)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=_parse_limit,
+        action="append",
+        default=[],
+        metavar="NAME=FRACTION",
+        help="threshold for one metric, or for all metrics ending in /NAME",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    current = json.loads(args.current.read_text(encoding="utf-8"))
+    for key in ("parameters", "machine"):
+        if baseline.get(key) != current.get(key):
+            print(f"warning: {key} differ, the results may not be comparable", file=sys.stderr)
+
+    changes = compare(baseline, current, args.threshold, dict(args.limit))
+    width = max((len(change.name) for change in changes), default=0)
+    for change in changes:
+        verdict = "REGRESSION" if change.regressed else ""
+        print(
+            f"{change.name:<{width}}  {_format(change.baseline, change.unit):>12}  "
+            f"{_format(change.current, change.unit):>12}  {_delta(change):>7}  {verdict}".rstrip()
+        )
+
+    regressions = [change for change in changes if change.regressed]
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed beyond their threshold.")
+        return 1
+    print(f"\nNo regressions in {len(changes)} metric(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Synthetic pipelines for the benchmarks.
+
+Usage::
+
+    python -m benchmarks.generate OUT_DIR [--files 8] [--jobs 1000] [--steps 10]
+                                          [--shape diamond] [--seed 0]
+
+writes ``OUT_DIR/pipeline_<k>.py`` files that ``pygha build --src-dir
+OUT_DIR`` turns into one workflow each. From Python, :func:`make_pipeline`
+returns the same jobs as a :class:`~pygha.models.Pipeline`.
+
+The job graph has one of these shapes:
+
+``chain``
+    every job depends on the one before it (one long critical path).
+``fanout``
+    one job, then all others in parallel, then one job needing them all.
+``diamond``
+    a lattice about ``sqrt(N)`` jobs wide; each job needs the one or two
+    jobs above it, so diamonds overlap on every level.
+``random``
+    each job needs up to three earlier jobs, chosen with ``--seed``.
+
+Every job checks out the code, runs the same setup commands and then
+shard commands drawn from a small set, as generated pipelines do.
+"""
+
+import argparse
+import math
+import random
+from pathlib import Path
+
+from pygha.models import Job, Pipeline
+from pygha.steps.builtin import CheckoutStep, RunShellStep, intern_step
+
+SHAPES = ("chain", "fanout", "diamond", "random")
+
+SETUP = ["python -m pip install -U pip", "pip install -r requirements.txt", "pip install -e ."]
+
+
+def dependencies(shape: str, n_jobs: int, seed: int = 0) -> list[list[int]]:
+    """For each job, the indices of the earlier jobs it depends on."""
+    if shape == "chain":
+        return [[i - 1] if i else [] for i in range(n_jobs)]
+    if shape == "fanout":
+        last = n_jobs - 1
+        return [[] if i == 0 else list(range(1, last)) if i == last else [0] for i in range(n_jobs)]
+    if shape == "diamond":
+        width = max(1, math.isqrt(n_jobs))
+        deps = []
+        for i in range(n_jobs):
+            row, col = divmod(i, width)
+            above = [(row - 1) * width + c for c in (col, col + 1) if row and c < width]
+            deps.append(above)
+        return deps
+    if shape == "random":
+        rng = random.Random(seed)
+        return [sorted(rng.sample(range(i), min(i, rng.randint(0, 3)))) for i in range(n_jobs)]
+    raise ValueError(f"unknown shape {shape!r}, expected one of {', '.join(SHAPES)}")
+
+
+def commands(n_steps: int) -> list[str]:
+    """The shell commands of one job: the setup, then shards from a small set."""
+    shards = [f"pytest tests/shard_{k % 8} -q" for k in range(max(0, n_steps - len(SETUP) - 1))]
+    return (SETUP + shards)[: max(0, n_steps - 1)]
+
+
+def make_jobs(shape: str, n_jobs: int, n_steps: int, seed: int = 0) -> list[Job]:
+    """The jobs of a synthetic pipeline, in an order :meth:`Pipeline.add_job` accepts."""
+    checkout = intern_step(CheckoutStep())
+    shell = [intern_step(RunShellStep(command=command)) for command in commands(n_steps)]
+    return [
+        Job(
+            name=f"job{i}",
+            steps=[checkout, *shell] if n_steps else [],
+            depends_on=[f"job{d}" for d in deps],
+            runner_image="ubuntu-22.04",
+        )
+        for i, deps in enumerate(dependencies(shape, n_jobs, seed))
+    ]
+
+
+def make_pipeline(shape: str, n_jobs: int, n_steps: int, seed: int = 0) -> Pipeline:
+    pipe = Pipeline(name=f"bench-{shape}")
+    for job in make_jobs(shape, n_jobs, n_steps, seed):
+        pipe.add_job(job)
+    return pipe
+
+
+_FILE = '''\
+"""Generated by benchmarks/generate.py: {shape}, {n_jobs} jobs x {n_steps} steps."""
+
+from pygha import job, pipeline
+from pygha.steps import checkout, shell
+
+COMMANDS = {commands!r}
+DEPENDENCIES = {deps!r}
+
+pipe = pipeline("{name}")
+
+for i, deps in enumerate(DEPENDENCIES):
+
+    def body() -> None:
+        checkout()
+        for command in COMMANDS:
+            shell(command)
+
+    job(name=f"job{{i}}", depends_on=[f"job{{d}}" for d in deps], pipeline=pipe)(body)
+'''
+
+
+def write_pipeline_files(
+    directory: Path, n_files: int, shape: str, n_jobs: int, n_steps: int, seed: int = 0
+) -> list[Path]:
+    """Write ``n_files`` pipeline files with one pipeline of ``n_jobs`` jobs each."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for k in range(n_files):
+        path = directory / f"pipeline_{k}.py"
+        source = _FILE.format(
+            shape=shape,
+            n_jobs=n_jobs,
+            n_steps=n_steps,
+            commands=commands(n_steps),
+            deps=dependencies(shape, n_jobs, seed + k),
+            name=f"bench{k}",
+        )
+        path.write_text(source, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--jobs", type=int, default=1000, help="jobs per pipeline file")
+    parser.add_argument("--steps", type=int, default=10, help="steps per job")
+    parser.add_argument("--shape", choices=SHAPES, default="diamond")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = write_pipeline_files(
+        args.out_dir, args.files, args.shape, args.jobs, args.steps, args.seed
+    )
+    print(f"wrote {len(paths)} pipeline files to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Memory benchmark: build a large generated pipeline and report its footprint.
+
+Usage::
+
+    python -m benchmarks.memory [--jobs 1000] [--steps 50] [--files 4]
+
+Jobs are declared through the public ``@job`` / ``shell`` / ``checkout``
+API the way generated pipelines do it: every job checks out the code,
+runs the same setup commands and then a few job-specific ones.
+
+It then reports the peak of ``pygha build`` on ``--files`` generated
+pipeline files with the build cache off, on and cold, and on and warm.
+Workflows are streamed to disk and cached as files, so none of these
+should grow with the number of files, only with the largest pipeline.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.generate import write_pipeline_files
+from pygha import job, pipeline
+from pygha.registry import isolated_registry
+from pygha.steps import checkout, shell
+
+SETUP = ["python -m pip install -U pip", "pip install -r requirements.txt", "pip install -e ."]
+
+
+def build(n_jobs: int, n_steps: int) -> object:
+    pipe = pipeline("generated")
+    for i in range(n_jobs):
+
+        def body(i: int = i) -> None:
+            checkout()
+            for command in SETUP:
+                shell(command)
+            for k in range(n_steps - len(SETUP) - 1):
+                # a handful of distinct commands, repeated across jobs
+                shell(f"pytest tests/shard_{k % 8} -q", name=f"Shard {k % 8}")
+
+        deps = [f"job{i - 1}"] if i else []
+        job(name=f"job{i}", depends_on=deps, pipeline=pipe, runs_on="ubuntu-22.04")(body)
+    return pipe
+
+
+def build_peaks(n_files: int, n_jobs: int, n_steps: int) -> dict[str, int]:
+    """Peak bytes traced during ``cmd_build``, without cache, then cold and warm."""
+    from pygha.cli import cmd_build
+
+    peaks = {}
+    with tempfile.TemporaryDirectory(prefix="pygha-memory-") as tmp:
+        src, out = Path(tmp) / "src", Path(tmp) / "out"
+        write_pipeline_files(src, n_files, "chain", n_jobs, n_steps)
+        for label, use_cache in (("no cache", False), ("cache, cold", True), ("cache, warm", True)):
+            with isolated_registry(), contextlib.redirect_stdout(io.StringIO()):
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    if cmd_build(str(src), str(out), use_cache=use_cache) != 0:
+                        raise RuntimeError("benchmark build failed")
+                    peaks[label] = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+    return peaks
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=50, help="steps per job")
+    parser.add_argument("--files", type=int, default=4, help="pipeline files for the builds")
+    args = parser.parse_args(argv)
+
+    with isolated_registry():
+        gc.collect()
+        tracemalloc.start()
+        pipe = build(args.jobs, args.steps)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del pipe
+
+    steps = args.jobs * args.steps
+    print(f"{args.jobs} jobs x {args.steps} steps = {steps} steps")
+    print(f"retained: {current / 2**20:8.2f} MiB ({current / steps:6.1f} B/step)")
+    print(f"peak:     {peak / 2**20:8.2f} MiB")
+
+    print(f"\npygha build, {args.files} files:")
+    for label, build_peak in build_peaks(args.files, args.jobs, args.steps).items():
+        print(f"{label + ':':<13} {build_peak / 2**20:8.2f} MiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Performance benchmark suite: times pygha's hot paths on synthetic pipelines.
+
+Usage::
+
+    python -m benchmarks.suite [--output results.json] [--jobs 1000] [--steps 10]
+                               [--files 8] [--repeat 5] [--quick]
+
+For every DAG shape of :mod:`benchmarks.generate` it measures
+
+* ``<shape>/add_job``: adding the jobs to an empty pipeline,
+* ``<shape>/get_job_order``: a cold topological sort,
+* ``<shape>/to_dict`` and ``<shape>/to_yaml``: rendering the workflow,
+* ``<shape>/peak_memory``: the traced peak while building and rendering,
+
+and then ``build/cold`` and ``build/cached`` (``cmd_build`` on ``--files``
+generated pipeline files, without and with the build cache),
+``build/peak_memory``, and ``cli/cold_start`` (``pygha --help`` in a fresh
+interpreter). Times are the best of ``--repeat`` runs, in seconds; memory
+is in bytes. Compare two result files with :mod:`benchmarks.compare`.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from benchmarks.generate import SHAPES, make_jobs, make_pipeline, write_pipeline_files
+from pygha.models import Pipeline
+from pygha.registry import isolated_registry
+from pygha.transpilers.github import GitHubTranspiler
+
+FORMAT = 1
+"""Version of the result file layout."""
+
+
+def best_of(repeat: int, setup: Callable[[], Any], run: Callable[[Any], object]) -> list[float]:
+    """Seconds taken by ``run(setup())`` in each of ``repeat`` runs; setup is not timed."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        started = time.perf_counter()
+        run(arg)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def peak_memory(run: Callable[[], object]) -> int:
+    """Bytes allocated by Python at the peak of ``run()``."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _cold_order(pipe: Pipeline) -> object:
+    pipe.invalidate_job_order()
+    return pipe.get_job_order()
+
+
+def _add_all(args: tuple[Pipeline, list[Any]]) -> None:
+    pipe, jobs = args
+    for job in jobs:
+        pipe.add_job(job)
+
+
+def graph_metrics(shape: str, n_jobs: int, n_steps: int, repeat: int) -> dict[str, list[float]]:
+    pipe = make_pipeline(shape, n_jobs, n_steps)
+    transpiler = GitHubTranspiler(pipe)
+
+    def build_and_render() -> None:
+        GitHubTranspiler(make_pipeline(shape, n_jobs, n_steps)).to_yaml()
+
+    return {
+        f"{shape}/add_job": best_of(
+            repeat,
+            lambda: (Pipeline(name=shape), make_jobs(shape, n_jobs, n_steps)),
+            _add_all,
+        ),
+        f"{shape}/get_job_order": best_of(repeat, lambda: pipe, _cold_order),
+        f"{shape}/to_dict": best_of(repeat, lambda: transpiler, GitHubTranspiler.to_dict),
+        f"{shape}/to_yaml": best_of(repeat, lambda: transpiler, GitHubTranspiler.to_yaml),
+        f"{shape}/peak_memory": [float(peak_memory(build_and_render))],
+    }
+
+
+def build_metrics(n_files: int, n_jobs: int, n_steps: int, repeat: int) -> dict[str, list[float]]:
+    from pygha.cli import cmd_build
+
+    with tempfile.TemporaryDirectory(prefix="pygha-bench-") as tmp:
+        src, out = Path(tmp) / "src", Path(tmp) / "out"
+        write_pipeline_files(src, n_files, "diamond", n_jobs, n_steps)
+
+        def build(use_cache: bool) -> None:
+            with isolated_registry(), contextlib.redirect_stdout(io.StringIO()):
+                if cmd_build(str(src), str(out), use_cache=use_cache) != 0:
+                    raise RuntimeError("benchmark build failed")
+
+        def fresh() -> None:
+            shutil.rmtree(out, ignore_errors=True)
+
+        build(False)  # warm up: imports and the first-run file system caches
+        cold = best_of(repeat, fresh, lambda _: build(False))
+        build(True)  # fill the build cache
+        cached = best_of(repeat, fresh, lambda _: build(True))
+        fresh()
+        memory = peak_memory(lambda: build(False))
+    return {"build/cold": cold, "build/cached": cached, "build/peak_memory": [float(memory)]}
+
+
+def cold_start_metrics(repeat: int) -> dict[str, list[float]]:
+    argv = [sys.executable, "-c", "from pygha.cli import main\nmain(['--help'])"]
+    return {
+        "cli/cold_start": best_of(
+            repeat,
+            lambda: None,
+            lambda _: subprocess.run(argv, stdout=subprocess.DEVNULL, check=True),
+        )
+    }
+
+
+def run_suite(
+    n_jobs: int = 1000,
+    n_steps: int = 10,
+    n_files: int = 8,
+    repeat: int = 5,
+    shapes: tuple[str, ...] = SHAPES,
+) -> dict[str, Any]:
+    """Run every benchmark and return the result document."""
+    # Load what rendering imports lazily, so the first shape does not pay for it
+    GitHubTranspiler(make_pipeline("chain", 2, 2)).to_yaml()
+
+    samples: dict[str, list[float]] = {}
+    for shape in shapes:
+        samples.update(graph_metrics(shape, n_jobs, n_steps, repeat))
+    samples.update(build_metrics(n_files, n_jobs, n_steps, repeat))
+    samples.update(cold_start_metrics(repeat))
+
+    metrics = {}
+    for name, values in samples.items():
+        memory = name.endswith("peak_memory")
+        metrics[name] = {
+            "value": min(values),
+            "median": statistics.median(values),
+            "unit": "B" if memory else "s",
+        }
+    return {
+        "format": FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parameters": {"jobs": n_jobs, "steps": n_steps, "files": n_files, "repeat": repeat},
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": metrics,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", "-o", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--jobs", type=int, default=1000, help="jobs per pipeline")
+    parser.add_argument("--steps", type=int, default=10, help="steps per job")
+    parser.add_argument("--files", type=int, default=8, help="pipeline files for cmd_build")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing (best is kept)")
+    parser.add_argument(
+        "--quick", action="store_true", help="small sizes and one run each, for a smoke test"
+    )
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.jobs, args.files, args.repeat = min(args.jobs, 100), min(args.files, 2), 1
+
+    results = run_suite(args.jobs, args.steps, args.files, args.repeat)
+    width = max(len(name) for name in results["metrics"])
+    for name, metric in results["metrics"].items():
+        value = metric["value"]
+        shown = (
+            f"{value / 2**20:10.2f} MiB" if metric["unit"] == "B" else f"{value * 1000:10.2f} ms"
+        )
+        print(f"{name:<{width}}  {shown}")
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,33 @@
 # pygha/__init__.py
-from .decorators import job
-from pygha.registry import pipeline, default_pipeline
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .decorators import job
+    from pygha.registry import pipeline, default_pipeline
 
 __version__ = "0.1.0"
 __all__ = ["job", "pipeline", "default_pipeline"]
+
+# Public names are resolved on first access so that `import pygha` (done by every
+# pipeline file and by the CLI before it even parses arguments) stays cheap.
+_LAZY_EXPORTS = {
+    "job": "pygha.decorators",
+    "pipeline": "pygha.registry",
+    "default_pipeline": "pygha.registry",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'pygha' has no attribute {name!r}")
+
+    from importlib import import_module
+
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,474 @@
+"""
+asyncio backend for local runs.
+
+:class:`AsyncRunner` schedules jobs exactly like
+:class:`~pygha.runner.LocalRunner`, but drives every command from a
+single event loop, so hundreds of steps can run at once without a
+thread each. Commands are reaped with :func:`os.wait4` once a pidfd
+reports their exit, which gives each step its resource usage (see
+:mod:`pygha.usage`). Without pidfds (macOS, Linux before 5.3) they are
+reaped in threads of their own, one per job that may run at once.
+
+Output is read line by line and handed to one writer through a bounded
+queue, prefixed with ``[job/step]``. When the terminal falls behind, the
+readers wait for room in the queue and stop draining their pipes, which
+in turn pauses the commands (backpressure) instead of buffering without
+limit.
+
+Steps may limit their run time (``RunShellStep.timeout_minutes``, or the
+runner's ``step_timeout`` default); a step that runs over fails its job.
+Steps that provide ``execute_async(context)`` run on the loop; any other
+step runs its ``execute(context)`` in a worker thread, and commands it
+starts through ``context.run_command`` are still run by the loop.
+
+With ``shell_session=True`` the shell steps of each job are run as bash
+scripts in one :class:`~pygha.shell_session.BashSession` per job.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from . import trace
+from .models import Job, Pipeline, Step
+from .runner import (
+    NEW_SESSION,
+    STEP_FAILURES,
+    JobCancelled,
+    JobResult,
+    JobStatus,
+    RunResult,
+    StepResult,
+    _Schedule,
+    _StepTimer,
+    step_label,
+    terminate_group,
+)
+from .shell_session import BashSession
+from .usage import HAVE_WAIT4, ResourceUsage, reap
+
+if TYPE_CHECKING:
+    from subprocess import Popen
+
+    from .resources import Capacity
+    from .step_cache import StepCache
+
+_OUTPUT_LINES = 1024
+"""Lines buffered between the command readers and the writer."""
+
+_LINE_LIMIT = 1 << 20
+"""Longest output line read from a command, in bytes."""
+
+
+class _Output:
+    """The single writer of a run's output."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(_OUTPUT_LINES)
+
+    async def write(self, line: str) -> None:
+        await self._queue.put(line)
+
+    async def close(self) -> None:
+        await self._queue.put(None)
+
+    async def run(self) -> None:
+        stream = sys.stdout
+        while (line := await self._queue.get()) is not None:
+            stream.write(line + "\n")
+            if self._queue.empty():
+                stream.flush()
+        stream.flush()
+
+
+class _Command:
+    """
+    A command read by the event loop and reaped with :func:`os.wait4`,
+    for its resource usage (see :mod:`pygha.usage`).
+
+    asyncio's child watcher would reap it with ``waitpid`` and drop the
+    usage, so the command is started with :class:`subprocess.Popen` and
+    its exit is awaited on a pidfd -- or, without pidfds, in a thread of
+    ``reaper``. That pool is the runner's own: on the loop's default
+    executor, reaps would wait behind ``execute()`` steps, which may
+    themselves be waiting for their command to be reaped.
+    """
+
+    def __init__(
+        self,
+        popen: "Popen[bytes]",
+        stdout: asyncio.StreamReader,
+        transport: asyncio.ReadTransport,
+        reaper: Executor,
+    ):
+        self._popen = popen
+        self.pid = popen.pid
+        self.stdout = stdout
+        self.usage: ResourceUsage | None = None
+        self._transport = transport
+        self._reaper = reaper
+        self._exited: asyncio.Future[None] | None = None
+
+    @classmethod
+    async def start(cls, argv: list[str], reaper: Executor) -> "_Command":
+        loop = asyncio.get_running_loop()
+        popen = _spawn(argv)
+        reader = asyncio.StreamReader(limit=_LINE_LIMIT, loop=loop)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader, loop=loop), popen.stdout
+        )
+        return cls(popen, reader, transport, reaper)
+
+    @property
+    def returncode(self) -> int | None:
+        return self._popen.returncode
+
+    def terminate(self) -> None:
+        self._popen.terminate()
+
+    async def wait(self) -> int:
+        # Shielded: a cancelled wait must not leave the command unreaped
+        if self._exited is None:
+            self._exited = asyncio.ensure_future(self._reap())
+        await asyncio.shield(self._exited)
+        return self._popen.returncode
+
+    async def _reap(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):  # not on Linux 5.3+
+            result = await loop.run_in_executor(self._reaper, reap, self.pid)
+        else:
+            exited = loop.create_future()
+
+            def readable() -> None:
+                if not exited.done():
+                    exited.set_result(None)
+
+            loop.add_reader(pidfd, readable)
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+            result = reap(self.pid)
+        assert result is not None  # nosec B101: a blocking reap always has a result
+        self._popen.returncode, self.usage = result
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _spawn(argv: list[str]) -> "Popen[bytes]":
+    """Start ``argv`` for :class:`_Command`, on the loop thread like ``create_subprocess_exec``."""
+    import subprocess  # nosec B404: argv-only, never a shell
+
+    return subprocess.Popen(  # nosec B603
+        argv,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        start_new_session=NEW_SESSION,
+    )
+
+
+class StepTimeout(TimeoutError):
+    """A step ran longer than its timeout."""
+
+
+class AsyncJobContext:
+    """
+    The ``context`` passed to steps by :class:`AsyncRunner`.
+
+    Coroutine steps use :meth:`run_command_async` and :meth:`log_async`;
+    :meth:`run_command` and :meth:`log` are their blocking counterparts for
+    ``execute()`` running in a worker thread.
+    """
+
+    __slots__ = (
+        "_loop",
+        "_output",
+        "_procs",
+        "_reaper",
+        "cancelled",
+        "job",
+        "label",
+        "session",
+        "usage",
+    )
+
+    def __init__(
+        self,
+        job: Job,
+        cancelled: threading.Event,
+        output: _Output,
+        reaper: Executor,
+        shell_session: bool = False,
+    ):
+        self.job = job
+        self.cancelled = cancelled
+        self.label = job.name
+        """Output prefix: the job name, then ``job/step`` while a step runs."""
+        self.session = BashSession(self.log_async) if shell_session else None
+        """The job's bash session, when shell steps run as scripts in one."""
+        self.usage: ResourceUsage | None = None
+        """What the commands of the current step have used so far."""
+        self._output = output
+        self._reaper = reaper
+        self._loop = asyncio.get_running_loop()
+        self._procs: set[asyncio.subprocess.Process | _Command] = set()
+
+    def check(self) -> None:
+        """Raise :class:`~pygha.runner.JobCancelled` if the job has been cancelled."""
+        if self.cancelled.is_set():
+            raise JobCancelled(self.job.name)
+
+    async def log_async(self, message: str) -> None:
+        await self._output.write(f"[{self.label}] {message}")
+
+    def log(self, message: str) -> None:
+        asyncio.run_coroutine_threadsafe(self.log_async(message), self._loop).result()
+
+    async def run_command_async(self, argv: list[str]) -> int:
+        """Run ``argv`` to completion, streaming its output; return the exit code."""
+        self.check()
+        proc: asyncio.subprocess.Process | _Command
+        if HAVE_WAIT4:
+            proc = await _Command.start(argv, self._reaper)
+        else:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=_LINE_LIMIT,
+                start_new_session=NEW_SESSION,
+            )
+        self._procs.add(proc)
+        try:
+            assert proc.stdout is not None  # nosec B101: set by stdout=PIPE
+            async for raw in proc.stdout:
+                await self.log_async(raw.decode("utf-8", "replace").rstrip("\r\n"))
+            returncode = await proc.wait()
+        except BaseException:
+            # Timed out or cancelled: don't leave the command running
+            terminate_group(proc)
+            await proc.wait()
+            raise
+        finally:
+            self._procs.discard(proc)
+            if isinstance(proc, _Command):
+                proc.close()
+
+        if isinstance(proc, _Command) and proc.usage is not None:
+            self.usage = proc.usage if self.usage is None else self.usage + proc.usage
+        if returncode != 0 and self.cancelled.is_set():
+            raise JobCancelled(self.job.name)
+        return returncode
+
+    def run_command(self, argv: list[str]) -> int:
+        future = asyncio.run_coroutine_threadsafe(self.run_command_async(argv), self._loop)
+        return future.result()
+
+    async def run_script_async(self, script: str) -> int:
+        """Run a bash script in the job's session; return its exit status."""
+        if self.session is None:
+            raise RuntimeError("this job has no shell session")
+        self.check()
+        returncode = await self.session.run(script)
+        if returncode != 0 and self.cancelled.is_set():
+            raise JobCancelled(self.job.name)
+        return returncode
+
+    def kill(self) -> None:
+        """Terminate the commands this job is running."""
+        for proc in list(self._procs):
+            terminate_group(proc)
+        if self.session is not None:
+            self.session.kill()
+
+
+def _timeout(step: Step, default: float | None) -> float | None:
+    minutes = getattr(step, "timeout_minutes", None)
+    return minutes * 60 if minutes is not None else default
+
+
+class AsyncRunner:
+    """
+    Runs a pipeline's jobs locally from a single asyncio event loop.
+
+    Args:
+        pipeline: The pipeline to run. It is validated first; an invalid
+            job graph raises :class:`~pygha.graph.InvalidPipelineError`.
+        jobs: How many jobs may run at the same time.
+        step_timeout: Seconds a step may run when it sets no timeout of
+            its own; None for no limit.
+        shell_session: Run each job's shell steps in one persistent bash
+            session instead of a process per step.
+        cache: Skip steps whose result is in this step cache, and store
+            the results of the others.
+        capacity: Only start jobs whose ``cpus`` and ``memory`` fit in what
+            the running jobs leave of this; None to only limit by ``jobs``.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        jobs: int = 1,
+        step_timeout: float | None = None,
+        shell_session: bool = False,
+        cache: "StepCache | None" = None,
+        capacity: "Capacity | None" = None,
+    ):
+        if jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {jobs}")
+        self.pipeline = pipeline
+        self.jobs = jobs
+        self.step_timeout = step_timeout
+        self.shell_session = shell_session
+        self.cache = cache
+        self.capacity = capacity
+
+    def run(self) -> RunResult:
+        """Run every job and return their results; stops at the first failure."""
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> RunResult:
+        """Like :meth:`run`, from inside a running event loop."""
+        started = time.perf_counter()
+        schedule = _Schedule(self.pipeline, self.capacity)
+        cancelled = threading.Event()
+        output = _Output()
+        writer = asyncio.create_task(output.run())
+        # Only starts threads where commands cannot be awaited on a pidfd
+        reaper = ThreadPoolExecutor(self.jobs, thread_name_prefix="pygha-reap")
+        contexts: dict[str, AsyncJobContext] = {}
+        running: dict[asyncio.Task[JobResult], str] = {}
+        results: dict[str, JobResult] = {}
+
+        def cancel_running() -> None:
+            cancelled.set()
+            for task, name in running.items():
+                contexts[name].kill()
+                task.cancel()
+
+        def launch() -> None:
+            while len(running) < self.jobs and not cancelled.is_set():
+                job = schedule.pop_ready()
+                if job is None:
+                    break
+                contexts[job.name] = AsyncJobContext(
+                    job, cancelled, output, reaper, self.shell_session
+                )
+                task = asyncio.create_task(
+                    self._run_job(contexts[job.name], schedule.lane[job.name])
+                )
+                running[task] = job.name
+
+        try:
+            launch()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: schedule.position[running[t]]):
+                    name = running.pop(task)
+                    # A task cancelled before it got to run has no result of its own
+                    result = results[name] = (
+                        JobResult(name, "cancelled") if task.cancelled() else task.result()
+                    )
+                    schedule.finished(name)
+                    if result.status == "success":
+                        schedule.succeeded(name)
+                    elif not cancelled.is_set():
+                        cancel_running()
+                launch()
+                if not cancelled.is_set() and (line := schedule.progress(self.jobs)):
+                    await output.write(f"[pygha] {line}")
+        except BaseException:
+            # Ctrl-C (the loop cancels this task): stop the jobs and wait for them
+            cancel_running()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+        finally:
+            await output.close()
+            await writer
+            reaper.shutdown(wait=False)
+
+        return schedule.result(results, time.perf_counter() - started)
+
+    async def _run_job(self, context: AsyncJobContext, lane: int) -> JobResult:
+        job = context.job
+        cache = self.cache
+        with trace.span(job.name, "job", lane=lane):
+            started = time.perf_counter()
+            await context.log_async("started")
+            status: JobStatus = "success"
+            error = None
+            steps: list[StepResult] = []
+            try:
+                for index, step in enumerate(job.steps, start=1):
+                    context.check()
+                    label = step_label(step, index)
+                    with (
+                        _StepTimer(steps, label, context) as timer,
+                        trace.span(f"{job.name}/{label}", "step", lane=lane),
+                    ):
+                        context.label = f"{job.name}/{timer.label}"
+                        # Hashing inputs and copying outputs is blocking file I/O
+                        key = (
+                            await asyncio.to_thread(cache.key, step) if cache is not None else None
+                        )
+                        if (
+                            key is not None
+                            and cache is not None
+                            and await asyncio.to_thread(cache.restore, key)
+                        ):
+                            timer.cached = True
+                            await context.log_async("restored from cache")
+                            continue
+                        await self._run_step(step, context)
+                        if (
+                            key is not None
+                            and cache is not None
+                            and not await asyncio.to_thread(cache.store, key, step)
+                        ):
+                            await context.log_async("not cached, an output is missing")
+            except (JobCancelled, asyncio.CancelledError):
+                status = "cancelled"
+            except STEP_FAILURES as exc:
+                status = "failed"
+                error = str(exc) or type(exc).__name__
+            except Exception as exc:
+                await context.log_async(
+                    f"\033[91mstep raised {type(exc).__name__}, stopping the run\033[0m"
+                )
+                raise
+            finally:
+                if context.session is not None:
+                    await asyncio.shield(context.session.close())
+            duration = time.perf_counter() - started
+
+            context.label = job.name
+            if status == "failed":
+                await context.log_async(f"\033[91mfailed after {duration:.1f}s: {error}\033[0m")
+            else:
+                await context.log_async(f"{status} after {duration:.1f}s")
+        return JobResult(job.name, status, duration, error, steps)
+
+    async def _run_step(self, step: Step, context: AsyncJobContext) -> None:
+        timeout = _timeout(step, self.step_timeout)
+        execute_async = getattr(step, "execute_async", None)
+        try:
+            async with asyncio.timeout(timeout):
+                if execute_async is not None:
+                    await execute_async(context)
+                else:
+                    await asyncio.to_thread(step.execute, context)
+        except TimeoutError:
+            # A step running in a thread keeps going; stop what it started
+            context.kill()
+            raise StepTimeout(f"step {context.label} timed out after {timeout:g}s") from None
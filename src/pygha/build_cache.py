@@ -0,0 +1,249 @@
+"""
+Content-hash cache for ``pygha build``.
+
+Each pipeline file gets one cache entry holding the pipelines it
+registered and the digests of the YAML rendered from them; the YAML
+itself is copied into the cache directory, one file per digest, so
+neither a build nor an entry ever holds a whole workflow in memory. An
+entry is only reused
+when its key still matches, and the key covers the file itself, every
+local module it imports (found statically, transitively) and the pygha
+version that produced it.
+"""
+
+import ast
+import hashlib
+import os
+import pickle  # nosec B403: entries are written and read back by pygha only
+import shutil
+import sys
+import tempfile
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import __version__
+from .models import Pipeline
+
+CACHE_DIR_NAME = ".pygha-cache"
+"""Directory (inside ``--src-dir``) where cache entries are stored."""
+
+_CACHE_FORMAT = 6
+"""Bump when the on-disk entry layout changes."""
+
+
+@dataclass
+class CacheEntry:
+    """The cached build output of a single pipeline file."""
+
+    source: Path
+    """The pipeline file this entry belongs to."""
+
+    key: str
+    """Content hash of the file, its local imports and the pygha version."""
+
+    pipelines: dict[str, Pipeline]
+    """Pipelines registered by the file, keyed by name."""
+
+    yaml: dict[str, str] = field(default_factory=dict)
+    """
+    Digests of the rendered workflows (see :meth:`BuildCache.yaml_path`)
+    for pipelines that only this file contributes to.
+    """
+
+
+def _resolve_module(name: str, roots: Sequence[Path]) -> list[Path]:
+    """Find the source files for a dotted module name under ``roots``."""
+    parts = name.split(".")
+    for root in roots:
+        base = root.joinpath(*parts)
+        for candidate in (base.parent / f"{parts[-1]}.py", base / "__init__.py"):
+            if candidate.is_file():
+                inits = [root.joinpath(*parts[:i], "__init__.py") for i in range(1, len(parts))]
+                return [candidate.resolve(), *(p.resolve() for p in inits if p.is_file())]
+    return []
+
+
+def local_imports(source: Path, roots: Sequence[Path]) -> list[Path]:
+    """
+    Return every local module imported by ``source``, transitively.
+
+    Imports are discovered by parsing the code, not by executing it, so
+    the result does not depend on what earlier pipeline files already
+    imported. Modules that cannot be found under ``roots`` (the standard
+    library, installed packages) are not local and are ignored.
+    """
+    source = source.resolve()
+    seen: set[Path] = set()
+    stack = [source]
+
+    while stack:
+        path = stack.pop()
+        try:
+            tree = ast.parse(path.read_bytes(), filename=str(path))
+        except (OSError, SyntaxError, ValueError):
+            continue
+
+        for node in ast.walk(tree):
+            search: Sequence[Path] = roots
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                prefix = f"{node.module}." if node.module else ""
+                names = [f"{prefix}{alias.name}" for alias in node.names]
+                if node.module:
+                    names.append(node.module)
+                if node.level:
+                    anchor = path.parent
+                    for _ in range(node.level - 1):
+                        anchor = anchor.parent
+                    search = [anchor]
+            else:
+                continue
+
+            for name in names:
+                for dep in _resolve_module(name, search):
+                    if dep != source and dep not in seen:
+                        seen.add(dep)
+                        stack.append(dep)
+
+    return sorted(seen)
+
+
+class BuildCache:
+    """
+    Persistent per-file build cache.
+
+    ``hits`` and ``misses`` count lookups made through :meth:`load`.
+    A disabled cache never reads or writes anything and counts nothing.
+    """
+
+    def __init__(
+        self, directory: Path, roots: Sequence[Path], enabled: bool = True, variant: str = ""
+    ):
+        self.directory = directory
+        self.roots = list(roots)
+        self.enabled = enabled
+        self.variant = variant
+        self.hits = 0
+        self.misses = 0
+        self._keys: dict[Path, str] = {}
+
+    def _entry_path(self, source: Path) -> Path:
+        digest = hashlib.sha256(str(source.resolve()).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest[:32]}.pickle"
+
+    def key(self, source: Path) -> str:
+        """Compute (and memoize) the content key for ``source``."""
+        if source not in self._keys:
+            h = hashlib.sha256()
+            header = (
+                f"{_CACHE_FORMAT}:{__version__}:{sys.version_info[0]}.{sys.version_info[1]}"
+                f":{self.variant}"
+            )
+            h.update(header.encode("utf-8"))
+            h.update(source.read_bytes())
+            for dep in local_imports(source, self.roots):
+                h.update(b"\0" + str(dep).encode("utf-8") + b"\0")
+                h.update(dep.read_bytes())
+            self._keys[source] = h.hexdigest()
+        return self._keys[source]
+
+    def load(self, source: Path) -> CacheEntry | None:
+        """Return the cached entry for ``source`` if it is still valid."""
+        if not self.enabled:
+            return None
+
+        try:
+            with self._entry_path(source).open("rb") as f:
+                data = pickle.load(f)  # nosec B301: local cache written by store()
+            if data["key"] == self.key(source):
+                self.hits += 1
+                return CacheEntry(source, data["key"], data["pipelines"], data["yaml"])
+        except (
+            OSError,
+            pickle.UnpicklingError,
+            EOFError,
+            KeyError,
+            TypeError,
+            AttributeError,
+            ImportError,
+        ):
+            # missing, truncated or from an incompatible version -> rebuild
+            pass
+
+        self.misses += 1
+        return None
+
+    def entry(self, source: Path, pipelines: dict[str, Pipeline]) -> CacheEntry:
+        """Create a fresh entry for ``source`` (not yet stored)."""
+        key = self.key(source) if self.enabled else ""
+        return CacheEntry(source, key, pipelines)
+
+    def yaml_path(self, digest: str) -> Path:
+        """Where the rendered workflow with this digest is kept."""
+        return self.directory / "yaml" / digest
+
+    def add_yaml(self, path: Path) -> str | None:
+        """
+        Copy a rendered workflow into the cache, chunk by chunk; return its
+        digest, or None if it could not be copied.
+        """
+        if not self.enabled:
+            return None
+        try:
+            h = hashlib.sha256()
+            with path.open("rb") as f:
+                while chunk := f.read(1 << 16):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            target = self.yaml_path(digest)
+            if not target.is_file():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+                os.close(fd)
+                try:
+                    shutil.copyfile(path, tmp)
+                    os.replace(tmp, target)
+                finally:
+                    Path(tmp).unlink(missing_ok=True)
+        except OSError:
+            return None
+        return digest
+
+    def collect_yaml(self, keep: set[str]) -> None:
+        """Delete the cached workflows whose digest is not in ``keep``."""
+        directory = self.directory / "yaml"
+        if not self.enabled or not directory.is_dir():
+            return
+        for path in directory.iterdir():
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+
+    def store(self, entry: CacheEntry) -> None:
+        """Write ``entry`` atomically; silently skip anything that cannot be pickled."""
+        if not self.enabled:
+            return
+
+        data = {"key": entry.key, "pipelines": entry.pipelines, "yaml": entry.yaml}
+        try:
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            ignore = self.directory / ".gitignore"
+            if not ignore.exists():
+                ignore.write_text("# Created by pygha build\n*\n", encoding="utf-8")
+
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self._entry_path(entry.source))
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
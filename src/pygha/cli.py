@@ -2,17 +2,31 @@ import os
 import re
 import stat
 import runpy
+import sys
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from re import Pattern
+from typing import TYPE_CHECKING
 
 from pygha.transpilers.github import GitHubTranspiler
-from pygha import registry
+from pygha import registry, trace
 from pygha.models import Pipeline
+from pygha.trigger_event import PipelineSettings
+
+if TYPE_CHECKING:
+    import argparse
+
+    from pygha.build_cache import CacheEntry
 
 # Match variations like:
 # "# pygha: keep", "#pygha: keep", "#pygha : keep", any spacing/case
 KEEP_REGEX: Pattern[str] = re.compile(r"^#\s*pygha\s*:\s*keep$", re.IGNORECASE)
 
+# Lists the workflow files pygha generated in an output directory, so that
+# --clean only ever touches files it owns.
+MANIFEST_NAME = ".pygha-manifest.json"
+_MANIFEST_FORMAT = 1
+
 
 def _get_pipelines_dict() -> dict[str, Pipeline]:
     if hasattr(registry, "_pipelines") and isinstance(registry._pipelines, dict):
@@ -21,6 +35,177 @@ def _get_pipelines_dict() -> dict[str, Pipeline]:
     raise RuntimeError("No _pipelines found in pygha.registry")
 
 
+def _forget_local_modules(roots: list[Path], loaded: set[str] | None = None) -> None:
+    """
+    Drop the modules loaded from files under ``roots`` from ``sys.modules``,
+    only those imported since ``loaded`` was taken if it is given. pygha's
+    own modules are kept, even when the project is pygha's own checkout.
+    """
+    resolved = [root.resolve() for root in roots]
+    for name in set(sys.modules) - (loaded or set()):
+        if name == "pygha" or name.startswith("pygha."):
+            continue
+        filename = getattr(sys.modules[name], "__file__", None)
+        if not filename:
+            continue
+        path = Path(filename).resolve()
+        # A virtualenv inside the project holds installed packages, not helpers
+        if "site-packages" in path.parts or "dist-packages" in path.parts:
+            continue
+        if any(path.is_relative_to(root) for root in resolved):
+            del sys.modules[name]
+
+
+def _run_pipeline_file(path: Path) -> dict[str, Pipeline]:
+    """
+    Execute one pipeline file against an empty registry and return what it registered.
+
+    Local modules the file imported are forgotten afterwards, so the next
+    file imports them afresh: their ``pipeline(...)`` calls then register
+    into that file's registry as well, and a pipeline object shared
+    through a helper never carries one file's jobs into another's.
+    """
+    loaded = set(sys.modules)
+    try:
+        with registry.isolated_registry(), trace.span("run_path", "build", file=str(path)):
+            runpy.run_path(str(path))
+            return dict(_get_pipelines_dict())
+    finally:
+        _forget_local_modules([path.parent, Path.cwd()], loaded)
+
+
+def _is_blank(pipe: Pipeline) -> bool:
+    """True for a pipeline with no jobs and default settings (e.g. the implicit 'ci')."""
+    return not pipe.jobs and pipe.pipeline_settings == PipelineSettings()
+
+
+def _evaluate_files(files: list[Path], jobs: int = 1) -> list[dict[str, Pipeline]]:
+    """
+    Run pipeline files and return their registries, in file order.
+
+    With ``jobs > 1`` the files are spread over a pool of worker processes,
+    each evaluating them against its own registry; the resulting models are
+    pickled back to this process.
+    """
+    if jobs <= 1 or len(files) <= 1:
+        return [_run_pipeline_file(f) for f in files]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Spans recorded in the worker processes are not collected: this one
+    # covers the whole pool
+    workers = min(jobs, len(files))
+    with (
+        trace.span("evaluate in workers", "build", files=len(files), workers=workers),
+        ProcessPoolExecutor(max_workers=workers) as pool,
+    ):
+        return list(pool.map(_run_pipeline_file, files))
+
+
+def _merge_pipelines(name: str, owners: list[tuple[Path | None, Pipeline]]) -> Pipeline:
+    """Combine the pieces of a pipeline that several files contributed to."""
+    if len(owners) == 1:
+        return owners[0][1]
+
+    merged = Pipeline(name=name)
+    origin: dict[str, Path | None] = {}
+    for source, part in owners:
+        for job in part.jobs.values():
+            if job.name in origin:
+                first = origin[job.name] or "the registry"
+                raise ValueError(
+                    f"Pipeline '{name}' defines job '{job.name}' more than once "
+                    f"(in {first} and {source or 'the registry'})"
+                )
+            merged.add_job(job)
+            origin[job.name] = source
+        # Same rule as a shared registry: the last file to configure settings wins
+        if part.pipeline_settings != PipelineSettings():
+            merged.pipeline_settings = part.pipeline_settings
+    return merged
+
+
+def _find_pipeline_files(src_dir: Path) -> list[Path]:
+    return sorted(set(src_dir.glob("pipeline_*.py")) | set(src_dir.glob("*_pipeline.py")))
+
+
+def _group_parts(
+    parts: dict[str, list[tuple[Path | None, Pipeline]]],
+) -> dict[str, list[tuple[Path | None, Pipeline]]]:
+    """Drop the implicit blank registry pipeline wherever a file contributed to it."""
+    for owners in parts.values():
+        if len(owners) > 1 and owners[0][0] is None and _is_blank(owners[0][1]):
+            del owners[0]
+    return parts
+
+
+def load_pipelines(src_dir: str | Path = ".pipe", jobs: int = 1) -> dict[str, Pipeline]:
+    """
+    Evaluate every pipeline file in ``src_dir`` and return the merged pipelines.
+
+    This is what ``pygha build`` transpiles, minus the build cache; the
+    commands that work on the models themselves (``affected``, ``run``)
+    use it.
+    """
+    with trace.span("discover", "build"):
+        files = _find_pipeline_files(Path(src_dir))
+    parts: dict[str, list[tuple[Path | None, Pipeline]]] = {
+        name: [(None, pipe)] for name, pipe in _get_pipelines_dict().items()
+    }
+    for f, registered in zip(files, _evaluate_files(files, jobs), strict=True):
+        for name, pipe in registered.items():
+            parts.setdefault(name, []).append((f, pipe))
+    with trace.span("merge", "build"):
+        return {
+            name: _merge_pipelines(name, owners) for name, owners in _group_parts(parts).items()
+        }
+
+
+def _same_bytes(a: Path, b: Path, chunk_size: int = 1 << 16) -> bool:
+    """Compare two files chunk by chunk without loading either one whole."""
+    try:
+        if a.stat().st_size != b.stat().st_size:
+            return False
+        with a.open("rb") as fa, b.open("rb") as fb:
+            while True:
+                block = fa.read(chunk_size)
+                if block != fb.read(chunk_size):
+                    return False
+                if not block:
+                    return True
+    except OSError:
+        return False
+
+
+def _read_chunks(path: Path, chunk_size: int = 1 << 16) -> Iterator[str]:
+    """Yield the text of ``path`` a chunk at a time."""
+    with path.open("r", encoding="utf-8") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def _write_if_changed(path: Path, chunks: Iterable[str]) -> bool:
+    """
+    Stream ``chunks`` into ``path`` unless it already holds exactly that text.
+
+    The text goes to a temporary file next to ``path``, which then either
+    replaces it or is discarded. Returns True if ``path`` was written.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if _same_bytes(tmp, path):
+            tmp.unlink()
+            return False
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return True
+
+
 def _has_keep_marker(path: Path, max_lines: int = 10) -> bool:
     """Return True if the file contains a keep marker in the first few lines."""
     try:
@@ -54,47 +239,422 @@ def _safe_unlink(path: Path) -> bool:
         return False
 
 
-def _clean_orphaned(out_dir: Path, valid_names: set[str]) -> None:
-    """Remove .yml files not in valid_names unless they have the keep marker."""
-    for f in out_dir.glob("*.yml"):
-        if f.stem in valid_names:
+def _read_manifest(out_dir: Path) -> set[str] | None:
+    """Return the file names pygha generated in ``out_dir``, or None without a manifest."""
+    import json
+
+    path = out_dir / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        files = data["files"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, KeyError):
+        print(f"\033[93m[pygha] Warning: ignoring unreadable manifest {path}\033[0m")
+        return None
+    if not isinstance(files, list):
+        return None
+    # Only bare file names: a manifest must never point outside out_dir
+    return {f for f in files if isinstance(f, str) and f == Path(f).name and f.endswith(".yml")}
+
+
+def _write_manifest(out_dir: Path, names: set[str]) -> None:
+    import json
+
+    data = {"format": _MANIFEST_FORMAT, "generator": "pygha", "files": sorted(names)}
+    _write_if_changed(out_dir / MANIFEST_NAME, [json.dumps(data, indent=2) + "\n"])
+
+
+def _clean_orphaned(
+    out_dir: Path, valid_names: set[str], owned: set[str] | None = None
+) -> tuple[int, set[str]]:
+    """
+    Remove generated .yml files not in valid_names unless they have the keep marker.
+
+    ``owned`` is the set of file names from the build manifest; only those
+    are considered. Without a manifest (output written by an older pygha)
+    every .yml file in ``out_dir`` is a candidate.
+
+    Returns the number of files removed and the names that could not be.
+    """
+    if owned is None:
+        candidates = sorted(out_dir.glob("*.yml"))
+    else:
+        candidates = [out_dir / name for name in sorted(owned)]
+
+    removed = 0
+    failed: set[str] = set()
+    for f in candidates:
+        if f.stem in valid_names or not f.exists():
             continue
         if _has_keep_marker(f):
             print(f"[pygha] Keeping {f} (keep marker found)")
             continue
         if _safe_unlink(f):
             print(f"\033[91m[pygha] Removed {f} (not in registry)\033[0m")
+            removed += 1
         else:
             print(f"\033[93m[pygha] Warning: could not remove {f} (permissions?)\033[0m")
+            failed.add(f.name)
+    return removed, failed
 
 
 def cmd_build(
-    src_dir: str = ".pipe", out_dir: str = ".github/workflows", clean: bool = False
+    src_dir: str = ".pipe",
+    out_dir: str = ".github/workflows",
+    clean: bool = False,
+    use_cache: bool = True,
+    jobs: int = 1,
+    reduce_needs: bool = False,
+    targets: list[str] | None = None,
 ) -> int:
     SRC_DIR = Path(src_dir)
     OUT_DIR = Path(out_dir)
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    files = sorted(set(SRC_DIR.glob("pipeline_*.py")) | set(SRC_DIR.glob("*_pipeline.py")))
+    with trace.span("discover", "build"):
+        files = _find_pipeline_files(SRC_DIR)
     print(f"[pygha] Found {len(files)} pipeline files:")
+
+    from pygha.build_cache import CACHE_DIR_NAME, BuildCache
+
+    # Options that change the rendered YAML must be part of the cache key
+    cache = BuildCache(
+        SRC_DIR / CACHE_DIR_NAME,
+        roots=[SRC_DIR, Path.cwd()],
+        enabled=use_cache,
+        variant="reduce-needs" if reduce_needs else "",
+    )
+    entries: dict[Path, CacheEntry] = {}
+    dirty: set[Path] = set()
+
+    # Pipelines registered before the build (e.g. the implicit 'ci') come first,
+    # followed by each file's contributions in file order.
+    parts: dict[str, list[tuple[Path | None, Pipeline]]] = {
+        name: [(None, pipe)] for name, pipe in _get_pipelines_dict().items()
+    }
+    pending: list[Path] = []
     for f in files:
-        print(f"[pygha] Running {f}...")
-        runpy.run_path(str(f))
+        with trace.span("cache load", "build", file=str(f)):
+            entry = cache.load(f)
+        if entry is not None:
+            print(f"[pygha] Cached {f}")
+            entries[f] = entry
+        else:
+            print(f"[pygha] Running {f}...")
+            pending.append(f)
+
+    for f, registered in zip(pending, _evaluate_files(pending, jobs), strict=True):
+        entries[f] = cache.entry(f, registered)
+        dirty.add(f)
+
+    for f in files:
+        for name, pipe in entries[f].pipelines.items():
+            parts.setdefault(name, []).append((f, pipe))
+
+    _group_parts(parts)
 
-    pipelines: dict[str, Pipeline] = _get_pipelines_dict()
-    if not pipelines:
+    if not parts:
         print("[pygha] No pipelines registered.")
         return 0
 
-    for name, pipe in pipelines.items():
+    if targets:
+        known = {job for owners in parts.values() for _, pipe in owners for job in pipe.jobs}
+        unknown = [t for t in targets if t not in known]
+        if unknown:
+            print(f"\033[91m[pygha] Unknown target job(s): {', '.join(unknown)}\033[0m")
+            return 1
+
+    written = unchanged = 0
+    for name, owners in parts.items():
         out_path = OUT_DIR / f"{name}.yml"
-        out_path.write_text(GitHubTranspiler(pipe).to_yaml(), encoding="utf-8")
-        print(f"[pygha] Wrote {out_path}")
+        # YAML is only reusable when a single (cached) file owns the whole pipeline
+        sole = owners[0][0] if len(owners) == 1 and not targets else None
+        digest = entries[sole].yaml.get(name) if sole is not None else None
+        cached = cache.yaml_path(digest) if digest is not None else None
+        if cached is not None and cached.is_file():
+            with trace.span("write", "build", file=str(out_path), cached=True):
+                changed = _write_if_changed(out_path, _read_chunks(cached))
+        else:
+            with trace.span("merge", "build", pipeline=name):
+                pipe = _merge_pipelines(name, owners)
+            if targets:
+                wanted = [t for t in targets if t in pipe.jobs]
+                if not wanted:
+                    print(f"[pygha] Skipped {out_path} (no target jobs)")
+                    continue
+                pipe = pipe.subgraph(wanted)
+            # Rendered job by job straight into the file, which the cache then
+            # copies: the full text is never held in memory
+            transpiler = GitHubTranspiler(pipe, reduce_needs=reduce_needs)
+            with trace.span("write", "build", file=str(out_path)):
+                changed = _write_if_changed(out_path, transpiler.to_yaml_stream())
+            if sole is not None and cache.enabled:
+                digest = cache.add_yaml(out_path)
+                if digest is not None:
+                    entries[sole].yaml[name] = digest
+                    dirty.add(sole)
+
+        if changed:
+            print(f"[pygha] Wrote {out_path}")
+            written += 1
+        else:
+            print(f"[pygha] Unchanged {out_path}")
+            unchanged += 1
+
+    with trace.span("cache store", "build", files=len(dirty)):
+        for f in sorted(dirty):
+            cache.store(entries[f])
+        cache.collect_yaml({d for entry in entries.values() for d in entry.yaml.values()})
+
+    with trace.span("manifest", "build", clean=clean):
+        owned = _read_manifest(OUT_DIR)
+        generated = {f"{name}.yml" for name in parts if (OUT_DIR / f"{name}.yml").exists()}
+        removed = 0
+        if clean:
+            removed, failed = _clean_orphaned(OUT_DIR, set(parts.keys()), owned)
+            # Files kept by a marker are the user's now; failed removals are retried next time
+            generated |= failed
+        elif owned:
+            # Not cleaned this time, but still ours to clean later
+            generated |= {n for n in owned if (OUT_DIR / n).exists()}
+        _write_manifest(OUT_DIR, generated)
+
+    if use_cache:
+        print(f"[pygha] Cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    print(
+        f"\n✨ Done. {written + unchanged} workflows: "
+        f"{written} written, {unchanged} unchanged, {removed} removed."
+    )
+    return 0
+
+
+def cmd_affected(
+    src_dir: str = ".pipe",
+    pipeline: str | None = None,
+    base: str | None = None,
+    changed: Iterable[str] | None = None,
+) -> int:
+    """
+    Print the jobs affected by a set of changed files, one name per line.
+
+    The changed files come from ``git diff --name-only <base>`` when ``base``
+    is given, otherwise from ``changed`` (one path per line on stdin for the
+    CLI). The output can be fed straight back into ``pygha build --target``.
+    """
+    from pygha.paths import affected_jobs, changed_files_from_git
+
+    if base is not None:
+        try:
+            files = changed_files_from_git(base)
+        except RuntimeError as exc:
+            print(f"\033[91m[pygha] {exc}\033[0m")
+            return 1
+    else:
+        files = [line.strip() for line in changed or () if line.strip()]
+
+    pipelines = load_pipelines(src_dir)
+    if pipeline is not None:
+        if pipeline not in pipelines:
+            print(f"\033[91m[pygha] Unknown pipeline: {pipeline}\033[0m")
+            return 1
+        pipelines = {pipeline: pipelines[pipeline]}
+
+    seen: set[str] = set()
+    for pipe in pipelines.values():
+        for job in affected_jobs(pipe, files):
+            if job.name not in seen:
+                seen.add(job.name)
+                print(job.name)
+    return 0
+
+
+def cmd_run(
+    src_dir: str = ".pipe",
+    pipeline: str = "ci",
+    jobs: int = 1,
+    targets: list[str] | None = None,
+    base: str | None = None,
+    backend: str = "asyncio",
+    step_timeout: float | None = None,
+    shell_session: bool = False,
+    use_cache: bool = True,
+    remote_cache: str | None = None,
+    cpus: float | None = None,
+    memory: int | None = None,
+    usage: bool = False,
+    usage_json: str | None = None,
+) -> int:
+    """
+    Run a pipeline's jobs on this machine; 0 if every job succeeded.
+
+    ``targets`` limits the run to those jobs and their dependencies, and
+    ``base`` to the jobs affected by the files changed since that git ref
+    (again with their dependencies). ``backend`` is ``"asyncio"`` (one
+    event loop drives every command) or ``"threads"`` (a thread per job);
+    ``shell_session`` runs each job's shell steps in one bash process.
+    Steps that declare ``inputs`` are looked up in the step cache under
+    ``<src_dir>/.pygha-cache/steps`` unless ``use_cache`` is False, and
+    on a miss in the shared cache at the ``remote_cache`` URL, if given.
+    Jobs only start when their ``cpus`` and ``memory`` fit in what the
+    running jobs leave of the machine, or of ``cpus``/``memory`` if given.
+    Job and step timings are recorded in ``<src_dir>/.pygha-cache/history.db``
+    and used to start long chains first and to estimate the time left.
+    ``usage`` prints the CPU time, peak memory, block I/O and context
+    switches of every step, and ``usage_json`` writes them to that file.
+    """
+
+    pipelines = load_pipelines(src_dir)
+    if pipeline not in pipelines:
+        print(f"\033[91m[pygha] Unknown pipeline: {pipeline}\033[0m")
+        return 1
+    pipe = pipelines[pipeline]
+
+    selected = list(targets or [])
+    unknown = [t for t in selected if t not in pipe.jobs]
+    if unknown:
+        print(f"\033[91m[pygha] Unknown target job(s): {', '.join(unknown)}\033[0m")
+        return 1
+    if base is not None:
+        from pygha.paths import affected_jobs, changed_files_from_git
+
+        try:
+            changed = changed_files_from_git(base)
+        except RuntimeError as exc:
+            print(f"\033[91m[pygha] {exc}\033[0m")
+            return 1
+        affected = {job.name for job in affected_jobs(pipe, changed)}
+        selected = [name for name in selected or pipe.jobs if name in affected]
+        if not selected:
+            print(f"[pygha] No jobs affected by changes since {base}.")
+            return 0
+    if selected:
+        pipe = pipe.subgraph(selected)
+
+    from pygha.step_cache import STEP_CACHE_DIR, StepCache
+
+    cache = None
+    if use_cache:
+        remote = None
+        if remote_cache:
+            from pygha.remote_cache import RemoteCache
+
+            try:
+                remote = RemoteCache(remote_cache)
+            except ValueError as exc:
+                print(f"\033[91m[pygha] {exc}\033[0m")
+                return 1
+        cache = StepCache(Path(src_dir) / STEP_CACHE_DIR, remote=remote)
+
+    from pygha.resources import Capacity, machine_capacity
+
+    machine = machine_capacity()
+    capacity = Capacity(
+        machine.cpus if cpus is None else cpus,
+        machine.memory if memory is None else memory,
+    )
+
+    import sqlite3
+
+    from pygha.history import HISTORY_FILE, TimingHistory
+
+    history = TimingHistory(Path(src_dir) / HISTORY_FILE)
+    try:
+        known = history.apply(pipe)
+    except (sqlite3.Error, OSError) as exc:  # run without estimates
+        print(f"\033[93m[pygha] Warning: ignoring timing history: {exc}\033[0m")
+        known = 0
+
+    print(
+        f"[pygha] Running {len(pipe.jobs)} job(s) of '{pipeline}' with {jobs} worker(s) "
+        f"on {capacity.cpus:g} CPU(s)"
+    )
+    if known:
+        print(f"[pygha] Timing history: estimates for {known} of {len(pipe.jobs)} job(s)")
+    if backend == "threads":
+        from pygha.runner import LocalRunner
+
+        result = LocalRunner(pipe, jobs=jobs, cache=cache, capacity=capacity).run()
+    else:
+        from pygha.async_runner import AsyncRunner
+
+        runner = AsyncRunner(
+            pipe,
+            jobs=jobs,
+            step_timeout=step_timeout,
+            shell_session=shell_session,
+            cache=cache,
+            capacity=capacity,
+        )
+        result = runner.run()
+
+    try:
+        history.record(pipeline, result)
+    except (sqlite3.Error, OSError) as exc:  # a broken history must not fail the run
+        print(f"\033[93m[pygha] Warning: could not record timings: {exc}\033[0m")
+    finally:
+        history.close()
+    if cache is not None and cache.hits + cache.misses:
+        remote_hits = f" ({cache.remote_hits} remote)" if remote_cache else ""
+        print(f"[pygha] Step cache: {cache.hits} hit(s){remote_hits}, {cache.misses} miss(es)")
+        cache.prune()
+    if cache is not None and cache.remote_error is not None:
+        print(f"\033[93m[pygha] Warning: remote cache disabled: {cache.remote_error}\033[0m")
+    if usage or usage_json:
+        from pygha import usage as resource_usage
+
+        if usage:
+            print("\n[pygha] Resource usage per step:")
+            for line in resource_usage.format_table(result):
+                print(f"  {line}")
+        if usage_json:
+            import json
+
+            report = resource_usage.to_json(result, pipeline)
+            Path(usage_json).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+            print(f"[pygha] Wrote resource usage to {usage_json}")
+    print(
+        f"\n{'✨' if result.ok else '💥'} Done in {result.duration:.1f}s. "
+        f"{len(result.jobs)} jobs: {result.count('success')} succeeded, "
+        f"{result.count('failed')} failed, {result.count('cancelled')} cancelled, "
+        f"{result.count('skipped')} skipped."
+    )
+    return 0 if result.ok else 1
+
 
-    if clean:
-        _clean_orphaned(OUT_DIR, set(pipelines.keys()))
+def cmd_cache(
+    action: str,
+    src_dir: str = ".pipe",
+    max_size: int | None = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    directory: str | None = None,
+) -> int:
+    """``pygha cache stats|prune|serve`` for the step cache."""
+    import time
+
+    from pygha.step_cache import DEFAULT_MAX_SIZE, STEP_CACHE_DIR, StepCache, format_size
+
+    if action == "serve":
+        from pygha.remote_cache import serve
+
+        root = Path(directory) if directory else Path(src_dir) / ".pygha-cache" / "server"
+        return serve(root, host, port, max_size if max_size is not None else DEFAULT_MAX_SIZE)
+
+    cache = StepCache(Path(src_dir) / STEP_CACHE_DIR)
+    if action == "prune":
+        removed, freed = cache.prune(max_size)
+        print(f"[pygha] Removed {removed} step cache entries, freed {format_size(freed)}.")
+        return 0
 
-    print(f"\n✨ Done. {len(pipelines)} workflows written.")
+    stats = cache.stats()
+    print(f"[pygha] Step cache at {cache.directory}")
+    print(f"  entries: {stats.entries}")
+    print(f"  objects: {stats.objects}")
+    print(f"  size:    {format_size(stats.size)} of {format_size(stats.max_size)}")
+    if stats.oldest is not None:
+        age = (time.time() - stats.oldest) / 86400
+        print(f"  least recently used entry: {age:.1f} days ago")
     return 0
 
 
@@ -112,8 +672,272 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Remove old workflow files not in registry (respects keep marker)",
     )
+    p_build.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-run every pipeline file, ignoring the <src-dir>/.pygha-cache build cache",
+    )
+    p_build.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Evaluate pipeline files in N worker processes (0 = one per CPU)",
+    )
+    p_build.add_argument(
+        "--reduce-needs",
+        action="store_true",
+        help="Drop 'needs' entries already implied by another dependency of the same job",
+    )
+    p_build.add_argument(
+        "--target",
+        action="append",
+        metavar="JOB",
+        dest="targets",
+        help=(
+            "Only emit JOB and the jobs it depends on (repeatable); "
+            "pipelines without a target are skipped"
+        ),
+    )
+    p_build.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild the pipelines affected by each change",
+    )
+    p_build.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Build in this process even if a 'pygha daemon' is running",
+    )
+    p_build.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace (Perfetto, chrome://tracing) of the build phases to FILE",
+    )
+
+    p_affected = sub.add_parser(
+        "affected", help="List the jobs affected by changed files (read from stdin by default)"
+    )
+    p_affected.add_argument("pipeline", nargs="?", help="Only consider this pipeline")
+    p_affected.add_argument("--src-dir", default=".pipe", help="Where pipeline_*.py live")
+    p_affected.add_argument(
+        "--base",
+        metavar="REF",
+        help="Use the files changed since REF (git diff --name-only REF) instead of stdin",
+    )
+
+    p_run = sub.add_parser("run", help="Run a pipeline's jobs locally")
+    p_run.add_argument("pipeline", nargs="?", default="ci", help="Pipeline to run (default: ci)")
+    p_run.add_argument("--src-dir", default=".pipe", help="Where pipeline_*.py live")
+    p_run.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Run up to N jobs at the same time (0 = one per CPU)",
+    )
+    p_run.add_argument(
+        "--target",
+        action="append",
+        metavar="JOB",
+        dest="targets",
+        help="Only run JOB and the jobs it depends on (repeatable)",
+    )
+    p_run.add_argument(
+        "--base",
+        metavar="REF",
+        help="Only run jobs affected by the files changed since REF, and their dependencies",
+    )
+    p_run.add_argument(
+        "--backend",
+        choices=["asyncio", "threads"],
+        default="asyncio",
+        help="Run commands from one event loop (default) or from a thread per job",
+    )
+    p_run.add_argument(
+        "--step-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Fail steps that run longer than this unless they set timeout_minutes (asyncio only)",
+    )
+    p_run.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every step, ignoring the <src-dir>/.pygha-cache/steps step cache",
+    )
+    p_run.add_argument(
+        "--shell-session",
+        action="store_true",
+        help="Run each job's shell steps as scripts in one persistent bash process (asyncio only)",
+    )
+    p_run.add_argument(
+        "--remote-cache",
+        metavar="URL",
+        default=os.environ.get("PYGHA_REMOTE_CACHE"),
+        help="Share step results through the cache server at URL (default: $PYGHA_REMOTE_CACHE)",
+    )
+    p_run.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace (Perfetto, chrome://tracing) of the jobs and steps to FILE",
+    )
+    p_run.add_argument(
+        "--cpus",
+        type=float,
+        metavar="N",
+        help="CPUs the jobs' 'cpus' requests are scheduled against (default: this machine's)",
+    )
+    p_run.add_argument(
+        "--memory",
+        metavar="SIZE",
+        help="Memory the jobs' 'memory' requests are scheduled against (default: this machine's)",
+    )
+    p_run.add_argument(
+        "--usage",
+        action="store_true",
+        help="Print the CPU time, peak memory, block I/O and context switches of every step",
+    )
+    p_run.add_argument(
+        "--usage-json",
+        metavar="FILE",
+        help="Write the resource usage of every step to FILE as JSON",
+    )
+
+    p_cache = sub.add_parser("cache", help="Inspect, shrink or serve the step cache")
+    p_cache.add_argument("action", choices=["stats", "prune", "serve"])
+    p_cache.add_argument("--src-dir", default=".pipe", help="Where pipeline_*.py live")
+    p_cache.add_argument(
+        "--max-size",
+        metavar="SIZE",
+        help=(
+            "With 'prune': evict least recently used entries down to SIZE (e.g. 500M, 0); "
+            "with 'serve': the size bound of the served store"
+        ),
+    )
+    p_cache.add_argument("--host", default="127.0.0.1", help="With 'serve': address to listen on")
+    p_cache.add_argument("--port", type=int, default=8765, help="With 'serve': port to listen on")
+    p_cache.add_argument(
+        "--dir",
+        dest="directory",
+        metavar="DIR",
+        help=(
+            "With 'serve': where to keep the served store (default: <src-dir>/.pygha-cache/server)"
+        ),
+    )
+
+    p_daemon = sub.add_parser("daemon", help="Manage the background build daemon")
+    p_daemon.add_argument("action", choices=["start", "stop", "status"])
+    p_daemon.add_argument(
+        "--foreground",
+        action="store_true",
+        help="With 'start': serve in this process instead of detaching",
+    )
 
     args = parser.parse_args(argv)
+    if getattr(args, "trace", None) is None:
+        return _dispatch(parser, args)
+    with trace.tracing(args.trace) as tracer:
+        rc = _dispatch(parser, args)
+    print(f"[pygha] Wrote {len(tracer.events)} trace spans to {args.trace}")
+    return rc
+
+
+def _dispatch(parser: "argparse.ArgumentParser", args: "argparse.Namespace") -> int:
     if args.command == "build":
-        return cmd_build(args.src_dir, args.out_dir, args.clean)
+        if args.targets and args.clean:
+            # A partial build would look like every other workflow was orphaned
+            parser.error("--clean cannot be combined with --target")
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        if args.watch:
+            from pygha.watch import watch
+
+            return watch(
+                args.src_dir,
+                args.out_dir,
+                args.clean,
+                use_cache=not args.no_cache,
+                jobs=jobs,
+                reduce_needs=args.reduce_needs,
+                targets=args.targets,
+            )
+        # The daemon's spans would be recorded in the daemon, not here
+        if not args.no_daemon and args.trace is None:
+            from pygha.daemon import forward_build
+
+            rc = forward_build(
+                src_dir=args.src_dir,
+                out_dir=args.out_dir,
+                clean=args.clean,
+                use_cache=not args.no_cache,
+                jobs=jobs,
+                reduce_needs=args.reduce_needs,
+                targets=args.targets,
+            )
+            if rc is not None:
+                return rc
+        return cmd_build(
+            args.src_dir,
+            args.out_dir,
+            args.clean,
+            use_cache=not args.no_cache,
+            jobs=jobs,
+            reduce_needs=args.reduce_needs,
+            targets=args.targets,
+        )
+    if args.command == "run":
+        if args.backend == "threads" and (args.shell_session or args.step_timeout is not None):
+            parser.error("--shell-session and --step-timeout need the asyncio backend")
+        if args.cpus is not None and args.cpus <= 0:
+            parser.error("--cpus must be positive")
+        memory = None
+        if args.memory is not None:
+            from pygha.step_cache import parse_size
+
+            try:
+                memory = parse_size(args.memory)
+            except ValueError as exc:
+                parser.error(str(exc))
+        return cmd_run(
+            args.src_dir,
+            args.pipeline,
+            jobs=args.jobs if args.jobs > 0 else (os.cpu_count() or 1),
+            targets=args.targets,
+            base=args.base,
+            backend=args.backend,
+            step_timeout=args.step_timeout,
+            shell_session=args.shell_session,
+            use_cache=not args.no_cache,
+            remote_cache=args.remote_cache,
+            cpus=args.cpus,
+            memory=memory,
+            usage=args.usage,
+            usage_json=args.usage_json,
+        )
+    if args.command == "cache":
+        max_size = None
+        if args.max_size is not None:
+            from pygha.step_cache import parse_size
+
+            try:
+                max_size = parse_size(args.max_size)
+            except ValueError as exc:
+                parser.error(str(exc))
+        return cmd_cache(args.action, args.src_dir, max_size, args.host, args.port, args.directory)
+    if args.command == "affected":
+        return cmd_affected(
+            args.src_dir,
+            args.pipeline,
+            base=args.base,
+            changed=sys.stdin if args.base is None else None,
+        )
+    if args.command == "daemon":
+        from pygha import daemon
+
+        if args.action == "start":
+            return daemon.serve() if args.foreground else daemon.start()
+        if args.action == "stop":
+            return daemon.stop()
+        return daemon.status()
     return 0
@@ -0,0 +1,288 @@
+"""
+Opt-in build daemon for ``pygha build``.
+
+``pygha daemon start`` launches a background interpreter that has pygha
+and the YAML stack already loaded. It listens on a per-user, per-project
+Unix socket; ``pygha build`` forwards its arguments there when a daemon
+is running and builds in-process otherwise.
+
+The protocol is one JSON object per line in each direction::
+
+    -> {"cmd": "build", "cwd": "/repo", "env": {...}, "args": {"src_dir": ".pipe", ...}}
+    <- {"rc": 0, "output": "[pygha] Found 3 pipeline files: ..."}
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any
+
+from . import __version__
+
+_CONNECT_TIMEOUT = 0.5
+_START_TIMEOUT = 10.0
+
+
+def socket_path(cwd: Path | None = None) -> Path:
+    """
+    Return the socket used by the daemon serving the project rooted at ``cwd``.
+
+    It lives in ``$XDG_RUNTIME_DIR/pygha`` when that is set, and in
+    ``<tmp>/pygha-<uid>`` otherwise.
+    """
+    root = str((cwd or Path.cwd()).resolve())
+    digest = hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+    runtime = os.environ.get("XDG_RUNTIME_DIR", "")
+    if os.path.isabs(runtime):
+        directory = Path(runtime) / "pygha"
+    else:
+        uid = os.getuid() if hasattr(os, "getuid") else 0
+        directory = Path(tempfile.gettempdir()) / f"pygha-{uid}"
+    # Kept short on purpose: AF_UNIX paths are limited to ~100 bytes
+    return directory / f"{digest}.sock"
+
+
+def _untrusted(path: Path, kind: int) -> str | None:
+    """
+    Why ``path`` (a directory or socket, per ``kind``) may belong to another
+    user, or None if it is ours. The temporary directory is shared, so
+    anyone could have created the daemon's directory or socket first.
+    """
+    try:
+        st = path.lstat()
+    except OSError as exc:
+        return f"cannot inspect {path}: {exc.strerror}"
+    if stat.S_IFMT(st.st_mode) != kind:
+        return f"{path} is not a {'directory' if kind == stat.S_IFDIR else 'socket'}"
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return f"{path} is owned by uid {st.st_uid}, not by the current user"
+    if kind == stat.S_IFDIR and stat.S_IMODE(st.st_mode) != 0o700:
+        return f"{path} has mode {stat.S_IMODE(st.st_mode):o}, expected 700"
+    return None
+
+
+def _request(message: dict[str, Any], path: Path | None = None) -> dict[str, Any] | None:
+    """Send one message to the daemon; None if no daemon is listening."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = path or socket_path()
+    # Only talk to a daemon of our own, in a directory nobody else can swap it in
+    if _untrusted(path.parent, stat.S_IFDIR) or _untrusted(path, stat.S_IFSOCK):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_CONNECT_TIMEOUT)
+            sock.connect(str(path))
+            sock.settimeout(None)  # builds may take a while
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(message).encode("utf-8") + b"\n")
+                stream.flush()
+                line = stream.readline()
+    except OSError:
+        # stale socket left by a daemon that died, or a permission problem
+        return None
+
+    if not line:
+        return None
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        return None  # not a pygha daemon, or one that broke mid-reply
+    return reply if isinstance(reply, dict) else None
+
+
+def ping(path: Path | None = None) -> dict[str, Any] | None:
+    """Return ``{"pid": ..., "version": ...}`` for a running daemon, else None."""
+    return _request({"cmd": "ping"}, path)
+
+
+def forward_build(**build_args: Any) -> int | None:
+    """
+    Run ``cmd_build(**build_args)`` in the daemon and replay its output.
+
+    Returns the build's exit status, or None when no compatible daemon is
+    running and the caller should build in-process.
+    """
+    info = ping()
+    if info is None or info.get("version") != __version__:
+        return None
+
+    # The build must see this process's environment, not the daemon's
+    message = {"cmd": "build", "cwd": os.getcwd(), "env": dict(os.environ), "args": build_args}
+    reply = _request(message)
+    if reply is None:
+        return None
+
+    sys.stdout.write(reply.get("output", ""))
+    sys.stdout.flush()
+    rc: int = reply.get("rc", 1)
+    return rc
+
+
+@contextlib.contextmanager
+def _environment(env: Mapping[str, str]) -> Iterator[None]:
+    """Run the block with ``os.environ`` replaced by ``env``."""
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+
+class _BuildFailed(Exception):
+    """A build raised; ``output`` is what it printed, traceback included."""
+
+    def __init__(self, output: str):
+        super().__init__(output)
+        self.output = output
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "BuildServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            reply = self.server.dispatch(message)
+        except _BuildFailed as exc:
+            reply = {"rc": 1, "output": exc.output}
+        except (ValueError, KeyError, TypeError, AttributeError, OSError):
+            # A malformed request, or a directory that cannot be built in
+            reply = {"rc": 1, "output": traceback.format_exc()}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    """Single-threaded server; builds run one at a time in this process."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        super().__init__(str(path), _Handler)
+
+    def dispatch(self, message: dict[str, Any]) -> dict[str, Any]:
+        cmd = message.get("cmd")
+        if cmd == "ping":
+            return {"pid": os.getpid(), "version": __version__}
+        if cmd == "stop":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"rc": 0, "output": ""}
+        if cmd == "build":
+            return self._build(
+                Path(message["cwd"]), message.get("args", {}), message.get("env", os.environ)
+            )
+        return {"rc": 2, "output": f"[pygha] Unknown daemon command: {cmd!r}\n"}
+
+    def _build(self, cwd: Path, args: dict[str, Any], env: Mapping[str, str]) -> dict[str, Any]:
+        from .cli import _forget_local_modules, cmd_build
+
+        buffer = io.StringIO()
+        os.chdir(cwd)
+        # Helpers run again on every build, exactly as in a fresh process:
+        # their pipeline(...) calls must register into this build's registry
+        _forget_local_modules([Path(args.get("src_dir", ".pipe")), cwd])
+        with _environment(env), contextlib.redirect_stdout(buffer):
+            try:
+                rc = cmd_build(**args)
+            except Exception as exc:
+                # Pipeline files may raise anything: report it like a fresh process would
+                traceback.print_exc(file=buffer)
+                raise _BuildFailed(buffer.getvalue()) from exc
+        return {"rc": rc, "output": buffer.getvalue()}
+
+
+def serve(path: Path | None = None) -> int:
+    """Run the daemon in the foreground until it is stopped."""
+    if not hasattr(socket, "AF_UNIX"):
+        print("[pygha] The build daemon needs Unix domain sockets, which this platform lacks.")
+        return 1
+
+    path = path or socket_path()
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    problem = _untrusted(path.parent, stat.S_IFDIR)
+    if problem is not None:
+        print(f"\033[91m[pygha] Refusing to start the daemon: {problem}.\033[0m")
+        return 1
+    if ping(path) is not None:
+        print(f"[pygha] A daemon is already listening on {path}")
+        return 1
+    path.unlink(missing_ok=True)  # stale socket from a crashed daemon
+
+    # Pay the heavy imports once, up front (the transpiler defers ruamel.yaml)
+    import ruamel.yaml  # noqa: F401
+
+    from .cli import cmd_build  # noqa: F401
+
+    with BuildServer(path) as server:
+        os.chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
+    return 0
+
+
+def start() -> int:
+    """Launch the daemon in the background and wait until it answers."""
+    path = socket_path()
+    info = ping(path)
+    if info is not None:
+        print(f"[pygha] Daemon already running (pid {info['pid']}).")
+        return 0
+
+    import subprocess  # nosec B404: only used to re-launch this interpreter
+
+    subprocess.Popen(  # nosec B603: argv built from sys.executable only
+        [sys.executable, "-m", "pygha", "daemon", "start", "--foreground"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + _START_TIMEOUT
+    while time.monotonic() < deadline:
+        info = ping(path)
+        if info is not None:
+            print(f"[pygha] Daemon started (pid {info['pid']}) on {path}")
+            return 0
+        time.sleep(0.05)
+
+    print("\033[91m[pygha] Daemon did not start in time.\033[0m")
+    return 1
+
+
+def stop() -> int:
+    """Ask the running daemon to exit."""
+    if _request({"cmd": "stop"}) is None:
+        print("[pygha] No daemon running.")
+        return 0
+    print("[pygha] Daemon stopped.")
+    return 0
+
+
+def status() -> int:
+    """Report whether a daemon is serving the current directory; 0 if so."""
+    info = ping()
+    if info is None:
+        print("[pygha] No daemon running.")
+        return 1
+    print(f"[pygha] Daemon running (pid {info['pid']}, pygha {info['version']}).")
+    return 0
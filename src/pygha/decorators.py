@@ -14,8 +14,30 @@ def job(
     depends_on: list[str] | None = None,
     pipeline: str | Pipeline | None = None,
     runs_on: str | None = "ubuntu-latest",
+    paths: list[str] | None = None,
+    cpus: float = 1.0,
+    memory: int | str = 0,
+    exclusive_group: str | None = None,
+    priority: int = 0,
 ) -> Callable[[Callable[[], R]], Callable[[], R]]:
-    """Decorator to define a job (expects a no-arg function)."""
+    """
+    Decorator to define a job (expects a no-arg function).
+
+    ``paths`` lists glob patterns of the files the job depends on; see
+    :mod:`pygha.paths` for the syntax and how they select jobs.
+
+    ``cpus``, ``memory`` (bytes, or a size such as ``"4G"``) and
+    ``exclusive_group`` tell ``pygha run`` what the job needs; see
+    :mod:`pygha.resources`. ``priority`` overrides the order in which
+    ready jobs start, which otherwise follows the timing history (see
+    :mod:`pygha.history`). None of these change the generated workflow.
+    """
+    if cpus < 0:
+        raise ValueError(f"cpus must not be negative, got {cpus}")
+    if isinstance(memory, str):
+        from .step_cache import parse_size
+
+        memory = parse_size(memory)
 
     def wrapper(func: Callable[[], R]) -> Callable[[], R]:
         jname = name or func.__name__
@@ -33,6 +55,11 @@ def job(
             name=jname,
             depends_on=set(depends_on or []),
             runner_image=runs_on,
+            paths=list(paths or []),
+            cpus=cpus,
+            memory=memory,
+            exclusive_group=exclusive_group,
+            priority=priority,
         )
 
         with active_job(job_obj):
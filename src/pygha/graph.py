@@ -0,0 +1,362 @@
+"""
+Validation and scheduling analysis for pipeline job graphs.
+
+:func:`validate` checks a job graph in a single linear pass and reports
+every problem at once. Given an estimated duration per job,
+:func:`critical_path` finds the longest dependency chain (the shortest
+possible end-to-end time with unlimited runners), how much each job could
+slip without delaying the pipeline, and what wall time to expect with a
+fixed number of runners.
+"""
+
+import heapq
+import json
+import math
+from collections import deque
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .models import Pipeline
+
+_EPSILON = 1e-9
+"""Slack below this is treated as zero (durations are floats)."""
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    """Everything wrong with a pipeline's job graph, found by :func:`validate`."""
+
+    missing: list[tuple[str, str]] = field(default_factory=list)
+    """``(job, dependency)`` pairs where the dependency is not a job in the pipeline."""
+
+    cycles: list[list[str]] = field(default_factory=list)
+    """
+    One closed path per group of mutually dependent jobs, e.g.
+    ``["build", "test", "build"]`` for *build needs test, test needs build*.
+    """
+
+    unreachable: list[str] = field(default_factory=list)
+    """Jobs that are fine themselves but depend on a job above, so can never run."""
+
+    @property
+    def ok(self) -> bool:
+        """True if the graph has no problems."""
+        return not (self.missing or self.cycles)
+
+    def messages(self) -> list[str]:
+        """One human-readable line per problem."""
+        lines = [f"Job '{job}' has an invalid dependency: '{dep}'" for job, dep in self.missing]
+        lines += [f"Circular dependency detected! {' -> '.join(path)}" for path in self.cycles]
+        if self.unreachable:
+            lines.append(f"Jobs blocked by the errors above: {', '.join(self.unreachable)}")
+        return lines
+
+
+class InvalidPipelineError(ValueError):
+    """Raised when a pipeline's job graph is invalid; ``result`` holds the details."""
+
+    def __init__(self, result: ValidationResult):
+        super().__init__("\n".join(result.messages()))
+        self.result = result
+
+
+def _strongly_connected(graph: Mapping[str, list[str]]) -> Iterator[list[str]]:
+    """Tarjan's algorithm, iteratively (no recursion limit on long chains)."""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, edges = work[-1]
+            for nxt in edges:
+                if nxt not in index:
+                    index[nxt] = low[nxt] = len(index)
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(graph[nxt])))
+                    break
+                if nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    yield component
+
+
+def _cycle_through(start: str, members: set[str], graph: Mapping[str, list[str]]) -> list[str]:
+    """Shortest closed path from ``start`` back to itself inside one component."""
+    parent: dict[str, str] = {}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for nxt in graph[node]:
+            if nxt == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                return [*reversed(path), start]
+            if nxt in members and nxt not in parent:
+                parent[nxt] = node
+                queue.append(nxt)
+    raise AssertionError(f"no cycle through {start!r}")  # pragma: no cover
+
+
+def validate(pipeline: Pipeline) -> ValidationResult:
+    """
+    Check the job graph of ``pipeline`` in O(jobs + dependencies).
+
+    Unlike :meth:`Pipeline.get_job_order`, this never raises for a broken
+    graph: every dangling ``depends_on`` entry, every cycle (as an ordered
+    path) and every job stuck behind one of those is collected into the
+    returned :class:`ValidationResult`.
+    """
+    jobs = pipeline.jobs
+    graph: dict[str, list[str]] = {}
+    missing: list[tuple[str, str]] = []
+    for name, job in jobs.items():
+        deps = sorted(set(job.depends_on or ()))
+        missing += [(name, dep) for dep in deps if dep not in jobs]
+        graph[name] = [dep for dep in deps if dep in jobs]
+
+    # Components come out dependencies-first; report cycles in declaration order
+    position = {name: i for i, name in enumerate(jobs)}
+    cycles: list[list[str]] = []
+    in_cycle: set[str] = set()
+    for component in _strongly_connected(graph):
+        if len(component) == 1 and component[0] not in graph[component[0]]:
+            continue
+        start = min(component, key=position.__getitem__)
+        cycles.append(_cycle_through(start, set(component), graph))
+        in_cycle.update(component)
+    cycles.sort(key=lambda path: position[path[0]])
+
+    # Everything that (transitively) depends on a broken job can never run
+    broken = in_cycle | {job for job, _ in missing}
+    dependents: dict[str, list[str]] = {name: [] for name in jobs}
+    for name, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(name)
+    blocked: set[str] = set()
+    queue = deque(broken)
+    while queue:
+        for nxt in dependents[queue.popleft()]:
+            if nxt not in broken and nxt not in blocked:
+                blocked.add(nxt)
+                queue.append(nxt)
+
+    return ValidationResult(
+        missing=missing,
+        cycles=cycles,
+        unreachable=[name for name in jobs if name in blocked],
+    )
+
+
+@dataclass(frozen=True)
+class CriticalPathReport:
+    """Result of :func:`critical_path`. All times are in the units of the durations."""
+
+    path: list[str]
+    """The longest chain of jobs, first to last."""
+
+    length: float
+    """Total duration of ``path``: the wall time with unlimited runners."""
+
+    earliest_start: dict[str, float]
+    """When each job can start at the earliest, with unlimited runners."""
+
+    slack: dict[str, float]
+    """How long each job can be delayed without delaying the pipeline."""
+
+    remaining: dict[str, float]
+    """The longest chain from the start of each job to the end of the pipeline."""
+
+    total_work: float
+    """Sum of all job durations: the wall time with a single runner."""
+
+    runners: int
+    """Number of parallel runners the wall-time figures below assume."""
+
+    min_wall_time: float
+    """Lower bound on the wall time with ``runners``: no schedule can beat it."""
+
+    scheduled_wall_time: float
+    """Wall time of a longest-path-first schedule on ``runners``; achievable."""
+
+
+def load_durations(path: str | Path) -> dict[str, float]:
+    """
+    Read job duration estimates from a JSON file of ``{"job name": seconds}``.
+
+    Raises:
+        ValueError: If the file is not valid JSON.
+        TypeError: If it is not such a mapping, or a duration is not a number.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise TypeError(f"{path}: expected a JSON object mapping job names to durations")
+
+    durations: dict[str, float] = {}
+    for name, value in data.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"{path}: duration for job '{name}' is not a number: {value!r}")
+        durations[name] = float(value)
+    return durations
+
+
+def transitive_reduction(pipeline: Pipeline) -> dict[str, set[str]]:
+    """
+    Return each job's dependencies with the redundant ones removed.
+
+    A dependency is redundant when another dependency of the same job
+    already (transitively) needs it: if *deploy* needs *build* and *test*,
+    and *test* needs *build*, then *deploy* only needs *test*. Every job
+    still runs after exactly the same set of jobs.
+
+    Each job's ancestors are kept as a bitset (a Python int indexed by
+    topological position), so the pass costs O(dependencies * jobs / 64)
+    word operations rather than a graph search per edge.
+
+    Raises:
+        InvalidPipelineError: If the job graph is invalid.
+    """
+    order = pipeline.get_job_order()
+    bit = {job.name: 1 << i for i, job in enumerate(order)}
+    ancestors: dict[str, int] = {}
+    reduced: dict[str, set[str]] = {}
+
+    for job in order:
+        deps = set(job.depends_on or ())
+        covered = 0
+        reach = 0
+        for dep in deps:
+            covered |= ancestors[dep]
+            reach |= ancestors[dep] | bit[dep]
+        ancestors[job.name] = reach
+        reduced[job.name] = {dep for dep in deps if not covered & bit[dep]}
+    return reduced
+
+
+def _simulate(
+    pipeline: Pipeline, durations: Mapping[str, float], tail: Mapping[str, float], runners: int
+) -> float:
+    """List-schedule the jobs on ``runners``, always starting the longest remaining chain first."""
+    order = pipeline.get_job_order()
+    position = {job.name: i for i, job in enumerate(order)}
+    waiting = {job.name: len(set(job.depends_on or ())) for job in order}
+    dependents: dict[str, list[str]] = {job.name: [] for job in order}
+    for job in order:
+        for dep in set(job.depends_on or ()):
+            dependents[dep].append(job.name)
+
+    ready = [(-tail[name], position[name], name) for name, n in waiting.items() if n == 0]
+    heapq.heapify(ready)
+    running: list[tuple[float, str]] = []
+    now = 0.0
+
+    while ready or running:
+        while ready and len(running) < runners:
+            _, _, name = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations[name], name))
+
+        now, name = heapq.heappop(running)
+        for nxt in dependents[name]:
+            waiting[nxt] -= 1
+            if waiting[nxt] == 0:
+                heapq.heappush(ready, (-tail[nxt], position[nxt], nxt))
+    return now
+
+
+def critical_path(
+    pipeline: Pipeline,
+    durations: Mapping[str, float],
+    runners: int = 1,
+    default: float = 0.0,
+) -> CriticalPathReport:
+    """
+    Analyse ``pipeline`` with per-job duration estimates.
+
+    Args:
+        pipeline: The pipeline to analyse.
+        durations: Estimated duration per job name, e.g. from
+            :func:`load_durations`.
+        runners: Number of jobs that can run at the same time.
+        default: Duration assumed for jobs missing from ``durations``.
+
+    Raises:
+        ValueError: If the job graph is invalid, ``runners`` is below 1 or
+            a duration is negative.
+    """
+    if runners < 1:
+        raise ValueError(f"runners must be at least 1, got {runners}")
+
+    order = pipeline.get_job_order()
+    cost = {job.name: float(durations.get(job.name, default)) for job in order}
+    for name, value in cost.items():
+        if value < 0 or math.isnan(value):
+            raise ValueError(f"Job '{name}' has an invalid duration: {value!r}")
+
+    # Forward pass: earliest start/finish
+    start: dict[str, float] = {}
+    finish: dict[str, float] = {}
+    for job in order:
+        start[job.name] = max((finish[dep] for dep in job.depends_on or ()), default=0.0)
+        finish[job.name] = start[job.name] + cost[job.name]
+    length = max(finish.values(), default=0.0)
+
+    # Backward pass: latest finish, and the longest chain from each job to the end
+    latest_finish = {job.name: length for job in order}
+    downstream = {job.name: 0.0 for job in order}
+    tail: dict[str, float] = {}
+    for job in reversed(order):
+        tail[job.name] = cost[job.name] + downstream[job.name]
+        latest_start = latest_finish[job.name] - cost[job.name]
+        for dep in job.depends_on or ():
+            latest_finish[dep] = min(latest_finish[dep], latest_start)
+            downstream[dep] = max(downstream[dep], tail[job.name])
+    slack = {name: latest_finish[name] - finish[name] for name in finish}
+
+    # Walk back from the job that finishes last along dependencies with no slack
+    path: list[str] = []
+    if order:
+        current = next(job for job in order if finish[job.name] >= length - _EPSILON)
+        while True:
+            path.append(current.name)
+            deps = [pipeline.jobs[d] for d in current.depends_on or ()]
+            tight = [d for d in deps if abs(finish[d.name] - start[current.name]) <= _EPSILON]
+            if not tight:
+                break
+            current = max(tight, key=lambda d: finish[d.name])
+        path.reverse()
+
+    total = sum(cost.values())
+    return CriticalPathReport(
+        path=path,
+        length=length,
+        earliest_start=start,
+        slack=slack,
+        remaining=tail,
+        total_work=total,
+        runners=runners,
+        min_wall_time=max(length, total / runners),
+        scheduled_wall_time=_simulate(pipeline, cost, tail, runners) if order else 0.0,
+    )
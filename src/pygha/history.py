@@ -0,0 +1,140 @@
+"""
+Timing history of local runs.
+
+``pygha run`` records how long every job and step took in a small SQLite
+database, ``<src-dir>/.pygha-cache/history.db``. The next run reads the
+median of the last few successful runs of each job back into
+:attr:`Job.estimate <pygha.models.Job.estimate>`, which the runners use
+to start the jobs with the longest remaining chain first and to print an
+ETA as jobs finish.
+
+Only successful jobs are recorded, and a job with steps restored from
+the step cache only contributes its step timings, so cache hits do not
+make a job look faster than it is.
+"""
+
+import statistics
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3
+
+    from .models import Pipeline
+    from .runner import RunResult
+
+HISTORY_FILE = Path(".pygha-cache") / "history.db"
+"""Where (inside ``--src-dir``) the timing history is kept."""
+
+KEEP = 20
+"""Samples kept per job and per step; older ones are deleted."""
+
+WINDOW = 5
+"""Estimates are the median of this many most recent samples."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS timings (
+    pipeline TEXT NOT NULL,
+    job TEXT NOT NULL,
+    step TEXT NOT NULL,  -- '' for the job as a whole
+    duration REAL NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS timings_key ON timings (pipeline, job, step, recorded);
+"""
+
+
+class TimingHistory:
+    """
+    Recorded job and step durations, in seconds.
+
+    Args:
+        path: The SQLite database; created on first use.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> "sqlite3.Connection":
+        if self._db is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            ignore = self.path.parent / ".gitignore"
+            if not ignore.exists():
+                ignore.write_text("# Created by pygha\n*\n", encoding="utf-8")
+            self._db = sqlite3.connect(self.path, timeout=10)
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def record(self, pipeline: str, result: "RunResult") -> None:
+        """Add the timings of the successful jobs of a run."""
+        now = time.time()
+        rows: list[tuple[str, str, str, float, float]] = []
+        for job in result.jobs.values():
+            if job.status != "success":
+                continue
+            if not any(step.cached for step in job.steps):
+                rows.append((pipeline, job.name, "", job.duration, now))
+            rows += [
+                (pipeline, job.name, step.label, step.duration, now)
+                for step in job.steps
+                if not step.cached
+            ]
+        if not rows:
+            return
+        db = self._connect()
+        with db:
+            db.executemany("INSERT INTO timings VALUES (?, ?, ?, ?, ?)", rows)
+            for key in {row[:3] for row in rows}:
+                db.execute(
+                    "DELETE FROM timings WHERE pipeline = ? AND job = ? AND step = ? AND "
+                    "recorded NOT IN (SELECT recorded FROM timings WHERE pipeline = ? AND "
+                    "job = ? AND step = ? ORDER BY recorded DESC LIMIT ?)",
+                    (*key, *key, KEEP),
+                )
+
+    def _samples(self, pipeline: str, job: str | None) -> dict[tuple[str, str], list[float]]:
+        """The most recent durations per ``(job, step)``, newest first."""
+        if not self.path.exists():
+            return {}
+        args: tuple[str, ...]
+        if job is None:
+            query, args = "step = ''", (pipeline,)
+        else:
+            query, args = "job = ? AND step != ''", (pipeline, job)
+        rows = self._connect().execute(
+            f"SELECT job, step, duration FROM timings WHERE pipeline = ? AND {query} "  # nosec B608
+            "ORDER BY recorded DESC",
+            args,
+        )
+        samples: dict[tuple[str, str], list[float]] = {}
+        for row_job, step, duration in rows:
+            recent = samples.setdefault((row_job, step), [])
+            if len(recent) < WINDOW:
+                recent.append(duration)
+        return samples
+
+    def job_estimates(self, pipeline: str) -> dict[str, float]:
+        """Expected duration of each job of ``pipeline`` that has been recorded."""
+        samples = self._samples(pipeline, None)
+        return {job: statistics.median(values) for (job, _), values in samples.items()}
+
+    def step_estimates(self, pipeline: str, job: str) -> dict[str, float]:
+        """Expected duration of each recorded step of ``job``, by step label."""
+        samples = self._samples(pipeline, job)
+        return {step: statistics.median(values) for (_, step), values in samples.items()}
+
+    def apply(self, pipeline: "Pipeline") -> int:
+        """Set :attr:`Job.estimate` on the jobs of ``pipeline``; returns how many were known."""
+        estimates = self.job_estimates(pipeline.name)
+        for job in pipeline.jobs.values():
+            job.estimate = estimates.get(job.name, job.estimate)
+        return sum(1 for name in pipeline.jobs if name in estimates)
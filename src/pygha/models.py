@@ -7,16 +7,21 @@ transpiles them lives in other modules (like runner.py).
 """
 
 from dataclasses import dataclass, field
-from typing import Any
-from collections import deque
+import heapq
+import sys
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
 from abc import ABC, abstractmethod
 from .trigger_event import PipelineSettings
 
+if TYPE_CHECKING:
+    from .graph import ValidationResult
+
 
 # --- Step Base Class ---
 # We define a simple base class for Step so that the
 # Job class can have a type-hinted list of steps.
-@dataclass
+@dataclass(slots=True)
 class Step(ABC):
     """Abstract base class for all pipeline steps."""
 
@@ -36,7 +41,7 @@ class Step(ABC):
 # --- Job Object ---
 
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     """
     Represents a single unit of work in the pipeline, like "build" or "test".
@@ -55,15 +60,63 @@ class Job:
     runner_image: str | None = None
     """(Optional) The container image to run this job in (e.g., "ubuntu-latest")."""
 
+    paths: list[str] = field(default_factory=list)
+    """(Optional) Glob patterns of the files this job depends on (see pygha.paths)."""
+
+    cpus: float = 1.0
+    """CPUs the job keeps busy in local runs (see pygha.resources)."""
+
+    memory: int = 0
+    """Bytes of memory the job needs in local runs."""
+
+    exclusive_group: str | None = None
+    """(Optional) Local runs never run two jobs of the same group at once."""
+
+    priority: int = 0
+    """Local runs start ready jobs with a higher priority first."""
+
+    estimate: float | None = None
+    """Expected wall time in seconds, filled in from the timing history of local runs."""
+
+    def __post_init__(self) -> None:
+        # Generated pipelines repeat the same few runner images thousands of times
+        self.name = sys.intern(self.name)
+        if self.runner_image is not None:
+            self.runner_image = sys.intern(self.runner_image)
+
     def add_step(self, step: Step) -> None:
         """A simple helper to add a step to this job."""
         self.steps.append(step)
 
 
+# --- Reachability index ---
+
+
+@dataclass(slots=True)
+class _Reachability:
+    """Ancestor/descendant bitsets over positions in one cached job order."""
+
+    order: list[Job]
+    size: int
+    position: dict[str, int]
+    ancestors: list[int]
+    descendants: list[int]
+
+    def jobs(self, mask: int) -> list[Job]:
+        """Decode a bitset into its jobs, in execution order."""
+        bits = bin(mask)[:1:-1]  # least significant bit first
+        found = []
+        i = bits.find("1")
+        while i != -1:
+            found.append(self.order[i])
+            i = bits.find("1", i + 1)
+        return found
+
+
 # --- Pipeline Object ---
 
 
-@dataclass
+@dataclass(slots=True)
 class Pipeline:
     """
     The main container for the entire CI/CD workflow.
@@ -78,27 +131,207 @@ class Pipeline:
 
     pipeline_settings: PipelineSettings = field(default_factory=PipelineSettings)
 
+    _job_order: list[Job] | None = field(default=None, init=False, repr=False, compare=False)
+    """Cached result of get_job_order(); None when it must be recomputed."""
+
+    _order_key: tuple[int, int] = field(default=(0, -1), init=False, repr=False, compare=False)
+    """(id, len) of ``jobs`` when the cache was filled, to notice direct edits."""
+
+    _reach: _Reachability | None = field(default=None, init=False, repr=False, compare=False)
+    """Reachability index built from the cached job order, see _reachability()."""
+
+    def __getstate__(self) -> tuple[str, dict[str, Job], PipelineSettings]:
+        # The caches are cheap to rebuild and would only bloat pickles
+        # (build cache entries, --jobs worker results)
+        return self.name, self.jobs, self.pipeline_settings
+
+    def __setstate__(self, state: tuple[str, dict[str, Job], PipelineSettings]) -> None:
+        self.name, self.jobs, self.pipeline_settings = state
+        self._job_order = None
+        self._order_key = (0, -1)
+        self._reach = None
+
+    def _jobs_key(self) -> tuple[int, int]:
+        return id(self.jobs), len(self.jobs)
+
     def add_job(self, job: Job) -> None:
         """Registers a new job with the pipeline."""
         if job.name in self.jobs:
             raise ValueError(f"A job with the name '{job.name}' already exists.")
+
+        # A job whose dependencies are all known can go last in the cached order:
+        # nothing already in the pipeline can depend on it without being invalid.
+        cache_valid = self._job_order is not None and self._order_key == self._jobs_key()
+        deps_known = all(dep in self.jobs for dep in job.depends_on or ())
+
         self.jobs[job.name] = job
 
+        if cache_valid and deps_known and self._job_order is not None:
+            self._job_order.append(job)
+            self._order_key = self._jobs_key()
+        else:
+            self.invalidate_job_order()
+
+    def invalidate_job_order(self) -> None:
+        """
+        Forget the cached job order.
+
+        ``add_job`` keeps the cache up to date, and adding or removing entries
+        in ``jobs`` directly is noticed too. Call this after changing the
+        ``depends_on`` of a job that is already part of the pipeline.
+        """
+        self._job_order = None
+
     def get_job_order(self) -> list[Job]:
         """
         Calculates the correct execution order for all jobs.
 
         This is the "brain" of pygha. It performs a topological sort
-        on the job graph and detects circular dependencies.
+        on the job graph and detects circular dependencies. Independent
+        jobs keep the order in which they were added.
+
+        The result is cached, so repeated calls are O(1); treat the
+        returned list as read-only.
 
         Returns:
             A list of Job objects in the correct order of execution.
+
+        Raises:
+            InvalidPipelineError: A ``ValueError`` listing every invalid
+                dependency and cycle; its ``result`` attribute holds the
+                :class:`pygha.graph.ValidationResult`.
         """
+        if self._job_order is not None and self._order_key == self._jobs_key():
+            return self._job_order
+
+        order = self._topological_order()
+        self._job_order = order
+        self._order_key = self._jobs_key()
+        return order
 
+    def validate(self) -> "ValidationResult":
+        """
+        Check the job graph and report every problem at once.
+
+        See :func:`pygha.graph.validate`.
+        """
+        from .graph import validate
+
+        return validate(self)
+
+    def _invalid(self) -> ValueError:
+        from .graph import InvalidPipelineError
+
+        return InvalidPipelineError(self.validate())
+
+    def _reachability(self) -> _Reachability:
+        """Return the reachability index, rebuilding it if the job order changed."""
+        order = self.get_job_order()
+        reach = self._reach
+        # add_job() may have appended to the very same list, hence the size check
+        if reach is not None and reach.order is order and reach.size == len(order):
+            return reach
+
+        position = {job.name: i for i, job in enumerate(order)}
+        ancestors = [0] * len(order)
+        for i, job in enumerate(order):
+            mask = 0
+            for dep in job.depends_on or ():
+                j = position[dep]
+                mask |= ancestors[j] | (1 << j)
+            ancestors[i] = mask
+
+        descendants = [0] * len(order)
+        for i in range(len(order) - 1, -1, -1):
+            for dep in order[i].depends_on or ():
+                j = position[dep]
+                descendants[j] |= descendants[i] | (1 << i)
+
+        reach = _Reachability(order, len(order), position, ancestors, descendants)
+        self._reach = reach
+        return reach
+
+    def _position(self, reach: _Reachability, job: Job | str) -> int:
+        name = job if isinstance(job, str) else job.name
+        try:
+            return reach.position[name]
+        except KeyError:
+            raise KeyError(f"Pipeline '{self.name}' has no job named '{name}'") from None
+
+    def ancestors(self, job: Job | str) -> list[Job]:
+        """
+        Return every job that ``job`` (transitively) depends on, in execution order.
+
+        Backed by a bitset index that is built on first use and rebuilt when
+        the jobs change, so each query costs a few big-integer operations.
+
+        Raises:
+            KeyError: If the pipeline has no such job.
+        """
+        reach = self._reachability()
+        return reach.jobs(reach.ancestors[self._position(reach, job)])
+
+    def descendants(self, job: Job | str) -> list[Job]:
+        """
+        Return every job that (transitively) depends on ``job``, in execution order.
+
+        Raises:
+            KeyError: If the pipeline has no such job.
+        """
+        reach = self._reachability()
+        return reach.jobs(reach.descendants[self._position(reach, job)])
+
+    def subgraph(self, targets: Iterable[Job | str]) -> "Pipeline":
+        """
+        Return a pipeline with just what is needed to run ``targets``.
+
+        The result holds the targets and all their ancestors -- the smallest
+        set of jobs that is closed under ``depends_on`` -- with the same name
+        and settings. Job objects are shared with this pipeline.
+
+        Raises:
+            KeyError: If a target is not a job of this pipeline.
+        """
+        reach = self._reachability()
+        mask = 0
+        for target in targets:
+            i = self._position(reach, target)
+            mask |= reach.ancestors[i] | (1 << i)
+
+        selected = Pipeline(name=self.name, pipeline_settings=self.pipeline_settings)
+        for job in reach.jobs(mask):
+            selected.add_job(job)
+        return selected
+
+    def get_job_levels(self) -> list[list[Job]]:
+        """
+        Group jobs into stages that can run in parallel.
+
+        Stage 0 holds the jobs without dependencies; every other job sits
+        one stage after its latest dependency, so all jobs in a stage only
+        depend on earlier stages. Within a stage, jobs keep the order of
+        ``get_job_order()``.
+
+        Returns:
+            A list of stages, each a list of Job objects.
+        """
+        level: dict[str, int] = {}
+        levels: list[list[Job]] = []
+        for job in self.get_job_order():
+            n = max((level[dep] + 1 for dep in job.depends_on or ()), default=0)
+            level[job.name] = n
+            if n == len(levels):
+                levels.append([])
+            levels[n].append(job)
+        return levels
+
+    def _topological_order(self) -> list[Job]:
         # 1. Build the graph representations
         #    - adj: Adjacency list (job -> list of jobs that depend on it)
         #    - in_degree: Count of dependencies for each job
 
+        names = list(self.jobs)
+        index = {name: i for i, name in enumerate(names)}
         adj: dict[str, list[str]] = {name: [] for name in self.jobs}
         in_degree: dict[str, int] = {name: 0 for name in self.jobs}
 
@@ -106,34 +339,39 @@ class Pipeline:
             for dep_name in job.depends_on or []:
                 # Check for invalid dependencies
                 if dep_name not in self.jobs:
-                    raise ValueError(f"Job '{name}' has an invalid dependency: '{dep_name}'")
+                    raise self._invalid()
 
                 # A depends on B means an edge from B -> A
                 adj[dep_name].append(name)
                 in_degree[name] += 1
 
-        # 2. Initialize the queue with all "source" jobs (no dependencies)
-        queue = deque([name for name in self.jobs if in_degree[name] == 0])
+        # 2. Initialize the heap with all "source" jobs (no dependencies).
+        #    Ordering ready jobs by insertion index (rather than FIFO) makes the
+        #    result independent of how the graph was built, which is what lets
+        #    add_job() extend a cached order by appending.
+        ready = [index[name] for name in names if in_degree[name] == 0]
+        heapq.heapify(ready)
         sorted_names = []
 
-        # 3. Process the queue (Kahn's algorithm for topological sort)
-        while queue:
-            job_name = queue.popleft()
+        # 3. Process ready jobs (Kahn's algorithm for topological sort)
+        while ready:
+            job_name = names[heapq.heappop(ready)]
             sorted_names.append(job_name)
 
             # For each job that depended on the one we just finished...
             for next_job_name in adj[job_name]:
                 # ...decrement its dependency count
                 in_degree[next_job_name] -= 1
-                # If it now has no more dependencies, add it to the queue
+                # If it now has no more dependencies, it is ready to run
                 if in_degree[next_job_name] == 0:
-                    queue.append(next_job_name)
+                    heapq.heappush(ready, index[next_job_name])
 
         # 4. Check for cycles
         if len(sorted_names) != len(self.jobs):
-            # A cycle was detected!
-            cycle_jobs = {name for name in self.jobs if in_degree[name] > 0}
-            raise ValueError(f"Circular dependency detected! Jobs in cycle: {cycle_jobs}")
+            # A cycle was detected! Validation reports the actual cycles, rather
+            # than every job left with a dependency count (which includes the
+            # innocent jobs downstream of them).
+            raise self._invalid()
 
         # 5. Return the full Job objects in the correct order
         return [self.jobs[name] for name in sorted_names]
@@ -0,0 +1,231 @@
+"""
+Change-aware job selection.
+
+Jobs may declare the files they depend on with ``@job(paths=[...])``,
+using GitHub's filter pattern syntax:
+
+* ``*`` matches any characters except ``/``; ``**`` also matches ``/``
+  (``**/`` may match no directory at all).
+* ``?`` and ``+`` make the preceding character optional or repeatable.
+* ``[abc]`` / ``[a-z]`` match one character of a set.
+* A leading ``!`` excludes paths matched by earlier patterns.
+
+:class:`PathMatcher` compiles the patterns of a whole pipeline into a
+single matcher. Patterns are indexed by their literal leading
+directories, so each changed file is only tested against the handful of
+patterns that could possibly match it, however many jobs there are.
+"""
+
+import re
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+from .models import Job, Pipeline
+
+_WILDCARDS = frozenset("*?+[")
+
+
+def _translate(pattern: str) -> str:
+    """Translate one GitHub filter pattern (without ``!``) into a regex body."""
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif ch == "*":
+            out.append("[^/]*")
+            i += 1
+        elif ch in "?+" and out:
+            # Quantifies the preceding character, as in GitHub's syntax
+            out.append(ch)
+            i += 1
+        elif ch == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        else:
+            out.append(re.escape(ch))
+            i += 1
+    return "".join(out)
+
+
+@lru_cache(maxsize=4096)
+def compile_glob(pattern: str) -> "re.Pattern[str]":
+    """Compile a single filter pattern (a leading ``!`` is ignored) to a regex."""
+    return re.compile(_translate(pattern.removeprefix("!")) + r"\Z", re.DOTALL)
+
+
+def _literal_prefix(pattern: str) -> tuple[str, ...]:
+    """The leading directory names of ``pattern`` that contain no wildcard."""
+    segments = pattern.split("/")[:-1]
+    prefix = []
+    for segment in segments:
+        if _WILDCARDS.intersection(segment):
+            break
+        prefix.append(segment)
+    return tuple(prefix)
+
+
+@dataclass(slots=True)
+class _Node:
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    patterns: list[int] = field(default_factory=list)
+
+
+class PathMatcher:
+    """
+    Matches changed files against the ``paths`` of many jobs at once.
+
+    Args:
+        jobs: The jobs to match. Jobs without ``paths`` are considered
+            affected by any change.
+    """
+
+    def __init__(self, jobs: Iterable[Job]):
+        self._always: list[str] = []
+        self._regexes: list[re.Pattern[str]] = []
+        self._negated: list[bool] = []
+        self._owners: list[list[str]] = []
+        # Jobs using '!' need their own patterns evaluated in order per file
+        self._ordered: dict[str, list[int]] = {}
+        self._root = _Node()
+
+        ids: dict[str, int] = {}
+        for job in jobs:
+            if not job.paths:
+                self._always.append(job.name)
+                continue
+            own = []
+            for pattern in job.paths:
+                if pattern not in ids:
+                    ids[pattern] = len(self._regexes)
+                    self._regexes.append(compile_glob(pattern))
+                    self._negated.append(pattern.startswith("!"))
+                    self._owners.append([])
+                    self._index(pattern, ids[pattern])
+                own.append(ids[pattern])
+            if any(self._negated[p] for p in own):
+                self._ordered[job.name] = own
+            for p in dict.fromkeys(own):
+                if not self._negated[p]:
+                    self._owners[p].append(job.name)
+
+    def _index(self, pattern: str, pid: int) -> None:
+        node = self._root
+        for segment in _literal_prefix(pattern.removeprefix("!")):
+            node = node.children.setdefault(segment, _Node())
+        node.patterns.append(pid)
+
+    def _candidates(self, path: str) -> Iterable[int]:
+        node = self._root
+        yield from node.patterns
+        for segment in path.split("/")[:-1]:
+            child = node.children.get(segment)
+            if child is None:
+                return
+            node = child
+            yield from node.patterns
+
+    def affected(self, changed: Iterable[str]) -> set[str]:
+        """Return the names of jobs whose ``paths`` match at least one changed file."""
+        result: set[str] = set()
+        files = [f.replace("\\", "/").removeprefix("./") for f in changed]
+        if not files:
+            return result
+        result.update(self._always)
+
+        done: set[int] = set()  # positive patterns whose jobs are all settled
+        for path in files:
+            hits = [p for p in self._candidates(path) if self._regexes[p].match(path)]
+            if not hits:
+                continue
+            hit_set = set(hits)
+            for p in hits:
+                if self._negated[p] or p in done:
+                    continue
+                pending = False
+                for name in self._owners[p]:
+                    if name in result:
+                        continue
+                    order = self._ordered.get(name)
+                    if order is None or _last_match_includes(order, hit_set, self._negated):
+                        result.add(name)
+                    else:
+                        pending = True
+                if not pending:
+                    done.add(p)
+        return result
+
+
+def _last_match_includes(order: Sequence[int], hits: set[int], negated: list[bool]) -> bool:
+    """GitHub semantics: the last pattern in the job's list that matches decides."""
+    for p in reversed(order):
+        if p in hits:
+            return not negated[p]
+    return False
+
+
+def affected_jobs(pipeline: Pipeline, changed: Iterable[str]) -> list[Job]:
+    """
+    Return the jobs affected by ``changed`` files, plus everything downstream of them.
+
+    A job is affected when one of its ``paths`` matches a changed file (or
+    it declares no ``paths`` at all), and every job that depends on an
+    affected job is affected too. Jobs are returned in execution order.
+    """
+    direct = PathMatcher(pipeline.jobs.values()).affected(changed)
+    selected = set(direct)
+    for name in direct:
+        selected.update(job.name for job in pipeline.descendants(name))
+    return [job for job in pipeline.get_job_order() if job.name in selected]
+
+
+def changed_files_from_git(base: str, cwd: str | Path | None = None) -> list[str]:
+    """
+    List files changed between ``base`` and the working tree, via ``git diff --name-only``.
+
+    Raises:
+        RuntimeError: If git fails (not a repository, unknown ref, ...).
+    """
+    import subprocess  # nosec B404: fixed git argv, no shell
+
+    proc = subprocess.run(  # nosec B603 B607
+        ["git", "diff", "--name-only", base, "--"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"git diff --name-only {base} failed: {proc.stderr.strip()}")
+    return [line for line in proc.stdout.splitlines() if line]
+
+
+def workflow_paths(pipeline: Pipeline) -> list[str] | None:
+    """
+    Return a workflow-level ``paths`` filter covering every job, if one exists.
+
+    GitHub can only filter whole workflows by path. That is safe when every
+    job declares ``paths`` (the union then covers every job's inputs) and
+    none of them uses ``!`` exclusions, which do not survive a union.
+    Otherwise returns None.
+    """
+    # getattr: transpilers also accept duck-typed jobs that predate 'paths'
+    per_job = [getattr(job, "paths", None) for job in pipeline.jobs.values()]
+    if not per_job or not all(per_job):
+        return None
+    patterns = [p for paths in per_job for p in paths or ()]
+    if any(p.startswith("!") for p in patterns):
+        return None
+    return list(dict.fromkeys(patterns))
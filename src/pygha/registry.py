@@ -9,6 +9,8 @@ Notes:
     - The default pipeline is always available under the name "default".
 """
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Unpack
 from .models import Pipeline
 from .trigger_event import PipelineSettings, PipelineSettingsKwargs
@@ -96,3 +98,24 @@ def reset_registry() -> None:
     global _pipelines
     _pipelines.clear()
     _pipelines["ci"] = Pipeline(name="ci")
+
+
+@contextmanager
+def isolated_registry() -> Iterator[dict[str, Pipeline]]:
+    """Temporarily swap the global registry for an empty one.
+
+    Everything registered inside the ``with`` block lands in the fresh
+    registry, which is yielded to the caller. The previous registry is
+    restored on exit, so pipeline files can be evaluated one at a time
+    without seeing each other's pipelines.
+
+    Yields:
+        dict[str, Pipeline]: The registry active inside the block.
+    """
+    global _pipelines
+    saved = _pipelines
+    _pipelines = {}
+    try:
+        yield _pipelines
+    finally:
+        _pipelines = saved
@@ -0,0 +1,397 @@
+"""
+A shared step cache over HTTP, and a small reference server for it.
+
+The protocol has two namespaces: ``cas`` holds file contents named by
+their SHA-256, ``ac`` holds the JSON action recorded for a step key
+(see :mod:`pygha.step_cache`)::
+
+    HEAD /cas/<sha256>      200 if present, 404 if not
+    GET  /cas/<sha256>      the blob
+    PUT  /cas/<sha256>      store a blob; 400 if the body has another hash
+    POST /cas/missing       JSON list of digests -> JSON list of the absent ones
+    HEAD|GET|PUT /ac/<key>  the same for actions
+
+Bodies are streamed in both directions with an explicit
+``Content-Length``, and connections are kept alive. :class:`RemoteCache`
+is the client :class:`~pygha.step_cache.StepCache` uses behind its local
+store: a local miss asks the server, downloading missing blobs
+concurrently over a small connection pool, and new results are uploaded
+after checking in one request which blobs the server already has.
+
+``pygha cache serve`` runs :func:`serve`, a threaded server backed by a
+size-bounded store with the same layout as the local one. It has no
+authentication and is meant for localhost and trusted networks.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .step_cache import DEFAULT_MAX_SIZE, StepCache, action_files
+
+_CHUNK = 1 << 16
+_NAME = re.compile(r"[0-9a-f]{64}\Z")
+_MAX_BATCH = 10_000
+"""Most digests accepted by one ``/cas/missing`` request."""
+
+_UPLOAD_GRACE = 600.0
+"""Seconds a blob may wait for the action that references it before pruning can delete it."""
+
+
+class RemoteCacheError(OSError):
+    """The cache server could not be reached or answered unexpectedly."""
+
+
+class RemoteCache:
+    """
+    Client for the remote cache protocol.
+
+    Args:
+        url: Base URL of the server, e.g. ``http://127.0.0.1:8765``.
+        max_connections: Size of the connection pool, which also bounds
+            how many transfers run at once.
+        timeout: Socket timeout in seconds.
+    """
+
+    def __init__(self, url: str, max_connections: int = 8, timeout: float = 30.0):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"remote cache URL must be http(s)://host[:port][/path], got {url!r}")
+        self.url = url
+        self.max_connections = max_connections
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return cls(self._host, self._port, timeout=self._timeout)
+
+    @contextmanager
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | Iterable[bytes] | None = None,
+        length: int | None = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """
+        Send one request over a pooled connection and yield the response.
+
+        The body of the response must be consumed inside the ``with``
+        block; the connection then goes back to the pool.
+        """
+        headers = {}
+        if body is not None:
+            headers["Content-Length"] = str(len(body) if isinstance(body, bytes) else length)
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._connect()
+                reused = False
+
+            while True:
+                try:
+                    conn.request(method, self._prefix + path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    break
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    conn.close()
+                    # A kept-alive connection the server already closed: retry once,
+                    # unless the body was a stream we cannot replay
+                    if not reused or not (body is None or isinstance(body, bytes)):
+                        raise RemoteCacheError(f"{method} {path}: connection lost") from None
+                    conn, reused = self._connect(), False
+                except OSError as exc:
+                    conn.close()
+                    raise RemoteCacheError(f"{method} {path}: {exc}") from exc
+
+            try:
+                yield response
+                response.read()  # drain anything left so the connection can be reused
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    @staticmethod
+    def _check(response: http.client.HTTPResponse, method: str, path: str) -> None:
+        if response.status >= 300:
+            raise RemoteCacheError(f"{method} {path}: HTTP {response.status} {response.reason}")
+
+    def has(self, digest: str) -> bool:
+        with self._request("HEAD", f"/cas/{digest}") as response:
+            if response.status == 404:
+                return False
+            self._check(response, "HEAD", f"/cas/{digest}")
+            return True
+
+    def missing(self, digests: Iterable[str]) -> set[str]:
+        """Which of ``digests`` the server does not have, in batched requests."""
+        wanted = sorted(set(digests))
+        absent: set[str] = set()
+        for start in range(0, len(wanted), _MAX_BATCH):
+            body = json.dumps(wanted[start : start + _MAX_BATCH]).encode("utf-8")
+            with self._request("POST", "/cas/missing", body) as response:
+                self._check(response, "POST", "/cas/missing")
+                absent.update(json.loads(response.read()))
+        return absent
+
+    def download(self, digest: str, dest: Path) -> bool:
+        """Stream a blob into ``dest`` (atomically, hash-checked); False if absent."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with self._request("GET", f"/cas/{digest}") as response:
+            if response.status == 404:
+                return False
+            self._check(response, "GET", f"/cas/{digest}")
+            fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+            try:
+                h = hashlib.sha256()
+                with os.fdopen(fd, "wb") as out:
+                    while chunk := response.read(_CHUNK):
+                        h.update(chunk)
+                        out.write(chunk)
+                if h.hexdigest() != digest:
+                    raise RemoteCacheError(f"GET /cas/{digest}: content does not match its hash")
+                os.replace(tmp, dest)
+            finally:
+                Path(tmp).unlink(missing_ok=True)
+        return True
+
+    def upload(self, digest: str, source: Path) -> None:
+        """Stream the file ``source`` to the server as blob ``digest``."""
+        size = source.stat().st_size
+        with source.open("rb") as f:
+            chunks = iter(lambda: f.read(_CHUNK), b"")
+            with self._request("PUT", f"/cas/{digest}", chunks, length=size) as response:
+                self._check(response, "PUT", f"/cas/{digest}")
+
+    def get_action(self, key: str) -> bytes | None:
+        with self._request("GET", f"/ac/{key}") as response:
+            if response.status == 404:
+                return None
+            self._check(response, "GET", f"/ac/{key}")
+            return response.read()
+
+    def put_action(self, key: str, data: bytes) -> None:
+        with self._request("PUT", f"/ac/{key}", data) as response:
+            self._check(response, "PUT", f"/ac/{key}")
+
+    def _parallel(
+        self, work: Callable[[tuple[str, Path]], object], items: list[tuple[str, Path]]
+    ) -> None:
+        if len(items) <= 1:
+            for item in items:
+                work(item)
+            return
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(self.max_connections, len(items))) as pool:
+            for _ in pool.map(work, items):
+                pass
+
+    def download_many(self, items: list[tuple[str, Path]]) -> None:
+        """Download ``(digest, dest)`` pairs concurrently; raise if one is absent."""
+
+        def fetch(item: tuple[str, Path]) -> None:
+            if not self.download(*item):
+                raise RemoteCacheError(f"GET /cas/{item[0]}: not found")
+
+        self._parallel(fetch, items)
+
+    def upload_many(self, items: list[tuple[str, Path]]) -> None:
+        """Upload ``(digest, source)`` pairs concurrently."""
+        self._parallel(lambda item: self.upload(*item), items)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# --- Reference server ---
+
+
+def _valid_action(path: Path) -> bool:
+    """Whether the uploaded file is an action record that the store can scan."""
+    try:
+        return action_files(json.loads(path.read_bytes())) is not None
+    except ValueError:
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server: "CacheServer"
+
+    def log_message(self, format: str, *args: object) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _target(self) -> Path | None:
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or not _NAME.match(parts[1]):
+            return None
+        store = self.server.store
+        if parts[0] == "cas":
+            return store.object_path(parts[1])
+        if parts[0] == "ac":
+            return store.action_path(parts[1])
+        return None
+
+    def _reply(
+        self, status: int, body: bytes = b"", content_type: str = "application/json"
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        path = self._target()
+        try:
+            f = path.open("rb") if path is not None else None
+        except OSError:
+            f = None
+        if f is None:
+            self._reply(404)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            if self.command == "GET":
+                shutil.copyfileobj(f, self.wfile, _CHUNK)
+        if path is not None and path.parent.name == "actions":
+            os.utime(path)  # recently used, for LRU eviction
+
+    def do_PUT(self) -> None:
+        path = self._target()
+        length = int(self.headers.get("Content-Length", "-1"))
+        if path is None or length < 0:
+            self.close_connection = True
+            self._reply(400)
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            h = hashlib.sha256()
+            with os.fdopen(fd, "wb") as out:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(_CHUNK, remaining))
+                    if not chunk:
+                        raise ConnectionError("request body ended early")
+                    h.update(chunk)
+                    out.write(chunk)
+                    remaining -= len(chunk)
+            if (
+                path.parent.parent.name == "objects"
+                and h.hexdigest() != path.parent.name + path.name
+            ):
+                self._reply(400, b'"content does not match its hash"')
+                return
+            if path.parent.name == "actions" and not _valid_action(Path(tmp)):
+                self._reply(400, b'"not a valid action record"')
+                return
+            os.replace(tmp, path)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        self._reply(201)
+        self.server.added(length)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/cas/missing":
+            self._reply(404)
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            digests = json.loads(self.rfile.read(length))
+            valid = isinstance(digests, list) and len(digests) <= _MAX_BATCH
+            valid = valid and all(isinstance(d, str) and _NAME.match(d) for d in digests)
+        except ValueError:
+            valid = False
+        if not valid:
+            self._reply(400)
+            return
+        store = self.server.store
+        absent = [d for d in digests if not store.object_path(d).is_file()]
+        self._reply(200, json.dumps(absent).encode("utf-8"))
+
+
+class CacheServer(ThreadingHTTPServer):
+    """The reference cache server; ``store`` is pruned as uploads come in."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        directory: Path,
+        max_size: int = DEFAULT_MAX_SIZE,
+        verbose: bool = False,
+    ):
+        self.store = StepCache(directory, max_size=max_size)
+        self.verbose = verbose
+        self._pending = 0
+        self._lock = threading.Lock()
+        super().__init__(address, _Handler)
+
+    def added(self, size: int) -> None:
+        """Account for an upload; prune once another 5% of the bound has arrived."""
+        with self._lock:
+            self._pending += size
+            if self._pending < self.store.max_size // 20:
+                return
+            self._pending = 0
+        # Clients upload blobs before the action, so leave recent ones alone
+        self.store.prune(keep_newer_than=time.time() - _UPLOAD_GRACE)
+
+
+def serve(
+    directory: Path,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    max_size: int = DEFAULT_MAX_SIZE,
+) -> int:
+    """Run the reference server in the foreground until interrupted."""
+    with CacheServer((host, port), directory, max_size, verbose=True) as server:
+        print(
+            f"[pygha] Serving the step cache in {directory} on http://{host}:{server.server_port}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
@@ -0,0 +1,181 @@
+"""
+Resource-aware admission of ready jobs in local runs.
+
+Jobs declare what they need with ``@job(cpus=..., memory=...,
+exclusive_group=...)``. A :class:`ResourcePool` holds the jobs whose
+dependencies have succeeded and decides which of them may start given
+what the running jobs already hold:
+
+* CPUs and memory are tokens drawn from a :class:`Capacity`, by default
+  the machine's (:func:`machine_capacity`).
+* At most one job of each ``exclusive_group`` runs at a time, e.g. all
+  jobs that share one local database.
+
+Among the ready jobs that fit, those with the best rank start first
+(the runners rank by ``priority``, then by the remaining critical path
+from the timing history, see :mod:`pygha.history`). Within a rank the
+largest job starts first (best fit), so big jobs are not crowded out by a
+stream of small ones, and then the earliest in execution order. A job that needs more than the whole
+machine is clamped to it and runs alone instead of waiting forever. If a
+larger job has been passed over for as many starts as the machine has
+CPUs, nothing else starts until it fits.
+
+Ready jobs are bucketed by their demand, so choosing one costs a pass
+over the distinct demands, not over every ready job.
+"""
+
+import heapq
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .models import Job
+
+_MILLI = 1000
+"""CPUs are counted in thousandths, so fractional requests add up exactly."""
+
+
+@dataclass(frozen=True, slots=True)
+class Capacity:
+    """What a local run may use at once."""
+
+    cpus: float
+    memory: int | None = None
+    """Bytes of memory, or None to not account for memory."""
+
+
+def machine_capacity() -> Capacity:
+    """The CPUs this process may run on and the physical memory of the machine."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        cpus = os.cpu_count() or 1
+    try:
+        memory: int | None = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        memory = None
+    return Capacity(cpus, memory if memory and memory > 0 else None)
+
+
+@dataclass(frozen=True, slots=True)
+class _Demand:
+    cpus: int
+    """In thousandths of a CPU."""
+
+    memory: int
+    group: str | None
+
+
+class ResourcePool:
+    """
+    Ready jobs waiting to start, and the resources held by running jobs.
+
+    Args:
+        capacity: What running jobs may hold in total; None to only
+            enforce exclusive groups.
+    """
+
+    def __init__(self, capacity: Capacity | None = None):
+        self.capacity = capacity
+        self._cpus = int(capacity.cpus * _MILLI) if capacity is not None else 0
+        self._memory = capacity.memory if capacity is not None else None
+        self._free_cpus = self._cpus
+        self._free_memory = self._memory or 0
+        self._groups: set[str] = set()
+        self._held: dict[str, _Demand] = {}
+        self._queues: dict[_Demand, list[tuple[tuple[float, ...], int, int, Job]]] = {}
+        self._pushed = 0
+        self._passed = 0
+        self._reserved: _Demand | None = None
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _demand(self, job: "Job") -> _Demand:
+        if self.capacity is None:
+            return _Demand(0, 0, job.exclusive_group)
+        # Clamped to the machine, so an over-sized job runs alone instead of never
+        cpus = min(max(int(job.cpus * _MILLI), 0), self._cpus)
+        memory = min(job.memory, self._memory) if self._memory is not None else 0
+        return _Demand(cpus, memory, job.exclusive_group)
+
+    def _fits(self, demand: _Demand) -> bool:
+        return self._resources_fit(demand) and demand.group not in self._groups
+
+    def _resources_fit(self, demand: _Demand) -> bool:
+        return demand.cpus <= self._free_cpus and demand.memory <= self._free_memory
+
+    def push(self, job: "Job", position: int, rank: tuple[float, ...] = ()) -> None:
+        """
+        Add a ready job. Lower ``rank`` tuples start first, then larger
+        jobs, then lower ``position`` (the job's place in execution order).
+        """
+        self._pushed += 1
+        queue = self._queues.setdefault(self._demand(job), [])
+        heapq.heappush(queue, (rank, position, self._pushed, job))
+
+    def _best_fit(self) -> _Demand | None:
+        best: _Demand | None = None
+        best_key: tuple[tuple[float, ...], int, int, int] | None = None
+        for demand, queue in self._queues.items():
+            if not queue or not self._fits(demand):
+                continue
+            rank, position = queue[0][:2]
+            key = (rank, -demand.cpus, -demand.memory, position)
+            if best_key is None or key < best_key:
+                best, best_key = demand, key
+        return best
+
+    def pop(self) -> "Job | None":
+        """Take the ready job to start next, reserving its resources; None if none fits."""
+        if self._reserved is not None and not self._queues.get(self._reserved):
+            self._reserved = None
+        if self._reserved is not None:
+            chosen = self._reserved if self._fits(self._reserved) else None
+        else:
+            chosen = self._best_fit()
+        if chosen is None:
+            return None
+        self._note_passed(chosen)
+
+        queue = self._queues[chosen]
+        job = heapq.heappop(queue)[3]
+        if not queue:
+            del self._queues[chosen]
+        self._free_cpus -= chosen.cpus
+        self._free_memory -= chosen.memory
+        if chosen.group is not None:
+            self._groups.add(chosen.group)
+        self._held[job.name] = chosen
+        return job
+
+    def _note_passed(self, chosen: _Demand) -> None:
+        """Count starts that overtook a larger job, and reserve for it when too many did."""
+        if chosen == self._reserved:
+            self._reserved = None
+            self._passed = 0
+            return
+        blocked = [
+            d
+            for d, queue in self._queues.items()
+            if queue
+            and not self._resources_fit(d)
+            and (d.cpus, d.memory) > (chosen.cpus, chosen.memory)
+        ]
+        if not blocked:
+            self._passed = 0
+            return
+        self._passed += 1
+        if self._passed >= max(1, self._cpus // _MILLI):
+            self._reserved = max(blocked, key=lambda d: (d.cpus, d.memory))
+
+    def release(self, job: "Job") -> None:
+        """Give back what a finished job held."""
+        demand = self._held.pop(job.name, None)
+        if demand is None:
+            return
+        self._free_cpus += demand.cpus
+        self._free_memory += demand.memory
+        if demand.group is not None:
+            self._groups.discard(demand.group)
@@ -0,0 +1,483 @@
+"""
+Local execution of pipelines.
+
+:class:`LocalRunner` runs the jobs of a pipeline on a pool of worker
+threads. A job starts as soon as every job it depends on has succeeded,
+so independent chains overlap instead of advancing level by level. The
+steps of a job run in order through :meth:`Step.execute`, which receives
+the job's :class:`JobContext`.
+
+The first failure stops the run: no further jobs are started, and jobs
+that are still running are cancelled -- between two steps, or by
+terminating the command a step is waiting on. Steps fail by raising one
+of :data:`STEP_FAILURES`; any other exception is a bug in the step and
+ends the run with its traceback.
+"""
+
+import heapq
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from subprocess import SubprocessError
+from typing import TYPE_CHECKING, Literal, Protocol, Self
+
+from . import trace
+from .models import Job, Pipeline, Step
+
+if TYPE_CHECKING:
+    from subprocess import Popen
+
+    from .resources import Capacity
+    from .step_cache import StepCache
+    from .usage import ResourceUsage
+
+JobStatus = Literal["success", "failed", "cancelled", "skipped"]
+
+_output_lock = threading.Lock()
+
+
+def _emit(line: str) -> None:
+    """Write one line to stdout without interleaving it with other jobs' lines."""
+    with _output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+STEP_FAILURES = (SubprocessError, OSError, RuntimeError, ValueError)
+"""
+What a failing step raises: a command that exited non-zero or could not
+be started, a timeout, or an error of the step's own.
+"""
+
+NEW_SESSION = hasattr(os, "killpg")
+"""Whether commands are started in their own session (POSIX), see terminate_group()."""
+
+
+class _Process(Protocol):
+    @property
+    def pid(self) -> int: ...
+
+    @property
+    def returncode(self) -> int | None: ...
+
+    def terminate(self) -> None: ...
+
+
+def terminate_group(proc: _Process) -> None:
+    """Send SIGTERM to a command started by a runner, and to its children on POSIX."""
+    if proc.returncode is not None:
+        return
+    try:
+        if NEW_SESSION:
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job when the run it belongs to has been cancelled.
+
+    Like :class:`asyncio.CancelledError` this is not an :class:`Exception`,
+    so steps that catch ``Exception`` to report their own errors do not
+    turn a cancellation into a failure.
+    """
+
+
+@dataclass(slots=True)
+class StepResult:
+    """The outcome of one step that was started."""
+
+    label: str
+    """The step's name, or its 1-based position in the job."""
+
+    status: JobStatus
+    duration: float
+    returncode: int | None = None
+    """Exit status of a failed command step; None when not known."""
+
+    cached: bool = False
+    """True if the step was skipped and its outputs restored from the step cache."""
+
+    usage: "ResourceUsage | None" = None
+    """What the commands the step ran used in total (see pygha.usage); None when not known."""
+
+
+@dataclass(slots=True)
+class JobResult:
+    """The outcome of one job in a local run."""
+
+    name: str
+    status: JobStatus
+    duration: float = 0.0
+    """Wall time in seconds; 0 for jobs that never started."""
+
+    error: str | None = None
+    """Why the job failed, for ``status == "failed"``."""
+
+    steps: list[StepResult] = field(default_factory=list)
+    """One entry per step that was started, in order."""
+
+
+def step_label(step: Step, index: int) -> str:
+    return step.name or str(index)
+
+
+class _UsageSink(Protocol):
+    usage: "ResourceUsage | None"
+
+
+class _StepTimer:
+    """
+    Records a :class:`StepResult` for the step run inside the ``with``
+    block, with the resource usage the job's context collected meanwhile.
+    """
+
+    __slots__ = ("_context", "_results", "_started", "cached", "label")
+
+    def __init__(self, results: list[StepResult], label: str, context: _UsageSink):
+        self._results = results
+        self._context = context
+        self.label = label
+        self.cached = False
+        self._started = 0.0
+
+    def __enter__(self) -> Self:
+        self._context.usage = None
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: object, exc: BaseException | None, tb: object) -> None:
+        status: JobStatus = "success"
+        if exc is not None:
+            # JobCancelled, asyncio.CancelledError and Ctrl-C are not Exceptions
+            status = "failed" if isinstance(exc, Exception) else "cancelled"
+        returncode = getattr(exc, "returncode", None)
+        duration = time.perf_counter() - self._started
+        usage = self._context.usage
+        self._results.append(
+            StepResult(self.label, status, duration, returncode, self.cached, usage)
+        )
+
+
+@dataclass(slots=True)
+class RunResult:
+    """The outcome of a local run, with one result per job in execution order."""
+
+    jobs: dict[str, JobResult]
+    duration: float
+
+    @property
+    def ok(self) -> bool:
+        return all(result.status == "success" for result in self.jobs.values())
+
+    def count(self, status: JobStatus) -> int:
+        return sum(1 for result in self.jobs.values() if result.status == status)
+
+
+class JobContext:
+    """
+    The ``context`` passed to :meth:`Step.execute` by :class:`LocalRunner`.
+
+    Steps that start external commands should use :meth:`run_command`,
+    which prefixes their output with the job name, stops them when the
+    run is cancelled and accounts for their resource usage.
+    """
+
+    __slots__ = ("_lock", "_procs", "cancelled", "job", "usage")
+
+    def __init__(self, job: Job, cancelled: threading.Event):
+        self.job = job
+        self.cancelled = cancelled
+        self.usage: ResourceUsage | None = None
+        """What the commands of the current step have used so far."""
+        self._lock = threading.Lock()
+        self._procs: set[Popen[str]] = set()
+
+    def check(self) -> None:
+        """Raise :class:`JobCancelled` if the run has been cancelled."""
+        if self.cancelled.is_set():
+            raise JobCancelled(self.job.name)
+
+    def log(self, message: str) -> None:
+        _emit(f"[{self.job.name}] {message}")
+
+    def run_command(self, argv: list[str]) -> int:
+        """Run ``argv`` to completion, streaming its output; return the exit code."""
+        import subprocess  # nosec B404: argv-only, never a shell
+
+        from .usage import wait
+
+        with self._lock:
+            # Checked under the lock so cancel() either sees the process or we see the flag
+            self.check()
+            proc = subprocess.Popen(  # nosec B603
+                argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                # Own process group, so cancelling also stops the command's children
+                start_new_session=NEW_SESSION,
+            )
+            self._procs.add(proc)
+        try:
+            assert proc.stdout is not None  # nosec B101: set by stdout=PIPE
+            for line in proc.stdout:
+                self.log(line.rstrip("\n"))
+            returncode, usage = wait(proc)
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        if usage is not None:
+            with self._lock:
+                self.usage = usage if self.usage is None else self.usage + usage
+
+        if returncode != 0 and self.cancelled.is_set():
+            raise JobCancelled(self.job.name)
+        return returncode
+
+    def cancel(self) -> None:
+        """Terminate the commands this job is running (the run must already be cancelled)."""
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            terminate_group(proc)
+
+
+def _estimates(pipeline: Pipeline, order: list[Job]) -> tuple[dict[str, float], dict[str, float]]:
+    """Each job's estimate and its remaining critical path; empty without any estimates."""
+    known = [job.estimate for job in order if job.estimate is not None]
+    if not known:
+        return {}, {}
+    from .graph import critical_path
+
+    # Jobs never timed count as an average one
+    default = sum(known) / len(known)
+    estimate = {job.name: default if job.estimate is None else job.estimate for job in order}
+    return estimate, critical_path(pipeline, estimate).remaining
+
+
+def _format_eta(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}m {seconds:02d}s"
+
+
+class _Schedule:
+    """
+    Dependency and resource bookkeeping shared by the runners: which jobs
+    may start next (see :class:`~pygha.resources.ResourcePool`).
+
+    Ready jobs are ranked by ``priority``, then by the longest chain of
+    estimated work (:attr:`Job.estimate`) from the job to the end of the
+    pipeline, so long chains start early while parallelism is bounded.
+    """
+
+    def __init__(self, pipeline: Pipeline, capacity: "Capacity | None" = None):
+        from .resources import ResourcePool
+
+        self.order = pipeline.get_job_order()
+        self.position = {job.name: i for i, job in enumerate(self.order)}
+        self._waiting = {job.name: len(set(job.depends_on or ())) for job in self.order}
+        self._dependents: dict[str, list[str]] = {job.name: [] for job in self.order}
+        for job in self.order:
+            for dep in set(job.depends_on or ()):
+                self._dependents[dep].append(job.name)
+        self._estimate, self._remaining = _estimates(pipeline, self.order)
+        self._started: dict[str, float] = {}
+        self._finished: set[str] = set()
+        self.lane: dict[str, int] = {}
+        """Running job -> the smallest trace lane free when it started."""
+        self._free_lanes: list[int] = []
+
+        # Ties are broken in execution order, so output is reproducible with -j 1
+        self._ready = ResourcePool(capacity)
+        for job in self.order:
+            if self._waiting[job.name] == 0:
+                self._push(job)
+
+    def _push(self, job: Job) -> None:
+        rank = (-job.priority, -self._remaining.get(job.name, 0.0))
+        self._ready.push(job, self.position[job.name], rank)
+
+    def pop_ready(self) -> Job | None:
+        """The next job whose dependencies have succeeded and whose resources are free."""
+        job = self._ready.pop()
+        if job is not None:
+            self._started[job.name] = time.perf_counter()
+            lanes = self._free_lanes
+            self.lane[job.name] = heapq.heappop(lanes) if lanes else len(self.lane) + 1
+        return job
+
+    def finished(self, name: str) -> None:
+        """Release the resources of a job that ended, whatever its status."""
+        self._ready.release(self.order[self.position[name]])
+        self._started.pop(name, None)
+        self._finished.add(name)
+        heapq.heappush(self._free_lanes, self.lane.pop(name))
+
+    def succeeded(self, name: str) -> None:
+        for child in self._dependents[name]:
+            self._waiting[child] -= 1
+            if self._waiting[child] == 0:
+                self._push(self.order[self.position[child]])
+
+    def progress(self, workers: int) -> str | None:
+        """
+        A ``done/total`` line with the expected time left, or None without
+        estimates. The time left is the longer of the remaining critical
+        path and the remaining work spread over ``workers``.
+        """
+        if not self._estimate or len(self._finished) == len(self.order):
+            return None
+        now = time.perf_counter()
+        chain = work = 0.0
+        for job in self.order:
+            if job.name in self._finished:
+                continue
+            cost = self._estimate[job.name]
+            left = cost
+            if job.name in self._started:
+                left = max(cost - (now - self._started[job.name]), 0.0)
+            chain = max(chain, left + self._remaining[job.name] - cost)
+            work += left
+        eta = max(chain, work / workers)
+        return f"{len(self._finished)}/{len(self.order)} jobs done, about {_format_eta(eta)} left"
+
+    def result(self, results: dict[str, JobResult], duration: float) -> RunResult:
+        """Results in execution order; jobs that never started count as skipped."""
+        jobs = {
+            job.name: results.get(job.name) or JobResult(job.name, "skipped") for job in self.order
+        }
+        return RunResult(jobs=jobs, duration=duration)
+
+
+class LocalRunner:
+    """
+    Runs a pipeline's jobs locally, in dependency order.
+
+    Args:
+        pipeline: The pipeline to run. It is validated first; an invalid
+            job graph raises :class:`~pygha.graph.InvalidPipelineError`.
+        jobs: How many jobs may run at the same time.
+        cache: Skip steps whose result is in this step cache, and store
+            the results of the others.
+        capacity: Only start jobs whose ``cpus`` and ``memory`` fit in what
+            the running jobs leave of this; None to only limit by ``jobs``.
+            Exclusive groups are always honoured.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        jobs: int = 1,
+        cache: "StepCache | None" = None,
+        capacity: "Capacity | None" = None,
+    ):
+        if jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {jobs}")
+        self.pipeline = pipeline
+        self.jobs = jobs
+        self.cache = cache
+        self.capacity = capacity
+
+    def run(self) -> RunResult:
+        """Run every job and return their results; stops at the first failure."""
+        from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+        started = time.perf_counter()
+        schedule = _Schedule(self.pipeline, self.capacity)
+        cancelled = threading.Event()
+        contexts: dict[str, JobContext] = {}
+        running: dict[Future[JobResult], str] = {}
+        results: dict[str, JobResult] = {}
+
+        def cancel_running() -> None:
+            cancelled.set()
+            for name in running.values():
+                contexts[name].cancel()
+
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="pygha-job") as pool:
+
+            def launch() -> None:
+                # Only as many jobs as there are workers are submitted, so a
+                # cancelled run never has queued jobs left to start
+                while len(running) < self.jobs and not cancelled.is_set():
+                    job = schedule.pop_ready()
+                    if job is None:
+                        break
+                    contexts[job.name] = JobContext(job, cancelled)
+                    lane = schedule.lane[job.name]
+                    running[pool.submit(self._run_job, contexts[job.name], lane)] = job.name
+
+            try:
+                launch()
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in sorted(done, key=lambda f: schedule.position[running[f]]):
+                        name = running.pop(future)
+                        result = results[name] = future.result()
+                        schedule.finished(name)
+                        if result.status == "success":
+                            schedule.succeeded(name)
+                        elif not cancelled.is_set():
+                            cancel_running()
+                    launch()
+                    if not cancelled.is_set() and (line := schedule.progress(self.jobs)):
+                        _emit(f"[pygha] {line}")
+            except BaseException:
+                # Ctrl-C while waiting: stop the jobs before the pool joins them
+                cancel_running()
+                raise
+
+        return schedule.result(results, time.perf_counter() - started)
+
+    def _run_job(self, context: JobContext, lane: int) -> JobResult:
+        job = context.job
+        cache = self.cache
+        with trace.span(job.name, "job", lane=lane):
+            started = time.perf_counter()
+            context.log("started")
+            status: JobStatus = "success"
+            error = None
+            steps: list[StepResult] = []
+            try:
+                for index, step in enumerate(job.steps, start=1):
+                    context.check()
+                    label = step_label(step, index)
+                    with (
+                        _StepTimer(steps, label, context) as timer,
+                        trace.span(f"{job.name}/{label}", "step", lane=lane),
+                    ):
+                        key = cache.key(step) if cache is not None else None
+                        if key is not None and cache is not None and cache.restore(key):
+                            timer.cached = True
+                            context.log(f"step {timer.label}: restored from cache")
+                            continue
+                        step.execute(context)
+                        if key is not None and cache is not None and not cache.store(key, step):
+                            context.log(f"step {timer.label}: not cached, an output is missing")
+            except JobCancelled:
+                status = "cancelled"
+            except STEP_FAILURES as exc:
+                status = "failed"
+                error = str(exc) or type(exc).__name__
+            except Exception as exc:
+                context.log(f"\033[91mstep raised {type(exc).__name__}, stopping the run\033[0m")
+                raise
+            duration = time.perf_counter() - started
+
+            if status == "failed":
+                context.log(f"\033[91mfailed after {duration:.1f}s: {error}\033[0m")
+            else:
+                context.log(f"{status} after {duration:.1f}s")
+        return JobResult(job.name, status, duration, error, steps)
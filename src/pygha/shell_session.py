@@ -0,0 +1,117 @@
+"""
+A long-lived ``bash`` process that runs the shell steps of one job.
+
+Starting a fresh process for every step costs a fork/exec and shell
+start-up each time, and loses ``export``/``cd`` between steps. With
+``pygha run --shell-session`` each job instead gets one
+:class:`BashSession`; every step's script is written to the session's
+stdin, followed by a line that prints a random sentinel and the script's
+exit status. Reading the output up to that sentinel gives the step's own
+output and exit code, while variables, the working directory and shell
+functions carry over to the next step.
+
+Like GitHub's ``bash -eo pipefail``, every script runs with ``errexit``
+and ``pipefail``: the first failing command fails the step. Since the
+script runs in the session's own shell, that failure (or an ``exit``)
+ends the session; the step gets bash's exit status and the next step
+starts a fresh session. A script can opt out with ``set +e``.
+"""
+
+import asyncio
+import secrets
+import shlex
+import shutil
+from collections.abc import Awaitable, Callable
+
+from .runner import NEW_SESSION, terminate_group
+
+_LINE_LIMIT = 1 << 20
+
+
+class BashSession:
+    """
+    One ``bash`` process fed scripts over stdin.
+
+    Args:
+        on_line: Called with every output line of every script, in order.
+    """
+
+    def __init__(self, on_line: Callable[[str], Awaitable[None]]):
+        self._on_line = on_line
+        self._proc: asyncio.subprocess.Process | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def _start(self) -> asyncio.subprocess.Process:
+        bash = shutil.which("bash")
+        if bash is None:
+            raise RuntimeError("--shell-session needs bash, which was not found on PATH")
+        proc = await asyncio.create_subprocess_exec(
+            bash,
+            "--noprofile",
+            "--norc",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=_LINE_LIMIT,
+            start_new_session=NEW_SESSION,
+        )
+        assert proc.stdin is not None  # nosec B101: set by stdin=PIPE
+        proc.stdin.write(b"set -o pipefail\n")
+        return proc
+
+    async def run(self, script: str) -> int:
+        """Run ``script`` in the session and return its exit status."""
+        if not self.alive:
+            self._proc = await self._start()
+        proc = self._proc
+        assert proc is not None and proc.stdin is not None and proc.stdout is not None  # nosec B101
+
+        sentinel = f"__pygha_{secrets.token_hex(16)}__"
+        # eval keeps the script in this shell, so its state carries over;
+        # errexit is reset for every script, and ends the session when one
+        # fails; </dev/null stops commands from eating the following scripts
+        proc.stdin.write(
+            f"set -e; eval -- {shlex.quote(script)} </dev/null\n"
+            f"printf '%s %d\\n' {sentinel} $?\n".encode()
+        )
+        try:
+            await proc.stdin.drain()
+            async for raw in proc.stdout:
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                head, found, status = line.partition(sentinel + " ")
+                if found:
+                    # Output without a trailing newline shares the sentinel's line
+                    if head:
+                        await self._on_line(head)
+                    return int(status)
+                await self._on_line(line)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the script ended the session; its exit status is bash's
+        except BaseException:
+            # Timed out or cancelled mid-script: the session state is unknown
+            self.kill()
+            await proc.wait()
+            raise
+        return await proc.wait()
+
+    def kill(self) -> None:
+        if self._proc is not None:
+            terminate_group(self._proc)
+
+    async def close(self) -> None:
+        """End the session, giving bash a chance to exit on its own."""
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        assert proc.stdin is not None  # nosec B101
+        try:
+            proc.stdin.write(b"exit 0\n")
+            await proc.stdin.drain()
+            proc.stdin.close()
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            terminate_group(proc)
+            await proc.wait()
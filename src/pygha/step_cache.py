@@ -0,0 +1,489 @@
+"""
+Content-addressed cache of step results for ``pygha run``.
+
+A shell step that declares its ``inputs`` can be skipped when nothing it
+depends on changed::
+
+    shell("python -m build", inputs=["src/**", "pyproject.toml", "$SOURCE_DATE_EPOCH"],
+          outputs=["dist"])
+
+Inputs are file patterns (GitHub filter syntax, see :mod:`pygha.paths`)
+or ``$NAME`` environment variables. The step's key hashes the command,
+the declared outputs, the content of every matching input file and the
+values of the variables. After a successful run the files under
+``outputs`` are stored by content hash and recorded under the key; on a
+later run with the same key they are restored and the step is skipped.
+A step with inputs but no outputs (a test suite, a linter) is skipped
+when it already succeeded for the same inputs.
+
+Layout of the store (``<src-dir>/.pygha-cache/steps`` by default)::
+
+    objects/ab/cdef...   file contents, named by their SHA-256
+    actions/<key>.json   the output files of one step run
+
+Reading an action refreshes its modification time, which the
+size-bounded least-recently-used eviction in :meth:`StepCache.prune`
+goes by; objects no longer referenced by any action are deleted with it.
+
+The local store can sit in front of a shared remote cache, see
+:mod:`pygha.remote_cache`.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+from .paths import _literal_prefix, compile_glob
+
+if TYPE_CHECKING:
+    from .remote_cache import RemoteCache
+
+STEP_CACHE_DIR = Path(".pygha-cache") / "steps"
+"""Where the step cache lives, relative to ``--src-dir``."""
+
+DEFAULT_MAX_SIZE = 2 << 30
+"""Default size bound of the store, in bytes (2 GiB)."""
+
+_FORMAT = 1
+"""Bump when keys or the action layout change."""
+
+_DIGEST = re.compile(r"[0-9a-f]{64}\Z")
+"""A SHA-256 object name, as recorded in actions."""
+
+_SKIP_DIRS = frozenset({".git", ".hg", ".svn", ".pygha-cache", "__pycache__"})
+"""Directories never searched for input files."""
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as ``"500M"``, ``"2G"`` or ``"1048576"`` into bytes."""
+    value = text.strip().upper().removesuffix("B").removesuffix("I")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    try:
+        number = float(value[: len(value) - len(unit)])
+    except ValueError:
+        raise ValueError(f"invalid size: {text!r}") from None
+    if number < 0:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(number * _SIZE_UNITS[unit])
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    value = float(size)
+    for unit in ("KiB", "MiB", "GiB"):
+        value /= 1024
+        if value < 1024:
+            break
+    return f"{value:.1f} {unit}"
+
+
+def action_files(action: Any) -> list[tuple[PurePosixPath, str, int]] | None:
+    """
+    The ``(relative path, digest, mode)`` of every file of an action
+    record; None if it is malformed. Records may come from a shared remote
+    cache, so none of it is trusted: paths must be relative without
+    ``..``, digests must be object names, and modes are reduced to
+    permissions.
+    """
+    if not isinstance(action, dict) or action.get("format") != _FORMAT:
+        return None
+    files = action.get("files")
+    if not isinstance(files, list):
+        return None
+    checked = []
+    for f in files:
+        if not isinstance(f, dict):
+            return None
+        rel, digest, mode = f.get("path"), f.get("digest"), f.get("mode")
+        if not isinstance(rel, str) or not isinstance(digest, str) or type(mode) is not int:
+            return None
+        posix = PurePosixPath(rel.replace("\\", "/"))
+        if not rel or posix.is_absolute() or Path(rel).is_absolute() or ".." in posix.parts:
+            return None
+        if not _DIGEST.match(digest):
+            return None
+        checked.append((posix, digest, mode & 0o777))
+    return checked
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _walk(base: Path, root: Path) -> Iterator[str]:
+    """Relative POSIX paths of the files under ``base``."""
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+        rel = Path(dirpath).relative_to(root).as_posix()
+        prefix = "" if rel == "." else rel + "/"
+        for name in filenames:
+            yield prefix + name
+
+
+def expand_inputs(patterns: Iterable[str], root: Path) -> list[str]:
+    """
+    Return the files under ``root`` matched by ``patterns``, sorted.
+
+    Patterns use GitHub's filter syntax with last-match-wins ``!``
+    exclusions. A pattern naming a directory stands for everything in
+    it. Only the literal leading directories of a pattern are walked.
+    """
+    ordered = [p for p in patterns if not p.startswith("$")]
+    found: set[str] = set()
+    for pattern in ordered:
+        if pattern.startswith("!"):
+            continue
+        literal = root / pattern
+        if literal.is_file():
+            found.add(Path(pattern).as_posix())
+        elif literal.is_dir():
+            found.update(_walk(literal, root))
+        else:
+            base = root.joinpath(*_literal_prefix(pattern))
+            if base.is_dir():
+                regex = compile_glob(pattern)
+                found.update(f for f in _walk(base, root) if regex.match(f))
+
+    if any(p.startswith("!") for p in ordered):
+        regexes = [(compile_glob(p), p.startswith("!")) for p in ordered]
+        kept = set()
+        for f in found:
+            for regex, negated in reversed(regexes):
+                if regex.match(f):
+                    if not negated:
+                        kept.add(f)
+                    break
+            else:
+                kept.add(f)  # found through a literal directory pattern
+        found = kept
+    return sorted(found)
+
+
+def _output_files(outputs: Iterable[str], root: Path) -> list[str] | None:
+    """Every file under the declared outputs; None if one is missing."""
+    files: list[str] = []
+    for output in outputs:
+        path = root / output
+        if path.is_file():
+            files.append(Path(output).as_posix())
+        elif path.is_dir():
+            files.extend(_walk(path, root))
+        else:
+            return None
+    return sorted(set(files))
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """What ``pygha cache stats`` reports."""
+
+    entries: int
+    objects: int
+    size: int
+    """Total size of the stored objects, in bytes."""
+
+    max_size: int
+    oldest: float | None
+    """Last use of the least recently used entry (a timestamp), if any."""
+
+
+class StepCache:
+    """
+    Content-addressed store of step outputs.
+
+    Args:
+        directory: Where the store lives.
+        root: The directory input and output paths are relative to.
+        max_size: Size bound applied by :meth:`prune`, in bytes.
+        remote: A shared cache (see :mod:`pygha.remote_cache`) consulted on
+            local misses and sent every new result.
+
+    ``hits`` and ``misses`` count :meth:`restore` calls; ``remote_hits``
+    counts the hits that were fetched from ``remote``. The first error
+    talking to ``remote`` is kept in ``remote_error`` and turns the remote
+    tier off for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        root: Path | None = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        remote: "RemoteCache | None" = None,
+    ):
+        self.directory = directory
+        self.root = root or Path.cwd()
+        self.max_size = max_size
+        self.remote = remote
+        self.hits = 0
+        self.misses = 0
+        self.remote_hits = 0
+        self.remote_error: str | None = None
+        self._lock = threading.Lock()
+        self._digests: dict[str, tuple[int, int, str]] = {}
+
+    @property
+    def _objects(self) -> Path:
+        return self.directory / "objects"
+
+    @property
+    def _actions(self) -> Path:
+        return self.directory / "actions"
+
+    def object_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / digest[2:]
+
+    def action_path(self, key: str) -> Path:
+        return self._actions / f"{key}.json"
+
+    def _digest(self, rel: str) -> str:
+        """Content hash of a file under ``root``, memoized by size and mtime."""
+        path = self.root / rel
+        st = path.stat()
+        known = self._digests.get(rel)
+        if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+            return known[2]
+        digest = _sha256_file(path)
+        self._digests[rel] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def key(self, step: Any) -> str | None:
+        """The cache key of ``step``, or None if it declares no ``inputs``."""
+        inputs = tuple(getattr(step, "inputs", ()) or ())
+        if not inputs:
+            return None
+        outputs = tuple(getattr(step, "outputs", ()) or ())
+
+        h = hashlib.sha256()
+        header = {
+            "format": _FORMAT,
+            "platform": sys.platform,
+            "type": type(step).__qualname__,
+            "command": getattr(step, "command", ""),
+            "inputs": inputs,
+            "outputs": outputs,
+            "env": {
+                n[1:]: os.environ.get(n[1:]) for n in sorted(i for i in inputs if i[:1] == "$")
+            },
+        }
+        h.update(json.dumps(header, sort_keys=True).encode("utf-8"))
+        for rel in expand_inputs(inputs, self.root):
+            h.update(f"\0{rel}\0{self._digest(rel)}".encode())
+        return h.hexdigest()
+
+    def _read_action(self, key: str) -> dict[str, Any] | None:
+        path = self.action_path(key)
+        try:
+            action: dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(action, dict) or action.get("format") != _FORMAT:
+            return None
+        return action
+
+    def _write_action(self, key: str, data: bytes) -> None:
+        self._actions.mkdir(parents=True, exist_ok=True)
+        ignore = self.directory / ".gitignore"
+        if not ignore.exists():
+            ignore.write_text("# Created by pygha\n*\n", encoding="utf-8")
+        fd, tmp = tempfile.mkstemp(dir=self._actions, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.replace(tmp, self.action_path(key))
+
+    def _remote_failed(self, exc: Exception) -> None:
+        with self._lock:
+            if self.remote_error is None:
+                self.remote_error = str(exc) or type(exc).__name__
+            self.remote = None
+
+    def _fetch(self, key: str) -> dict[str, Any] | None:
+        """Copy an action and the objects it needs from the remote cache."""
+        remote = self.remote
+        if remote is None:
+            return None
+        try:
+            data = remote.get_action(key)
+            if data is None:
+                return None
+            action: dict[str, Any] = json.loads(data)
+            # A malformed or hostile record is a miss, not a broken remote
+            files = self._files(action)
+            if files is None:
+                return None
+            digests = {digest for _, digest, _ in files}
+            needed = [(d, self.object_path(d)) for d in sorted(digests)]
+            remote.download_many([(d, p) for d, p in needed if not p.is_file()])
+            self._write_action(key, data)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            self._remote_failed(exc)
+            return None
+        with self._lock:
+            self.remote_hits += 1
+        return action
+
+    def _push(self, key: str, data: bytes, digests: set[str]) -> None:
+        remote = self.remote
+        if remote is None:
+            return
+        try:
+            # Only ever upload what was asked about, whatever the server answers
+            missing = remote.missing(digests) & digests
+            remote.upload_many([(d, self.object_path(d)) for d in sorted(missing)])
+            # The action goes last, so nobody sees it before its objects
+            remote.put_action(key, data)
+        except (OSError, ValueError, TypeError) as exc:
+            # ValueError, TypeError: a reply that is not the JSON the protocol promises
+            self._remote_failed(exc)
+
+    def _files(self, action: Any) -> list[tuple[Path, str, int]] | None:
+        """
+        The ``(target, digest, mode)`` of every file of an action; None if
+        the record is malformed (see :func:`action_files`) or a target,
+        through a symlink, resolves outside ``root``.
+        """
+        files = action_files(action)
+        if files is None:
+            return None
+        root = self.root.resolve()
+        targets = [(self.root / rel, digest, mode) for rel, digest, mode in files]
+        if not all(target.resolve().is_relative_to(root) for target, _, _ in targets):
+            return None
+        return targets
+
+    def restore(self, key: str) -> bool:
+        """Restore the outputs recorded under ``key``; False on a miss."""
+        action = self._read_action(key) or self._fetch(key)
+        files = self._files(action)
+        if files is None or not all(self.object_path(d).is_file() for _, d, _ in files):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        for target, digest, mode in files:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(self.object_path(digest), tmp)
+                os.chmod(tmp, mode)
+                os.replace(tmp, target)
+            except OSError:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        # Mark as recently used for LRU eviction
+        os.utime(self.action_path(key))
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, step: Any) -> bool:
+        """Record the outputs of a step that just succeeded; False if one is missing."""
+        files = _output_files(getattr(step, "outputs", ()) or (), self.root)
+        if files is None:
+            return False
+
+        recorded: list[dict[str, Any]] = []
+        for rel in files:
+            path = self.root / rel
+            digest = _sha256_file(path)
+            obj = self.object_path(digest)
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=obj.parent, suffix=".tmp")
+                os.close(fd)
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, obj)
+            recorded.append({"path": rel, "digest": digest, "mode": path.stat().st_mode & 0o777})
+
+        action = {
+            "format": _FORMAT,
+            "command": getattr(step, "command", ""),
+            "created": time.time(),
+            "files": recorded,
+        }
+        data = json.dumps(action).encode("utf-8")
+        self._write_action(key, data)
+        self._push(key, data, {f["digest"] for f in recorded})
+        return True
+
+    def _scan(self) -> tuple[list[tuple[float, Path, set[str]]], dict[str, int]]:
+        """Actions (last use, path, object digests) and object sizes."""
+        actions = []
+        for path in self._actions.glob("*.json") if self._actions.is_dir() else ():
+            try:
+                files = action_files(json.loads(path.read_text(encoding="utf-8")))
+                used = path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            if files is not None:
+                actions.append((used, path, {digest for _, digest, _ in files}))
+        objects = {}
+        for path in self._objects.glob("*/*") if self._objects.is_dir() else ():
+            if path.suffix != ".tmp":
+                objects[path.parent.name + path.name] = path.stat().st_size
+        return actions, objects
+
+    def stats(self) -> CacheStats:
+        actions, objects = self._scan()
+        oldest = min((used for used, _, _ in actions), default=None)
+        return CacheStats(len(actions), len(objects), sum(objects.values()), self.max_size, oldest)
+
+    def prune(
+        self, max_size: int | None = None, keep_newer_than: float | None = None
+    ) -> tuple[int, int]:
+        """
+        Evict least recently used entries until the store fits ``max_size``.
+
+        Objects no longer referenced by any entry are deleted as well,
+        except those modified after the ``keep_newer_than`` timestamp,
+        which may belong to an entry still being written.
+        Returns ``(entries removed, bytes freed)``.
+        """
+        limit = self.max_size if max_size is None else max_size
+        actions, objects = self._scan()
+        actions.sort(key=lambda a: a[0], reverse=True)  # most recently used first
+
+        # Keep entries, newest first, while the objects they need fit the budget
+        kept: set[str] = set()
+        size = 0
+        removed = 0
+        for _, path, digests in actions:
+            extra = sum(objects.get(d, 0) for d in digests - kept)
+            if size + extra <= limit:
+                kept |= digests
+                size += extra
+            else:
+                path.unlink(missing_ok=True)
+                removed += 1
+
+        freed = 0
+        for digest, obj_size in objects.items():
+            if digest in kept:
+                continue
+            path = self.object_path(digest)
+            try:
+                if keep_newer_than is not None and path.stat().st_mtime > keep_newer_than:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            freed += obj_size
+        return removed, freed
@@ -1,9 +1,9 @@
 # api.py
 from contextlib import contextmanager
-from collections.abc import Generator
+from collections.abc import Generator, Iterable
 from contextvars import ContextVar
 
-from .builtin import RunShellStep, CheckoutStep
+from .builtin import RunShellStep, CheckoutStep, intern_step
 from pygha.models import Job, Step
 
 _current_job: ContextVar[Job | None] = ContextVar("_current_job", default=None)
@@ -25,15 +25,28 @@ def _get_active_job(name: str) -> Job:
     return job
 
 
-def shell(command: str, name: str = "") -> Step:
+def shell(
+    command: str,
+    name: str = "",
+    timeout_minutes: float | None = None,
+    inputs: Iterable[str] = (),
+    outputs: Iterable[str] = (),
+) -> Step:
     job = _get_active_job("shell")
-    job.add_step(RunShellStep(command=command, name=name))
+    step = RunShellStep(
+        command=command,
+        name=name,
+        timeout_minutes=timeout_minutes,
+        inputs=tuple(inputs),
+        outputs=tuple(outputs),
+    )
+    job.add_step(intern_step(step))
     return job.steps[-1]
 
 
 def checkout(repository: str | None = None, ref: str | None = None, name: str = "") -> Step:
     job = _get_active_job("checkout")
-    job.add_step(CheckoutStep(repository=repository, ref=ref, name=name))
+    job.add_step(intern_step(CheckoutStep(repository=repository, ref=ref, name=name)))
     return job.steps[-1]
 
 
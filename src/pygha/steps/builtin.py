@@ -6,32 +6,102 @@ or transpile, like executing a shell command or checking out code.
 """
 
 import shlex
-import subprocess  # nosec B404: subprocess is used with argv-only
-from dataclasses import dataclass, field
-from typing import Any
+import sys
+from dataclasses import FrozenInstanceError, dataclass, field, fields
+from functools import cache
+from typing import Any, TypeVar
+from weakref import WeakValueDictionary
 
 # Import the abstract base class from our models
 from pygha.models import Step
 
+S = TypeVar("S", bound=Step)
 
-@dataclass
-class RunShellStep(Step):
-    """A step that executes a shell command."""
+_interned: "WeakValueDictionary[tuple[Any, ...], Step]" = WeakValueDictionary()
+
+
+class _WriteOnce:
+    """
+    Makes a slotted dataclass immutable once ``__init__`` has run.
+
+    Each field may be assigned exactly once, which is what the generated
+    ``__init__`` (and unpickling) does. The built-in steps use this rather
+    than ``frozen=True`` because a frozen dataclass cannot inherit from the
+    non-frozen ``Step`` that user-defined steps build on.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self, name):
+            raise FrozenInstanceError(f"cannot assign to field {name!r}")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+
+@cache
+def _field_names(cls: type) -> tuple[str, ...]:
+    return tuple(f.name for f in fields(cls))
+
+
+def intern_step(step: S) -> S:
+    """
+    Return a shared instance equal to ``step`` (flyweight).
+
+    Built-in steps are immutable, so identical ones -- the same checkout or
+    setup command in thousands of jobs -- can be one object. Instances are
+    held weakly and disappear with the last pipeline using them.
+    """
+    values = tuple(getattr(step, name) for name in _field_names(type(step)))
+    key = (type(step), *(sys.intern(v) if type(v) is str else v for v in values))
+    shared = _interned.get(key)
+    if shared is None:
+        _interned[key] = step
+        return step
+    # The key includes the exact type, so the shared instance is an S too
+    return shared  # type: ignore[return-value]
+
+
+@dataclass(slots=True, weakref_slot=True)
+class RunShellStep(_WriteOnce, Step):
+    """A step that executes a shell command. Immutable."""
 
     command: str = field(default="")
     """The shell command to execute (e.g., "pytest")."""
 
+    timeout_minutes: float | None = None
+    """(Optional) Fail the step if it runs longer than this (``timeout-minutes``)."""
+
+    inputs: tuple[str, ...] = ()
+    """(Optional) File patterns and ``$VARIABLES`` the result depends on (see pygha.step_cache)."""
+
+    outputs: tuple[str, ...] = ()
+    """(Optional) Files and directories the command produces, restored from the step cache."""
+
     def execute(self, context: Any) -> None:
         """
         Executes the shell command using subprocess.
         The 'context' can be used
         to pass environment variables or secrets.
         """
+        # Imported here rather than at module level: pipeline files load this
+        # module on every build, but only local runs ever execute a step.
+        import subprocess  # nosec B404: subprocess is used with argv-only
+
         print(f"--- Running Step: {self.name}")
         try:
             argv = shlex.split(self.command)
 
-            subprocess.run(argv, shell=False, check=True, text=True, encoding="utf-8")  # nosec B603
+            run_command = getattr(context, "run_command", None)
+            if run_command is not None:
+                # Local runs (pygha.runner) stream output per job and can cancel it
+                returncode = run_command(argv)
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, argv)
+            else:
+                subprocess.run(argv, shell=False, check=True, text=True, encoding="utf-8")  # nosec B603
 
         except subprocess.CalledProcessError as e:
             print(f"Step '{self.name}' failed with exit code {e.returncode}")
@@ -40,21 +110,46 @@ class RunShellStep(Step):
             print(f"Step '{self.name}' failed with an unexpected error: {e}")
             raise e
 
+    async def execute_async(self, context: Any) -> None:
+        """
+        Runs the command from an event loop (see pygha.async_runner).
+
+        ``context`` must provide ``run_command_async`` and ``log_async``.
+        When it has a shell ``session`` the command runs there as a bash
+        script instead of being split into an argv.
+        """
+        import subprocess  # nosec B404: only for CalledProcessError
+
+        await context.log_async(f"$ {self.command}")
+        if getattr(context, "session", None) is not None:
+            returncode = await context.run_script_async(self.command)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, self.command)
+            return
+
+        argv = shlex.split(self.command)
+        returncode = await context.run_command_async(argv)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, argv)
+
     def to_github_dict(self) -> dict[str, Any]:
         """Transpiles to the GitHub Actions YAML format."""
-        final_dict = dict()
+        final_dict: dict[str, Any] = dict()
         if self.name:
             final_dict["name"] = self.name
 
         final_dict["run"] = self.command
+        if self.timeout_minutes is not None:
+            minutes = self.timeout_minutes
+            final_dict["timeout-minutes"] = int(minutes) if minutes == int(minutes) else minutes
 
         return final_dict
 
 
-@dataclass
-class CheckoutStep(Step):
+@dataclass(slots=True, weakref_slot=True)
+class CheckoutStep(_WriteOnce, Step):
     """
-    A step that checks out source code.
+    A step that checks out source code. Immutable.
 
     This is a common "special" step in most CI systems.
     """
@@ -0,0 +1,138 @@
+"""
+Timeline tracing in the Chrome trace-event format.
+
+``pygha build --trace out.json`` and ``pygha run --trace out.json``
+record what the build or run spent its time on -- discovering files,
+evaluating each pipeline file, sorting jobs, converting and emitting
+YAML, writing files, running jobs and steps -- and write the spans as
+trace-event JSON, which https://ui.perfetto.dev and ``chrome://tracing``
+open directly.
+
+Code marks a span with ``with trace.span("name"):``. While no trace is
+being recorded, :func:`span` returns one shared no-op context manager,
+so instrumented code pays a global lookup and a call per span.
+
+Spans are laid out per thread, except for spans given a ``lane``: the
+runners put each running job on a lane of its own (reused once the job
+ends), which keeps concurrent asyncio jobs on separate rows.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any
+
+_LANE_BASE = 1 << 30
+"""Lane ``n`` is shown as thread id ``_LANE_BASE + n``, clear of real thread ids."""
+
+_NULL: AbstractContextManager[None] = nullcontext()
+
+
+class Tracer:
+    """Collects complete ("X") events, in microseconds since the tracer started."""
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.events: list[dict[str, Any]] = []
+        self._origin = time.perf_counter_ns()
+        self._threads: dict[int, str] = {}
+
+    def add(
+        self,
+        name: str,
+        cat: str,
+        start_ns: int,
+        end_ns: int,
+        lane: int | None,
+        args: dict[str, Any],
+    ) -> None:
+        if lane is None:
+            tid = threading.get_native_id()
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+        else:
+            tid = _LANE_BASE + lane
+            if tid not in self._threads:
+                self._threads[tid] = f"job slot {lane}"
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start_ns - self._origin) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        # list.append is atomic, so threads need no lock here
+        self.events.append(event)
+
+    def to_json(self) -> dict[str, Any]:
+        meta: list[dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "pygha"}}
+        ]
+        meta += [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in sorted(self._threads.items())
+        ]
+        return {"traceEvents": meta + self.events, "displayTimeUnit": "ms"}
+
+    def write(self, path: str | Path) -> None:
+        import json
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, separators=(",", ":"))
+
+
+class _Span:
+    __slots__ = ("_args", "_cat", "_lane", "_name", "_start", "_tracer")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, lane: int | None, args: dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._lane = lane
+        self._args = args
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, exc_type: object, exc: BaseException | None, tb: object) -> None:
+        end = time.perf_counter_ns()
+        if exc is not None:
+            self._args["error"] = type(exc).__name__
+        self._tracer.add(self._name, self._cat, self._start, end, self._lane, self._args)
+
+
+_tracer: Tracer | None = None
+
+
+def span(
+    name: str, cat: str = "pygha", lane: int | None = None, **args: Any
+) -> AbstractContextManager[None]:
+    """Record the ``with`` block as a span, if a trace is being recorded."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL
+    return _Span(tracer, name, cat, lane, args)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+@contextmanager
+def tracing(path: str | Path) -> Iterator[Tracer]:
+    """Record spans while the ``with`` block runs, then write them to ``path``."""
+    global _tracer
+    tracer = _tracer = Tracer()
+    try:
+        yield tracer
+    finally:
+        _tracer = None
+        tracer.write(path)
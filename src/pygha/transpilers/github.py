@@ -1,56 +1,156 @@
-from ruamel.yaml import YAML
-from ruamel.yaml.comments import CommentedMap
-
-from typing import Any
+from typing import Any, TextIO
 
 from collections.abc import MutableMapping
 
-from collections.abc import Iterable
-from ..models import Pipeline
+from collections.abc import Iterable, Iterator
+from .. import trace
+from ..models import Job, Pipeline
+from ..paths import workflow_paths
 from ..registry import get_default
+from . import yaml_emitter
 
+_yaml: Any = None
 
-class GitHubTranspiler:
-    def __init__(self, pipeline: Pipeline | None = None):
-        self.pipeline = pipeline if pipeline is not None else get_default()
 
-    @staticmethod
-    def _sorted_unique(items: Iterable[str]) -> list[str]:
-        # Ensure deterministic, duplicate-free 'needs'
-        return sorted(set(items))
+def _ruamel() -> Any:
+    """Return the shared ruamel ``YAML`` instance, configured on first use."""
+    global _yaml
+    if _yaml is None:
+        from ruamel.yaml import YAML
 
-    def to_dict(self) -> MutableMapping[str, Any]:
-        jobs_dict: dict[str, Any] = {}
+        _yaml = YAML()
+        _yaml.indent(mapping=2, sequence=4, offset=2)
+        _yaml.default_flow_style = False
+    return _yaml
 
-        for job in self.pipeline.get_job_order():
-            job_dict: dict[str, Any] = {
-                "runs-on": job.runner_image or "ubuntu-latest",
-            }
 
-            # Add 'needs' before 'steps'
-            if job.depends_on:
-                deps = self._sorted_unique(job.depends_on)
-                job_dict["needs"] = deps
+def _render(document: dict[str, Any]) -> str:
+    try:
+        # Fast path: same bytes as ruamel for everything pygha normally emits
+        return yaml_emitter.emit(document)
+    except yaml_emitter.UnsupportedShape:
+        pass
 
-            # Now add steps
-            job_dict["steps"] = [step.to_github_dict() for step in job.steps]
+    from io import StringIO
 
-            jobs_dict[job.name] = job_dict
+    from ruamel.yaml.comments import CommentedMap
 
-        workflow: MutableMapping[str, Any] = CommentedMap()
-        workflow["name"] = self.pipeline.name
-        workflow["on"] = self.pipeline.pipeline_settings.to_dict()
-        workflow["jobs"] = jobs_dict
+    buffer = StringIO()
+    _ruamel().dump(CommentedMap(document), buffer)
+    return buffer.getvalue()
 
-        return workflow
 
-    def to_yaml(self) -> str:
-        yaml12 = YAML()
-        yaml12.indent(mapping=2, sequence=4, offset=2)
-        yaml12.default_flow_style = False
+class GitHubTranspiler:
+    def __init__(self, pipeline: Pipeline | None = None, reduce_needs: bool = False):
+        """
+        Args:
+            pipeline: The pipeline to transpile; the default ``ci`` pipeline if omitted.
+            reduce_needs: Drop ``needs`` entries already implied by another
+                entry of the same job (transitive reduction). The jobs still
+                run in the same order relative to each other; the YAML is
+                just smaller.
+        """
+        self.pipeline = pipeline if pipeline is not None else get_default()
+        self.reduce_needs = reduce_needs
+
+    @staticmethod
+    def _sorted_unique(items: Iterable[str]) -> list[str]:
+        # Ensure deterministic, duplicate-free 'needs'
+        return sorted(set(items))
 
-        from io import StringIO
+    def _needs(self) -> dict[str, set[str]] | None:
+        if not self.reduce_needs:
+            return None
+        from ..graph import transitive_reduction
+
+        return transitive_reduction(self.pipeline)
+
+    def _job_dict(self, job: Job, needs: dict[str, set[str]] | None = None) -> dict[str, Any]:
+        job_dict: dict[str, Any] = {
+            "runs-on": job.runner_image or "ubuntu-latest",
+        }
+
+        # Add 'needs' before 'steps'
+        depends_on = job.depends_on if needs is None else needs[job.name]
+        if depends_on:
+            deps = self._sorted_unique(depends_on)
+            job_dict["needs"] = deps
+
+        # Now add steps
+        job_dict["steps"] = [step.to_github_dict() for step in job.steps]
+        return job_dict
+
+    def _triggers(self) -> dict[str, Any]:
+        on = self.pipeline.pipeline_settings.to_dict()
+        paths = workflow_paths(self.pipeline)
+        if paths is None:
+            return on
+
+        # Every job declares its inputs, so GitHub can skip the whole workflow
+        # when none of them changed. Explicit path filters are left alone.
+        for event in ("push", "pull_request"):
+            if event not in on:
+                continue
+            config = on[event]
+            if config is None:
+                on[event] = {"paths": paths}
+            elif isinstance(config, dict) and not {"paths", "paths-ignore"} & config.keys():
+                on[event] = {**config, "paths": paths}
+        return on
+
+    def _header(self) -> dict[str, Any]:
+        return {
+            "name": self.pipeline.name,
+            "on": self._triggers(),
+        }
+
+    def _workflow(self) -> dict[str, Any]:
+        workflow = self._header()
+        with trace.span("get_job_order", "build"):
+            jobs = self.pipeline.get_job_order()
+        needs = self._needs()
+        with trace.span("to_dict", "build", jobs=len(jobs)):
+            workflow["jobs"] = {job.name: self._job_dict(job, needs) for job in jobs}
+        return workflow
 
-        buffer = StringIO()
-        yaml12.dump(self.to_dict(), buffer)
-        return buffer.getvalue()
+    def to_dict(self) -> MutableMapping[str, Any]:
+        # ruamel.yaml is imported lazily: it is the most expensive import in pygha
+        # and is only needed once a workflow is actually rendered.
+        from ruamel.yaml.comments import CommentedMap
+
+        return CommentedMap(self._workflow())
+
+    def to_yaml_stream(self) -> Iterator[str]:
+        """
+        Yield the workflow YAML in chunks: the header, then one chunk per job.
+
+        Jobs are converted and rendered one at a time in ``get_job_order()``
+        order, so neither the whole workflow dict nor the whole YAML string
+        is ever held in memory. Concatenated, the chunks equal ``to_yaml()``.
+        """
+        yield _render(self._header())
+
+        with trace.span("get_job_order", "build"):
+            jobs = self.pipeline.get_job_order()
+        needs = self._needs()
+        if not jobs:
+            yield "jobs: {}\n"
+            return
+
+        yield "jobs:\n"
+        for job in jobs:
+            # Spans end before each yield, so writing the chunk is not counted here
+            with trace.span("to_dict", "build", job=job.name):
+                document = {"jobs": {job.name: self._job_dict(job, needs)}}
+            # Block YAML is context-free per key: rendering the job under its own
+            # 'jobs:' key and dropping that line gives the bytes of the full dump.
+            with trace.span("emit", "build", job=job.name):
+                chunk = _render(document)
+            yield chunk.split("\n", 1)[1]
+
+    def write(self, stream: TextIO) -> None:
+        """Write the workflow YAML to an open text stream, job by job."""
+        stream.writelines(self.to_yaml_stream())
+
+    def to_yaml(self) -> str:
+        return "".join(self.to_yaml_stream())
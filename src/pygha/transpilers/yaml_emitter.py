@@ -0,0 +1,262 @@
+"""
+A small, specialized YAML emitter for GitHub workflow documents.
+
+``GitHubTranspiler`` only ever produces block mappings with string keys,
+sequences of scalars or mappings, and str/bool/int/None scalars. For that
+subset this module writes exactly the bytes ruamel.yaml would write with
+the transpiler's settings (``indent(mapping=2, sequence=4, offset=2)``,
+block style, 80-column width) without building an event stream or
+importing ruamel at all.
+
+Anything outside the subset -- other value types, sequences nested
+directly in sequences, keys ruamel would emit as complex keys, or any line
+that would exceed the width and therefore be folded -- raises
+:class:`UnsupportedShape` so the caller can fall back to ruamel.
+"""
+
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any
+
+BEST_WIDTH = 80
+"""ruamel's default line width; longer lines would be folded."""
+
+_MAX_SIMPLE_KEY = 128
+"""Keys this long (or longer) are written by ruamel as complex ``? key`` entries."""
+
+# Plain scalars matching one of these would be read back as something other than
+# a string (YAML 1.2 implicit resolvers, as used by ruamel when dumping).
+_IMPLICIT = re.compile(
+    r"""^(?:
+        true|True|TRUE|false|False|FALSE
+      | [-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+      | [-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+      | [-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?
+      | [-+]?\.(?:inf|Inf|INF)
+      | \.(?:nan|NaN|NAN)
+      | [-+]?0b[0-1_]+
+      | [-+]?0o?[0-7_]+
+      | [-+]?[0-9_]+
+      | [-+]?0x[0-9a-fA-F_]+
+      | <<
+      | ~|null|Null|NULL|
+      | [0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]
+      | [0-9][0-9][0-9][0-9]-[0-9][0-9]?-[0-9][0-9]?
+        (?:[Tt]|[\ \t]+)[0-9][0-9]?
+        :[0-9][0-9]:[0-9][0-9](?:\.[0-9]*)?
+        (?:[\ \t]*(?:Z|[-+][0-9][0-9]?(?::[0-9][0-9])?))?
+      | =
+      | !|&|\*
+    )$""",
+    re.VERBOSE,
+)
+
+_WHITESPACE = "\0 \t\r\n\x85\u2028\u2029"
+_BREAKS = "\n\x85\u2028\u2029"
+
+_ESCAPES = {
+    "\0": "0",
+    "\x07": "a",
+    "\x08": "b",
+    "\x09": "t",
+    "\x0a": "n",
+    "\x0b": "v",
+    "\x0c": "f",
+    "\x0d": "r",
+    "\x1b": "e",
+    '"': '"',
+    "\\": "\\",
+    "\x85": "N",
+    "\xa0": "_",
+    "\u2028": "L",
+    "\u2029": "P",
+}
+
+
+class UnsupportedShape(ValueError):
+    """The document contains something this emitter does not reproduce exactly."""
+
+
+def _printable(ch: str) -> bool:
+    return (
+        "\x20" <= ch <= "\x7e"
+        or "\xa0" <= ch <= "\ud7ff"
+        or "\ue000" <= ch <= "\ufffd"
+        or "\U00010000" <= ch <= "\U0010ffff"
+    )
+
+
+def _analyze(text: str) -> tuple[bool, bool, bool]:
+    """
+    Port of ruamel's ``Emitter.analyze_scalar`` for block context.
+
+    Returns ``(multiline, allow_block_plain, allow_single_quoted)``.
+    """
+    block_indicators = text.startswith(("---", "..."))
+    line_breaks = special = False
+    leading_space = leading_break = trailing_space = trailing_break = False
+    break_space = space_break = False
+    previous_space = previous_break = False
+    preceded_by_ws = True
+    followed_by_ws = len(text) == 1 or text[1] in _WHITESPACE
+
+    for index, ch in enumerate(text):
+        if index == 0:
+            if ch in "#,[]{}&*!|>'\"%@`":
+                block_indicators = True
+            if ch in "?:-" and followed_by_ws:
+                block_indicators = True
+        elif (ch == ":" and followed_by_ws) or (ch == "#" and preceded_by_ws):
+            block_indicators = True
+
+        if ch in _BREAKS:
+            line_breaks = True
+        if not (ch == "\n" or "\x20" <= ch <= "\x7e") and not (
+            (ch == "\x85" or _printable(ch)) and ch != "\ufeff"
+        ):
+            special = True
+
+        if ch == " ":
+            leading_space = leading_space or index == 0
+            trailing_space = index == len(text) - 1
+            break_space = break_space or previous_break
+            previous_space, previous_break = True, False
+        elif ch in _BREAKS:
+            leading_break = leading_break or index == 0
+            trailing_break = index == len(text) - 1
+            space_break = space_break or previous_space
+            previous_space, previous_break = False, True
+        else:
+            previous_space = previous_break = False
+
+        preceded_by_ws = ch in _WHITESPACE
+        followed_by_ws = index + 2 >= len(text) or text[index + 2] in _WHITESPACE
+
+    allow_plain = not (
+        leading_space
+        or leading_break
+        or trailing_space
+        or trailing_break
+        or break_space
+        or special
+        or space_break
+        or line_breaks
+        or block_indicators
+    )
+    allow_single = not (break_space or special or space_break)
+    return line_breaks, allow_plain, allow_single
+
+
+def _double_quoted(text: str) -> str:
+    out = ['"']
+    for ch in text:
+        if ch in '"\\\x85\u2028\u2029\ufeff' or not _printable(ch):
+            if ch in _ESCAPES:
+                out.append("\\" + _ESCAPES[ch])
+            elif ch <= "\xff":
+                out.append(f"\\x{ord(ch):02X}")
+            elif ch <= "\uffff":
+                out.append(f"\\u{ord(ch):04X}")
+            else:
+                out.append(f"\\U{ord(ch):08X}")
+        else:
+            out.append(ch)
+    out.append('"')
+    return "".join(out)
+
+
+@lru_cache(maxsize=8192)
+def _string(text: str, key: bool) -> str:
+    """Render a str scalar the way ruamel's ``choose_scalar_style`` would."""
+    if key and (not text or len(text) >= _MAX_SIMPLE_KEY):
+        raise UnsupportedShape(f"key {text!r} would be emitted as a complex key")
+
+    multiline, allow_plain, allow_single = _analyze(text) if text else (False, True, True)
+    if key and multiline:
+        raise UnsupportedShape(f"multi-line key {text!r}")
+
+    # ruamel only consults the int resolver for a leading sign or digit, not "_"
+    implicit = _IMPLICIT.match(text) is not None and not text.startswith("_")
+    if allow_plain and text and not implicit:
+        return text
+    if "'" in text or "\n" in text:
+        return _double_quoted(text)
+    if allow_single:
+        if multiline:
+            raise UnsupportedShape("single-quoted scalar with line breaks")
+        return "'" + text + "'"
+    return _double_quoted(text)
+
+
+def _scalar(value: Any) -> str:
+    # bool before int: bool is an int subclass
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if type(value) is int:
+        return str(value)
+    if type(value) is str:
+        return _string(value, False)
+    raise UnsupportedShape(f"unsupported scalar type {type(value).__name__}")
+
+
+def _line(lines: list[str], text: str) -> None:
+    if len(text) > BEST_WIDTH:
+        raise UnsupportedShape("line would be folded")
+    lines.append(text)
+
+
+def _mapping(
+    data: Mapping[Any, Any], indent: int, lines: list[str], first_prefix: str | None = None
+) -> None:
+    pad = " " * indent
+    for i, (key, value) in enumerate(data.items()):
+        if type(key) is not str:
+            raise UnsupportedShape(f"unsupported key type {type(key).__name__}")
+        prefix = first_prefix if i == 0 and first_prefix is not None else pad
+        head = f"{prefix}{_string(key, True)}:"
+
+        if isinstance(value, Mapping):
+            if not value:
+                _line(lines, head + " {}")
+            else:
+                _line(lines, head)
+                _mapping(value, indent + 2, lines)
+        elif isinstance(value, list):
+            if not value:
+                _line(lines, head + " []")
+            else:
+                _line(lines, head)
+                _sequence(value, indent + 2, lines)
+        elif value is None:
+            _line(lines, head)
+        else:
+            _line(lines, f"{head} {_scalar(value)}")
+
+
+def _sequence(items: list[Any], indent: int, lines: list[str]) -> None:
+    dash = " " * indent + "- "
+    for item in items:
+        if isinstance(item, Mapping) and item:
+            _mapping(item, indent + 2, lines, first_prefix=dash)
+        elif isinstance(item, (Mapping, list)) or item is None:
+            raise UnsupportedShape("empty or nested collection inside a sequence")
+        else:
+            _line(lines, dash + _scalar(item))
+
+
+def emit(document: Mapping[str, Any]) -> str:
+    """
+    Render ``document`` as block YAML, byte-identical to the ruamel path.
+
+    Raises:
+        UnsupportedShape: If the document uses anything outside the
+            supported subset; render it with ruamel instead.
+    """
+    if not document:
+        raise UnsupportedShape("empty document")
+
+    lines: list[str] = []
+    _mapping(document, 0, lines)
+    lines.append("")
+    return "\n".join(lines)
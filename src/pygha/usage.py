@@ -0,0 +1,182 @@
+"""
+Resource usage of the commands started by local runs.
+
+The runners reap every command a step starts with :func:`os.wait4`,
+which returns that command's ``getrusage`` figures, its own children
+included. Unlike deltas of ``getrusage(RUSAGE_CHILDREN)`` for the whole
+process, these are not mixed up with the commands of jobs running at
+the same time. The figures of all commands of a step are added up into
+:attr:`StepResult.usage <pygha.runner.StepResult.usage>`.
+
+``pygha run --usage`` prints them as a table and ``--usage-json FILE``
+writes them as JSON, to size ``@job(cpus=..., memory=...)`` and runners
+and to spot steps whose memory use creeps up.
+
+On Linux the peak memory of a command includes the runner process it
+was forked from, so it never reads lower than pygha's own footprint;
+compare it between runs rather than with zero. Steps restored from the
+step cache or run in a shell session have no figures, and neither has
+anything where :func:`os.wait4` is missing (Windows).
+"""
+
+import os
+import sys
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from subprocess import Popen
+
+    from .runner import RunResult
+
+HAVE_WAIT4 = hasattr(os, "wait4")
+"""Whether commands can be reaped with their resource usage."""
+
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+"""``ru_maxrss`` is in bytes on macOS and in KiB elsewhere."""
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceUsage:
+    """What one or more commands used, as reported by ``getrusage``."""
+
+    user: float
+    """CPU seconds spent in user mode."""
+
+    system: float
+    """CPU seconds spent in the kernel."""
+
+    max_rss: int
+    """Peak resident memory of the largest single process, in bytes."""
+
+    read_blocks: int
+    """Block input operations (reads that had to go to the disk)."""
+
+    write_blocks: int
+    """Block output operations."""
+
+    voluntary_switches: int
+    """Context switches while waiting, e.g. for I/O."""
+
+    involuntary_switches: int
+    """Context switches forced by the scheduler: a sign of CPU contention."""
+
+    @classmethod
+    def from_rusage(cls, ru: Any) -> "ResourceUsage":
+        return cls(
+            user=ru.ru_utime,
+            system=ru.ru_stime,
+            max_rss=ru.ru_maxrss * _RSS_UNIT,
+            read_blocks=ru.ru_inblock,
+            write_blocks=ru.ru_oublock,
+            voluntary_switches=ru.ru_nvcsw,
+            involuntary_switches=ru.ru_nivcsw,
+        )
+
+    @property
+    def cpu(self) -> float:
+        return self.user + self.system
+
+    def __add__(self, other: "ResourceUsage") -> "ResourceUsage":
+        """Commands that ran one after the other: totals, and the larger peak."""
+        return ResourceUsage(
+            self.user + other.user,
+            self.system + other.system,
+            max(self.max_rss, other.max_rss),
+            self.read_blocks + other.read_blocks,
+            self.write_blocks + other.write_blocks,
+            self.voluntary_switches + other.voluntary_switches,
+            self.involuntary_switches + other.involuntary_switches,
+        )
+
+
+def reap(pid: int, block: bool = True) -> tuple[int, ResourceUsage] | None:
+    """
+    Wait for the child ``pid`` to exit and return its exit code (negative
+    for a signal, like :attr:`Popen.returncode`) and resource usage; None
+    if ``block`` is False and it is still running.
+    """
+    reaped, status, rusage = os.wait4(pid, 0 if block else os.WNOHANG)
+    if reaped == 0:
+        return None
+    return os.waitstatus_to_exitcode(status), ResourceUsage.from_rusage(rusage)
+
+
+def wait(proc: "Popen[Any]") -> tuple[int, ResourceUsage | None]:
+    """Like ``proc.wait()``, but also return the command's resource usage where possible."""
+    if not HAVE_WAIT4 or proc.returncode is not None:
+        return proc.wait(), None
+    result = reap(proc.pid)
+    assert result is not None  # nosec B101: a blocking reap always has a result
+    proc.returncode = result[0]
+    return result
+
+
+def to_json(result: "RunResult", pipeline: str) -> dict[str, Any]:
+    """The usage of every step of a run, for ``--usage-json``; ``usage`` is null when unknown."""
+    return {
+        "pipeline": pipeline,
+        "duration": result.duration,
+        "jobs": [
+            {
+                "name": job.name,
+                "status": job.status,
+                "duration": job.duration,
+                "steps": [
+                    {
+                        "label": step.label,
+                        "status": step.status,
+                        "duration": step.duration,
+                        "cached": step.cached,
+                        "usage": asdict(step.usage) if step.usage is not None else None,
+                    }
+                    for step in job.steps
+                ],
+            }
+            for job in result.jobs.values()
+        ],
+    }
+
+
+def format_table(result: "RunResult") -> list[str]:
+    """One line per step that was started, then the totals, for ``--usage``."""
+    from .step_cache import format_size
+
+    rows: list[tuple[str, ...]] = [
+        ("step", "wall", "user", "sys", "max rss", "blk in", "blk out", "ctx vol/inv")
+    ]
+    total: ResourceUsage | None = None
+    for job in result.jobs.values():
+        for step in job.steps:
+            name, wall = f"{job.name}/{step.label}", f"{step.duration:.2f}s"
+            usage = step.usage
+            if usage is None:
+                note = "cached" if step.cached else "-"
+                rows.append((name, wall, note, "", "", "", "", ""))
+                continue
+            total = usage if total is None else total + usage
+            rows.append(_row(name, wall, usage, format_size))
+    if total is not None:
+        rows.append(_row("total", f"{result.duration:.2f}s", total, format_size))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [
+        "  ".join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        for row in rows
+    ]
+
+
+def _row(name: str, wall: str, usage: ResourceUsage, format_size: Any) -> tuple[str, ...]:
+    return (
+        name,
+        wall,
+        f"{usage.user:.2f}s",
+        f"{usage.system:.2f}s",
+        format_size(usage.max_rss),
+        str(usage.read_blocks),
+        str(usage.write_blocks),
+        f"{usage.voluntary_switches}/{usage.involuntary_switches}",
+    )
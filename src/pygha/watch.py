@@ -0,0 +1,294 @@
+"""
+Watch mode for ``pygha build --watch``.
+
+After an initial build the source directory is monitored (inotify on
+Linux, ``stat`` polling elsewhere) and every change triggers another
+build. Unaffected pipeline files are served from the build cache, so
+only files that changed, or that import a changed helper module, are
+executed again, and only workflows whose YAML changed are rewritten.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+import traceback
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from pathlib import Path
+
+from .build_cache import CACHE_DIR_NAME, local_imports
+from .cli import _forget_local_modules, cmd_build
+
+# inotify(7) event bits we care about
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+_SKIP_DIRS = {CACHE_DIR_NAME, "__pycache__"}
+
+_EDIT_ERRORS = (
+    SyntaxError,
+    NameError,
+    ImportError,
+    AttributeError,
+    TypeError,
+    ValueError,
+    LookupError,
+    ArithmeticError,
+    AssertionError,
+    RuntimeError,
+    OSError,
+)
+"""What a pipeline file half-way through an edit raises; anything else ends the session."""
+
+
+class Watcher(ABC):
+    """Reports which Python files changed under a root directory."""
+
+    def __init__(self, root: Path):
+        self.root = root.resolve()
+        self.extra: set[Path] = set()
+        """Files outside ``root`` (local helper modules) that are also watched."""
+
+    def track(self, files: Iterable[Path]) -> None:
+        """Also watch ``files``, which may live outside the root directory."""
+        self.extra = {f.resolve() for f in files}
+
+    def _relevant(self, path: Path) -> bool:
+        if path in self.extra:
+            return True
+        return (
+            path.suffix == ".py"
+            and path.is_relative_to(self.root)
+            and not _SKIP_DIRS.intersection(path.relative_to(self.root).parts)
+        )
+
+    @abstractmethod
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Block until something changes (or ``timeout`` expires); return the changed files."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any OS resources held by the watcher."""
+
+
+class PollingWatcher(Watcher):
+    """Detects changes by comparing ``stat`` snapshots every ``interval`` seconds."""
+
+    def __init__(self, root: Path, interval: float = 0.5):
+        super().__init__(root)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def track(self, files: Iterable[Path]) -> None:
+        super().track(files)
+        # Start tracking new files from their current state
+        for path, sig in self._scan().items():
+            self._snapshot.setdefault(path, sig)
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for path in {p.resolve() for p in self.root.rglob("*.py")} | self.extra:
+            if not self._relevant(path):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval)
+            current = self._scan()
+            changed = {
+                p
+                for p in current.keys() | self._snapshot.keys()
+                if current.get(p) != self._snapshot.get(p)
+            }
+            self._snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+class InotifyWatcher(Watcher):
+    """Linux watcher built directly on inotify(7) through :mod:`ctypes`."""
+
+    def __init__(self, root: Path, debounce: float = 0.05):
+        super().__init__(root)
+        self.debounce = debounce
+
+        libname = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libname, use_errno=True)
+        self._fd: int = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self._dirs: dict[int, Path] = {}
+        self._add_tree(self.root)
+
+    def _add(self, directory: Path) -> None:
+        if directory in self._dirs.values():
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def _add_tree(self, directory: Path) -> None:
+        self._add(directory)
+        for sub in directory.rglob("*"):
+            if sub.is_dir() and not _SKIP_DIRS.intersection(sub.relative_to(directory).parts):
+                self._add(sub.resolve())
+
+    def track(self, files: Iterable[Path]) -> None:
+        super().track(files)
+        for f in self.extra:
+            self._add(f.parent)
+
+    def _drain(self) -> set[Path]:
+        changed: set[Path] = set()
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            raw = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            directory = self._dirs.get(wd)
+            if directory is None or not raw:
+                continue
+            path = directory / os.fsdecode(raw)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and path.name not in _SKIP_DIRS:
+                    self._add_tree(path)
+                continue
+            if self._relevant(path):
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        # Editors usually save in several syscalls; coalesce them into one change set
+        changed = self._drain()
+        while select.select([self._fd], [], [], self.debounce)[0]:
+            changed |= self._drain()
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(root: Path) -> Watcher:
+    """Return an inotify watcher on Linux, falling back to polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            # no libc / inotify (e.g. exhausted watch limit) -> poll instead
+            pass
+    return PollingWatcher(root)
+
+
+def _pipeline_files(src_dir: Path) -> list[Path]:
+    return sorted(set(src_dir.glob("pipeline_*.py")) | set(src_dir.glob("*_pipeline.py")))
+
+
+def affected_files(files: Iterable[Path], changed: set[Path], roots: list[Path]) -> list[Path]:
+    """Return the pipeline files that are in ``changed`` or import something in it."""
+    affected = []
+    for f in files:
+        resolved = f.resolve()
+        if resolved in changed or changed.intersection(local_imports(resolved, roots)):
+            affected.append(f)
+    return affected
+
+
+def _build_once(
+    src_dir: str,
+    out_dir: str,
+    clean: bool,
+    use_cache: bool,
+    jobs: int,
+    reduce_needs: bool,
+    targets: list[str] | None,
+) -> None:
+    try:
+        cmd_build(
+            src_dir,
+            out_dir,
+            clean,
+            use_cache=use_cache,
+            jobs=jobs,
+            reduce_needs=reduce_needs,
+            targets=targets,
+        )
+    except _EDIT_ERRORS:
+        # A broken pipeline file must not end the session; report and keep watching
+        traceback.print_exc()
+        print("\033[91m[pygha] Build failed, waiting for changes...\033[0m")
+
+
+def watch(
+    src_dir: str = ".pipe",
+    out_dir: str = ".github/workflows",
+    clean: bool = False,
+    use_cache: bool = True,
+    jobs: int = 1,
+    reduce_needs: bool = False,
+    targets: list[str] | None = None,
+    watcher: Watcher | None = None,
+) -> int:
+    """
+    Build once, then rebuild on every change until interrupted.
+
+    The build cache is what limits each rebuild to the affected files, so
+    it is always used after the first build; ``use_cache=False`` only
+    forces that first build to start cold.
+    """
+    src = Path(src_dir)
+    roots = [src, Path.cwd()]
+
+    _build_once(src_dir, out_dir, clean, use_cache, jobs, reduce_needs, targets)
+
+    watcher = watcher or make_watcher(src)
+    print(f"[pygha] Watching {src} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            files = _pipeline_files(src)
+            watcher.track(dep for f in files for dep in local_imports(f, roots))
+
+            changed = watcher.wait()
+            if not changed:
+                continue
+
+            affected = affected_files(files, changed, roots)
+            names = ", ".join(f.name for f in affected) or "no pipeline files"
+            print(f"\n[pygha] Change detected, rebuilding {names}")
+            # Helpers must run again too: their pipeline(...) calls register into
+            # the rebuild's fresh registry, and importers must see edited names
+            _forget_local_modules(roots)
+            _build_once(src_dir, out_dir, clean, True, jobs, reduce_needs, targets)
+    except KeyboardInterrupt:
+        print("\n[pygha] Stopped watching.")
+    finally:
+        watcher.close()
+    return 0
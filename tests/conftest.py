@@ -1,7 +1,27 @@
 import os
 from pathlib import Path
+
 import pytest
 
+from pygha import registry
+
+
+def write(p: Path, content: str) -> None:
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def clean_registry():
+    """Run the test against an empty registry and restore the old one afterwards."""
+    old = dict(registry._pipelines)
+    registry._pipelines = {}
+    try:
+        yield
+    finally:
+        registry._pipelines.clear()
+        registry._pipelines.update(old)
+
 
 @pytest.fixture(scope="session")
 def golden_dir() -> Path:
@@ -20,6 +40,7 @@ def assert_matches_golden(golden_dir: Path):
     Usage: assert_matches_golden(actual_text, "file.yml")
     If UPDATE_GOLDEN=1 is set in env, rewrite the golden.
     """
+
     def _inner(actual: str, golden_name: str):
         golden_path = golden_dir / golden_name
         actual_norm = actual.replace("\r\n", "\n")
@@ -40,4 +61,5 @@ def assert_matches_golden(golden_dir: Path):
                 f"--- ACTUAL ---\n{actual_norm}\n"
                 f"Tip: set UPDATE_GOLDEN=1 to accept changes."
             )
+
     return _inner
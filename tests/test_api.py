@@ -113,3 +113,50 @@ def test_nested_active_job_isolation():
     assert outer.steps[0] is s1
     assert outer.steps[1] is s3
     assert inner.steps[0] is s2
+
+
+def test_identical_steps_are_shared_across_jobs():
+    build, test = Job(name="build"), Job(name="test")
+    with active_job(build):
+        checkout()
+        shell("pip install -e .")
+    with active_job(test):
+        checkout()
+        shell("pip install -e .")
+        shell("pip install -e .", name="Install")
+
+    assert build.steps[0] is test.steps[0]
+    assert build.steps[1] is test.steps[1]
+    assert test.steps[2] is not test.steps[1]  # the name makes it a different step
+
+
+def test_builtin_steps_are_slotted_and_immutable():
+    import pickle
+    from dataclasses import FrozenInstanceError
+
+    step = RunShellStep(command="make", name="Build")
+    assert not hasattr(step, "__dict__")
+    with pytest.raises(FrozenInstanceError):
+        step.command = "make clean"
+    with pytest.raises(FrozenInstanceError):
+        del step.name
+
+    copy = pickle.loads(pickle.dumps(step))
+    assert copy == step
+    assert not hasattr(Job(name="j"), "__dict__")
+
+
+def test_interned_steps_are_released_with_their_pipelines():
+    import gc
+
+    from pygha.steps import builtin
+
+    job = Job(name="build")
+    with active_job(job):
+        shell("a command used by a single, short-lived job")
+    key = (RunShellStep, "", "a command used by a single, short-lived job", None, (), ())
+    assert key in builtin._interned
+
+    del job
+    gc.collect()
+    assert key not in builtin._interned
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from benchmarks import compare, generate, suite
+from pygha.cli import cmd_build
+from pygha.registry import isolated_registry
+
+
+@pytest.mark.parametrize("shape", generate.SHAPES)
+def test_generated_pipelines_are_valid(shape):
+    pipe = generate.make_pipeline(shape, 50, 6)
+    assert pipe.validate().ok
+    order = pipe.get_job_order()
+    assert len(order) == 50
+    assert all(len(job.steps) == 6 for job in order)
+
+
+def test_shapes():
+    assert generate.dependencies("chain", 3) == [[], [0], [1]]
+    assert generate.dependencies("fanout", 4) == [[], [0], [0], [1, 2]]
+    assert generate.dependencies("diamond", 6) == [[], [], [0, 1], [1], [2, 3], [3]]
+    assert generate.dependencies("random", 30, seed=1) == generate.dependencies("random", 30, 1)
+    with pytest.raises(ValueError):
+        generate.dependencies("star", 3)
+
+
+def test_generated_files_build(tmp_path, capsys):
+    src, out = tmp_path / "src", tmp_path / "out"
+    generate.write_pipeline_files(src, 2, "random", 20, 4)
+    with isolated_registry():
+        assert cmd_build(str(src), str(out), use_cache=False) == 0
+    assert sorted(p.name for p in out.glob("*.yml")) == ["bench0.yml", "bench1.yml"]
+    assert "needs:" in (out / "bench0.yml").read_text(encoding="utf-8")
+
+
+def test_suite_reports_every_metric():
+    results = suite.run_suite(n_jobs=20, n_steps=4, n_files=1, repeat=1, shapes=("diamond",))
+    metrics = results["metrics"]
+    assert set(metrics) == {
+        "diamond/add_job",
+        "diamond/get_job_order",
+        "diamond/to_dict",
+        "diamond/to_yaml",
+        "diamond/peak_memory",
+        "build/cold",
+        "build/cached",
+        "build/peak_memory",
+        "cli/cold_start",
+    }
+    assert metrics["diamond/peak_memory"]["unit"] == "B"
+    assert all(metric["value"] > 0 for metric in metrics.values())
+
+
+def result(**values):
+    return {
+        "metrics": {
+            name: {"value": value, "unit": "B" if name.endswith("memory") else "s"}
+            for name, value in values.items()
+        }
+    }
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = result(**{"a/to_yaml": 0.100, "a/tiny": 0.0001, "a/peak_memory": 10 << 20})
+    current = result(**{"a/to_yaml": 0.125, "a/tiny": 0.0005, "a/peak_memory": 12 << 20})
+
+    changes = {c.name: c for c in compare.compare(baseline, current, threshold=0.10)}
+    assert changes["a/to_yaml"].regressed
+    # Five times slower, but well below the noise floor
+    assert not changes["a/tiny"].regressed
+    assert changes["a/peak_memory"].regressed
+
+    limits = {"to_yaml": 0.5, "a/peak_memory": 0.25}
+    changes = {c.name: c for c in compare.compare(baseline, current, 0.10, limits)}
+    assert not any(c.regressed for c in changes.values())
+
+
+def test_compare_command(tmp_path, capsys):
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(result(**{"x/build": 1.0, "x/gone": 1.0})))
+    current.write_text(json.dumps(result(**{"x/build": 1.05, "x/new": 2.0})))
+    assert compare.main([str(baseline), str(current)]) == 0
+    out = capsys.readouterr().out
+    assert "new" in out and "removed" in out and "+5.0%" in out
+
+    current.write_text(json.dumps(result(**{"x/build": 2.0})))
+    assert compare.main([str(baseline), str(current)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert compare.main([str(baseline), str(current), "--limit", "build=1.5"]) == 0
@@ -0,0 +1,202 @@
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+from pygha.build_cache import CACHE_DIR_NAME, BuildCache, local_imports
+from pygha.cli import main as cli_main
+
+from .conftest import write
+
+pytestmark = pytest.mark.usefixtures("clean_registry")
+
+PIPELINE_SRC = """
+from pygha import job
+from pygha.steps import shell
+import helpers
+
+@job(name="build")
+def build():
+    shell(helpers.COMMAND)
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    src_dir = tmp_path / ".pipe"
+    write(src_dir / "pipeline_ci.py", PIPELINE_SRC)
+    write(src_dir / "helpers.py", 'COMMAND = "make build"\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(src_dir))
+    yield src_dir
+    sys.modules.pop("helpers", None)
+
+
+def build(src_dir: Path, *extra: str) -> int:
+    return cli_main(["build", "--src-dir", str(src_dir), "--out-dir", "out", *extra])
+
+
+def test_second_build_is_served_from_cache(project, monkeypatch, capsys):
+    assert build(project) == 0
+    first = (Path("out") / "ci.yml").read_text(encoding="utf-8")
+    assert "make build" in first
+    assert "Cache: 0 hit(s), 1 miss(es)" in capsys.readouterr().out
+
+    def boom(*_a, **_k):
+        raise AssertionError("pipeline file should not be executed on a cache hit")
+
+    monkeypatch.setattr("runpy.run_path", boom)
+    monkeypatch.setattr("pygha.cli.GitHubTranspiler", boom)
+
+    assert build(project) == 0
+    out = capsys.readouterr().out
+    assert "Cache: 1 hit(s), 0 miss(es)" in out
+    assert f"Cached {project / 'pipeline_ci.py'}" in out
+    assert (Path("out") / "ci.yml").read_text(encoding="utf-8") == first
+
+
+def test_rendered_yaml_is_cached_as_a_file(project, monkeypatch):
+    assert build(project) == 0
+    text = (Path("out") / "ci.yml").read_text(encoding="utf-8")
+    cached = list((project / CACHE_DIR_NAME / "yaml").iterdir())
+    assert [p.read_text(encoding="utf-8") for p in cached] == [text]
+    # The entry only refers to the copy
+    (entry,) = (project / CACHE_DIR_NAME).glob("*.pickle")
+    assert pickle.loads(entry.read_bytes())["yaml"] == {"ci": cached[0].name}
+
+    # A lost copy is rendered again from the cached pipelines
+    cached[0].unlink()
+    (Path("out") / "ci.yml").unlink()
+    with monkeypatch.context() as m:
+        m.setattr("runpy.run_path", lambda *a, **k: 1 / 0)
+        assert build(project) == 0
+    assert (Path("out") / "ci.yml").read_text(encoding="utf-8") == text
+    assert cached[0].is_file()
+
+    # Copies no entry refers to any more are deleted
+    write(project / "helpers.py", 'COMMAND = "make all"\n')
+    assert build(project) == 0
+    assert not cached[0].exists()
+
+
+def test_changing_local_import_invalidates_entry(project, capsys):
+    assert build(project) == 0
+    capsys.readouterr()
+
+    write(project / "helpers.py", 'COMMAND = "make all"\n')
+    sys.modules.pop("helpers", None)
+
+    assert build(project) == 0
+    assert "Cache: 0 hit(s), 1 miss(es)" in capsys.readouterr().out
+    assert "make all" in (Path("out") / "ci.yml").read_text(encoding="utf-8")
+
+
+def test_no_cache_flag_skips_cache_entirely(project, capsys):
+    assert build(project, "--no-cache") == 0
+    out = capsys.readouterr().out
+    assert "Cache:" not in out
+    assert not (project / CACHE_DIR_NAME).exists()
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b"not a pickle", pickle.dumps({"key": "k"})[:-3], pickle.dumps(["not", "a", "dict"])],
+    ids=["garbage", "truncated", "list"],
+)
+def test_corrupt_entry_is_treated_as_miss(project, capsys, payload):
+    assert build(project) == 0
+    for entry in (project / CACHE_DIR_NAME).glob("*.pickle"):
+        entry.write_bytes(payload)
+    capsys.readouterr()
+
+    assert build(project) == 0
+    assert "Cache: 0 hit(s), 1 miss(es)" in capsys.readouterr().out
+
+
+def test_pipeline_shared_by_two_files_is_merged(tmp_path, monkeypatch):
+    src_dir = tmp_path / ".pipe"
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "@job(name='a')\n"
+        "def a():\n"
+        "    shell('echo a')\n",
+    )
+    write(
+        src_dir / "pipeline_b.py",
+        "from pygha import job, default_pipeline\n"
+        "from pygha.steps import shell\n"
+        "default_pipeline(on_push='dev')\n"
+        "@job(name='b', depends_on=['a'])\n"
+        "def b():\n"
+        "    shell('echo b')\n",
+    )
+    monkeypatch.chdir(tmp_path)
+
+    for _ in range(2):  # cold, then fully cached
+        assert build(src_dir) == 0
+        text = (Path("out") / "ci.yml").read_text(encoding="utf-8")
+        assert "  a:\n" in text
+        assert "  b:\n" in text
+        assert "- dev" in text
+
+
+def _uses_release(job_name: str) -> str:
+    return (
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "import helpers\n"
+        f"@job(name={job_name!r}, pipeline=helpers.release)\n"
+        "def body():\n"
+        f"    shell('echo {job_name}')\n"
+    )
+
+
+def test_pipeline_object_shared_through_helper(tmp_path, monkeypatch):
+    src_dir = tmp_path / ".pipe"
+    write(
+        src_dir / "helpers.py",
+        "from pygha import pipeline\nrelease = pipeline('release', on_push=['release-branch'])\n",
+    )
+    write(src_dir / "pipeline_a.py", _uses_release("a"))
+    write(src_dir / "pipeline_b.py", _uses_release("b"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(src_dir))
+
+    assert build(src_dir) == 0
+    # Only pipeline_b.py runs again; pipeline_a.py's entry must not hold job b
+    write(src_dir / "pipeline_b.py", _uses_release("b").replace("echo b", "echo b2"))
+    assert build(src_dir) == 0
+
+    text = (Path("out") / "release.yml").read_text(encoding="utf-8")
+    assert "echo a" in text and "echo b2" in text
+    assert "release-branch" in text
+    assert "helpers" not in sys.modules
+
+
+def test_local_imports_follows_packages_and_ignores_stdlib(tmp_path):
+    write(tmp_path / "pipeline_x.py", "import os\nfrom lib.sub import thing\n")
+    write(tmp_path / "lib" / "__init__.py", "")
+    write(tmp_path / "lib" / "sub.py", "from . import other\n")
+    write(tmp_path / "lib" / "other.py", "")
+
+    deps = local_imports(tmp_path / "pipeline_x.py", [tmp_path])
+
+    assert deps == sorted(
+        p.resolve()
+        for p in (
+            tmp_path / "lib" / "__init__.py",
+            tmp_path / "lib" / "sub.py",
+            tmp_path / "lib" / "other.py",
+        )
+    )
+
+
+def test_disabled_cache_counts_nothing(tmp_path):
+    write(tmp_path / "pipeline_x.py", "")
+    cache = BuildCache(tmp_path / CACHE_DIR_NAME, roots=[tmp_path], enabled=False)
+
+    assert cache.load(tmp_path / "pipeline_x.py") is None
+    assert (cache.hits, cache.misses) == (0, 0)
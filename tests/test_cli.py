@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 import pytest
@@ -5,34 +6,23 @@ from types import SimpleNamespace
 import runpy
 
 
-from pygha import registry
+from pygha import cli, registry
 from pygha.cli import main as cli_main
+from pygha.trigger_event import PipelineSettings
 
+from .conftest import write
 
-# ---------- helpers ----------
-
+# Reset the registry before/after each test so tests don't leak state
+pytestmark = pytest.mark.usefixtures("clean_registry")
 
-def write(p: Path, content: str) -> None:
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(content, encoding="utf-8")
+# ---------- helpers ----------
 
 
 class FakePipeline:
     def __init__(self, name, jobs=None):
         self.name = name
         self.jobs = jobs or {}
-
-
-@pytest.fixture(autouse=True)
-def clean_registry():
-    """Reset the registry before/after each test so tests don't leak state."""
-    old = dict(getattr(registry, "_pipelines", {}))
-    registry._pipelines = {}
-    try:
-        yield
-    finally:
-        registry._pipelines.clear()
-        registry._pipelines.update(old)
+        self.pipeline_settings = PipelineSettings()
 
 
 @pytest.fixture
@@ -40,13 +30,16 @@ def fake_transpiler(monkeypatch):
     """Patch the transpiler at the call site used by the CLI."""
 
     class FakeTranspiler:
-        def __init__(self, pipe):
+        def __init__(self, pipe, reduce_needs=False):
             self.pipe = pipe
 
         def to_yaml(self):
             # deterministic, tiny output for simple assertions
             return f"name: {self.pipe.name}\njobs: {{}}\n"
 
+        def to_yaml_stream(self):
+            yield self.to_yaml()
+
     # IMPORTANT: patch where it's used (pygha.cli), not where it's defined
     monkeypatch.setattr("pygha.cli.GitHubTranspiler", FakeTranspiler)
     return FakeTranspiler
@@ -240,7 +233,7 @@ def test_get_pipelines_dict_raises_when_missing(monkeypatch):
     from pygha.cli import _get_pipelines_dict
     import pygha.registry as reg
 
-    # Remove the attribute, then restore it so the autouse clean_registry teardown succeeds.
+    # Remove the attribute, then restore it so the clean_registry teardown succeeds.
     monkeypatch.delattr(reg, "_pipelines", raising=False)
     try:
         with pytest.raises(RuntimeError, match="No _pipelines found in pygha.registry"):
@@ -255,7 +248,7 @@ def test_get_pipelines_dict_raises_when_not_dict(monkeypatch):
     from pygha.cli import _get_pipelines_dict
     import pygha.registry as reg
 
-    # Set to wrong type, then restore it so the autouse clean_registry teardown succeeds.
+    # Set to wrong type, then restore it so the clean_registry teardown succeeds.
     monkeypatch.setattr(reg, "_pipelines", [], raising=False)
     try:
         with pytest.raises(RuntimeError, match="No _pipelines found in pygha.registry"):
@@ -418,12 +411,21 @@ def test_clean_orphaned_warns_when_unlink_fails(tmp_path, monkeypatch, capsys):
 def test_main_dispatches_to_cmd_build(monkeypatch, tmp_path):
     # Arrange: patch cmd_build to capture args and return a sentinel code
     from pygha.cli import main as cli_main
-    import pygha.cli as cli
 
     called = {}
 
-    def fake_cmd_build(src_dir, out_dir, clean):
-        called.update({"src_dir": src_dir, "out_dir": out_dir, "clean": clean})
+    def fake_cmd_build(src_dir, out_dir, clean, use_cache, jobs, reduce_needs, targets):
+        called.update(
+            {
+                "src_dir": src_dir,
+                "out_dir": out_dir,
+                "clean": clean,
+                "use_cache": use_cache,
+                "jobs": jobs,
+                "reduce_needs": reduce_needs,
+                "targets": targets,
+            }
+        )
         return 123  # sentinel
 
     monkeypatch.setattr(cli, "cmd_build", fake_cmd_build)
@@ -439,6 +441,10 @@ def test_main_dispatches_to_cmd_build(monkeypatch, tmp_path):
         "src_dir": str(tmp_path / "s"),
         "out_dir": str(tmp_path / "o"),
         "clean": True,
+        "use_cache": True,
+        "jobs": 1,
+        "reduce_needs": False,
+        "targets": None,
     }
 
 
@@ -463,8 +469,6 @@ def test_main_returns_zero_for_unknown_command(monkeypatch):
 
 def test_dunder_main_propagates_exit_code(monkeypatch):
     # Make cli.main return a sentinel so we can assert SystemExit.code
-    import pygha.cli as cli
-
     monkeypatch.setattr(cli, "main", lambda *a, **k: 123)
 
     with pytest.raises(SystemExit) as exc:
@@ -474,11 +478,328 @@ def test_dunder_main_propagates_exit_code(monkeypatch):
 
 
 def test_dunder_main_handles_nonzero_exit(monkeypatch):
-    import pygha.cli as cli
-
     monkeypatch.setattr(cli, "main", lambda *a, **k: 2)
 
     with pytest.raises(SystemExit) as exc:
         runpy.run_module("pygha.__main__", run_name="__main__", alter_sys=True)
 
     assert exc.value.code == 2
+
+
+def _job_file(job_name: str, depends_on: str = "") -> str:
+    deps = f", depends_on=[{depends_on!r}]" if depends_on else ""
+    return (
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        f"@job(name={job_name!r}{deps})\n"
+        "def body():\n"
+        f"    shell('echo {job_name}')\n"
+    )
+
+
+def test_build_with_jobs_evaluates_files_in_worker_processes(tmp_path):
+    src_dir = tmp_path / ".pipe"
+    out_dir = tmp_path / "out"
+    write(src_dir / "pipeline_a.py", _job_file("a"))
+    write(src_dir / "pipeline_b.py", _job_file("b", depends_on="a"))
+    write(src_dir / "pipeline_c.py", "from pygha import pipeline\npipeline('release')\n")
+
+    args = ["build", "--src-dir", str(src_dir), "--out-dir", str(out_dir), "--no-cache"]
+    assert cli_main([*args, "--jobs", "3"]) == 0
+    parallel = {p.name: p.read_text(encoding="utf-8") for p in out_dir.glob("*.yml")}
+
+    assert cli_main(args) == 0
+    serial = {p.name: p.read_text(encoding="utf-8") for p in out_dir.glob("*.yml")}
+
+    assert parallel == serial
+    assert set(parallel) == {"ci.yml", "release.yml"}
+    assert "needs:\n      - a" in parallel["ci.yml"]
+
+
+def test_build_reports_job_defined_in_two_files(tmp_path):
+    src_dir = tmp_path / ".pipe"
+    write(src_dir / "pipeline_a.py", _job_file("build"))
+    write(src_dir / "pipeline_b.py", _job_file("build"))
+
+    with pytest.raises(ValueError, match="defines job 'build' more than once") as exc:
+        cli_main(["build", "--src-dir", str(src_dir), "--out-dir", str(tmp_path / "o"), "-j", "2"])
+
+    assert "pipeline_a.py" in str(exc.value)
+    assert "pipeline_b.py" in str(exc.value)
+
+
+def test_main_jobs_zero_means_one_per_cpu(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(cli, "cmd_build", lambda *a, **k: seen.update(k) or 0)
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+
+    assert cli_main(["build", "--jobs", "0"]) == 0
+    assert seen["jobs"] == 6
+
+
+def test_write_if_changed_streams_chunks_and_skips_identical(tmp_path):
+    from pygha.cli import _write_if_changed
+
+    path = tmp_path / "ci.yml"
+    assert _write_if_changed(path, ["name: ci\n", "jobs: {}\n"]) is True
+    assert path.read_text(encoding="utf-8") == "name: ci\njobs: {}\n"
+
+    before = path.stat().st_mtime_ns
+    assert _write_if_changed(path, iter(["name: ci\njobs: {}\n"])) is False
+    assert path.stat().st_mtime_ns == before
+    assert [p.name for p in tmp_path.iterdir()] == ["ci.yml"]
+
+
+def test_write_if_changed_keeps_old_file_when_rendering_fails(tmp_path):
+    from pygha.cli import _write_if_changed
+
+    path = tmp_path / "ci.yml"
+    write(path, "name: old\n")
+
+    def chunks():
+        yield "name: new\n"
+        raise ValueError("render failed")
+
+    with pytest.raises(ValueError):
+        _write_if_changed(path, chunks())
+    assert path.read_text(encoding="utf-8") == "name: old\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["ci.yml"]
+
+
+def _build_pipelines(monkeypatch, src_dir, out_dir, names, *extra):
+    def fake_run_path(_):
+        for name in names:
+            registry._pipelines[name] = FakePipeline(name)
+
+    monkeypatch.setattr("runpy.run_path", fake_run_path)
+    return cli_main(
+        ["build", "--src-dir", str(src_dir), "--out-dir", str(out_dir), "--no-cache", *extra]
+    )
+
+
+def test_manifest_limits_clean_to_generated_files(tmp_path, monkeypatch, fake_transpiler, capsys):
+    import json
+
+    src_dir = tmp_path / ".pipe"
+    out_dir = tmp_path / "workflows"
+    write(src_dir / "pipeline_a.py", "")
+    write(out_dir / "handwritten.yml", "name: mine\n")  # no keep marker, not ours
+
+    assert _build_pipelines(monkeypatch, src_dir, out_dir, ["a", "b"]) == 0
+    manifest = json.loads((out_dir / ".pygha-manifest.json").read_text(encoding="utf-8"))
+    assert manifest["files"] == ["a.yml", "b.yml"]
+    assert "2 written, 0 unchanged, 0 removed" in capsys.readouterr().out
+
+    # 'b' disappears without --clean: its file stays and stays owned
+    assert _build_pipelines(monkeypatch, src_dir, out_dir, ["a"]) == 0
+    assert (out_dir / "b.yml").exists()
+    manifest = json.loads((out_dir / ".pygha-manifest.json").read_text(encoding="utf-8"))
+    assert manifest["files"] == ["a.yml", "b.yml"]
+
+    opened = []
+    real_open = Path.open
+
+    def tracking_open(self, *args, **kwargs):
+        opened.append(self.name)
+        return real_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", tracking_open)
+    registry._pipelines.clear()
+    assert _build_pipelines(monkeypatch, src_dir, out_dir, ["a"], "--clean") == 0
+
+    assert not (out_dir / "b.yml").exists()
+    assert (out_dir / "handwritten.yml").exists()
+    assert "handwritten.yml" not in opened
+    assert "0 written, 1 unchanged, 1 removed" in capsys.readouterr().out
+    manifest = json.loads((out_dir / ".pygha-manifest.json").read_text(encoding="utf-8"))
+    assert manifest["files"] == ["a.yml"]
+
+
+def test_manifest_entries_outside_out_dir_are_ignored(tmp_path):
+    from pygha.cli import MANIFEST_NAME, _read_manifest
+
+    write(
+        tmp_path / MANIFEST_NAME,
+        '{"files": ["ok.yml", "../escape.yml", "sub/x.yml", "notes.txt", 3]}',
+    )
+    assert _read_manifest(tmp_path) == {"ok.yml"}
+
+
+def test_corrupt_manifest_falls_back_to_scanning(tmp_path, capsys):
+    from pygha.cli import MANIFEST_NAME, _clean_orphaned, _read_manifest
+
+    write(tmp_path / MANIFEST_NAME, "{not json")
+    write(tmp_path / "old.yml", "name: old\n")
+
+    owned = _read_manifest(tmp_path)
+    assert owned is None
+    assert "ignoring unreadable manifest" in capsys.readouterr().out
+    assert _clean_orphaned(tmp_path, set(), owned) == (1, set())
+    assert not (tmp_path / "old.yml").exists()
+
+
+def test_build_reduce_needs_option(tmp_path, monkeypatch, capsys):
+    src_dir = tmp_path / ".pipe"
+    out_dir = tmp_path / "out"
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "@job(name='build')\n"
+        "def build():\n"
+        "    shell('make')\n"
+        "@job(name='test', depends_on=['build'])\n"
+        "def test():\n"
+        "    shell('make test')\n"
+        "@job(name='deploy', depends_on=['build', 'test'])\n"
+        "def deploy():\n"
+        "    shell('make deploy')\n",
+    )
+    args = ["build", "--src-dir", str(src_dir), "--out-dir", str(out_dir), "--no-daemon"]
+
+    assert cli_main(args) == 0
+    full = (out_dir / "ci.yml").read_text(encoding="utf-8")
+    assert "needs:\n      - build\n      - test\n" in full
+
+    # The option is part of the cache key, so cached full YAML is not reused
+    assert cli_main([*args, "--reduce-needs"]) == 0
+    reduced = (out_dir / "ci.yml").read_text(encoding="utf-8")
+    assert "needs:\n      - test\n    steps" in reduced
+    assert "Cache: 0 hit(s), 1 miss(es)" in capsys.readouterr().out
+
+
+def test_build_target_emits_minimal_subgraph(tmp_path, capsys):
+    src_dir = tmp_path / ".pipe"
+    out_dir = tmp_path / "out"
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job, pipeline\n"
+        "from pygha.steps import shell\n"
+        "for name, deps in [('build', []), ('lint', []), ('test', ['build']), "
+        "('deploy', ['test', 'lint'])]:\n"
+        "    job(name=name, depends_on=deps)(lambda: shell('make'))\n"
+        "job(name='publish', pipeline=pipeline('release'))(lambda: shell('twine upload'))\n",
+    )
+    args = ["build", "--src-dir", str(src_dir), "--out-dir", str(out_dir), "--no-daemon"]
+
+    assert cli_main([*args, "--target", "test"]) == 0
+    ci = (out_dir / "ci.yml").read_text(encoding="utf-8")
+    assert "  build:" in ci and "  test:" in ci
+    assert "lint" not in ci and "deploy" not in ci
+    assert not (out_dir / "release.yml").exists()
+    assert "1 workflows: 1 written" in capsys.readouterr().out
+
+    assert cli_main([*args, "--target", "nope"]) == 1
+    assert "Unknown target job(s): nope" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        cli_main([*args, "--target", "test", "--clean"])
+
+
+def test_affected_lists_changed_jobs_and_dependents(tmp_path, monkeypatch, capsys):
+    import io
+
+    src_dir = tmp_path / ".pipe"
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "job(name='build', paths=['src/**'])(lambda: shell('make'))\n"
+        "job(name='docs', paths=['docs/**'])(lambda: shell('make docs'))\n"
+        "job(name='test', paths=['tests/**'], depends_on=['build'])(lambda: shell('pytest'))\n",
+    )
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("src/app.py\n\n"))
+    assert cli_main(["affected", "--src-dir", str(src_dir)]) == 0
+    assert capsys.readouterr().out == "build\ntest\n"
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("docs/index.rst\n"))
+    assert cli_main(["affected", "--src-dir", str(src_dir), "ci"]) == 0
+    assert capsys.readouterr().out == "docs\n"
+
+    assert cli_main(["affected", "--src-dir", str(src_dir), "nope"]) == 1
+
+
+def test_run_executes_selected_jobs(tmp_path, capsys):
+    src_dir = tmp_path / ".pipe"
+    marker = tmp_path / "ran.txt"
+    write(
+        tmp_path / "record.py",
+        f"import sys\nopen({str(marker)!r}, 'a').write(sys.argv[1] + '\\n')\n",
+    )
+    write(
+        src_dir / "pipeline_a.py",
+        "import shlex, sys\n"
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        f"cmd = shlex.join([sys.executable, {str(tmp_path / 'record.py')!r}])\n"
+        "job(name='build')(lambda: shell(cmd + ' build'))\n"
+        "job(name='test', depends_on=['build'])(lambda: shell(cmd + ' test'))\n"
+        "job(name='lint')(lambda: shell(cmd + ' lint'))\n",
+    )
+    args = ["run", "--src-dir", str(src_dir)]
+
+    assert cli_main([*args, "--target", "test"]) == 0
+    assert marker.read_text(encoding="utf-8").split() == ["build", "test"]
+    out = capsys.readouterr().out
+    assert "2 jobs: 2 succeeded, 0 failed, 0 cancelled, 0 skipped" in out
+
+    marker.unlink()
+    assert cli_main([*args, "-j", "2"]) == 0
+    ran = marker.read_text(encoding="utf-8").split()
+    assert sorted(ran) == ["build", "lint", "test"]
+    assert ran.index("build") < ran.index("test")
+    # The first run's timings are used by the second
+    assert "Timing history: estimates for 2 of 3 job(s)" in capsys.readouterr().out
+    assert (src_dir / ".pygha-cache" / "history.db").is_file()
+
+    usage = tmp_path / "usage.json"
+    assert cli_main([*args, "--target", "lint", "--usage", "--usage-json", str(usage)]) == 0
+    assert "lint/1" in capsys.readouterr().out
+    [lint] = json.loads(usage.read_text(encoding="utf-8"))["jobs"]
+    assert lint["steps"][0]["label"] == "1"
+
+    assert cli_main([*args, "missing"]) == 1
+    assert cli_main([*args, "--target", "nope"]) == 1
+
+
+def test_run_ignores_a_broken_timing_history(tmp_path, capsys):
+    src_dir = tmp_path / ".pipe"
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "job(name='build')(lambda: shell('true'))\n",
+    )
+    write(src_dir / ".pygha-cache" / "history.db", "not a database")
+
+    assert cli_main(["run", "--src-dir", str(src_dir)]) == 0
+    out = capsys.readouterr().out
+    assert "Warning: ignoring timing history" in out
+    assert "Warning: could not record timings" in out
+
+
+def test_cache_stats_and_prune(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    src_dir = tmp_path / ".pipe"
+    write(tmp_path / "input.txt", "data")
+    write(
+        src_dir / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "job(name='gen')(lambda: shell('cp input.txt out.txt', inputs=['input.txt'], "
+        "outputs=['out.txt']))\n",
+    )
+
+    assert cli_main(["run", "--src-dir", str(src_dir)]) == 0
+    assert cli_main(["run", "--src-dir", str(src_dir)]) == 0
+    assert "Step cache: 1 hit(s), 0 miss(es)" in capsys.readouterr().out
+
+    assert cli_main(["cache", "stats", "--src-dir", str(src_dir)]) == 0
+    out = capsys.readouterr().out
+    assert "entries: 1" in out and "size:    4 B of 2.0 GiB" in out
+
+    assert cli_main(["cache", "prune", "--src-dir", str(src_dir), "--max-size", "0"]) == 0
+    assert "Removed 1 step cache entries, freed 4 B" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        cli_main(["cache", "prune", "--max-size", "huge"])
@@ -0,0 +1,302 @@
+import os
+import shutil
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from pygha import daemon, registry
+from pygha.cli import main as cli_main
+from pygha.models import Pipeline
+
+from .conftest import write
+
+pytestmark = [
+    pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets"),
+    pytest.mark.usefixtures("clean_registry"),
+]
+
+
+@pytest.fixture
+def sock(monkeypatch):
+    # pytest's tmp_path can exceed the AF_UNIX path limit, so use a short one
+    short = Path(tempfile.mkdtemp(prefix="pygha"))
+    path = short / "d.sock"
+    monkeypatch.setattr(daemon, "socket_path", lambda cwd=None: path)
+    yield path
+    shutil.rmtree(short, ignore_errors=True)
+
+
+@pytest.fixture
+def server(sock, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    srv = daemon.BuildServer(sock)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    thread.join(timeout=5)
+
+
+def test_forward_build_returns_none_without_daemon(sock):
+    assert daemon.ping() is None
+    assert daemon.forward_build(src_dir=".pipe") is None
+    assert daemon.status() == 1
+
+
+def test_forward_build_runs_in_daemon_and_replays_output(server, tmp_path, capsys):
+    write(tmp_path / ".pipe" / "pipeline_a.py", "from pygha import pipeline\npipeline('a')\n")
+
+    rc = daemon.forward_build(src_dir=".pipe", out_dir="out", clean=False, use_cache=True, jobs=1)
+
+    assert rc == 0
+    assert "Found 1 pipeline files" in capsys.readouterr().out
+    assert (tmp_path / "out" / "a.yml").exists()
+    assert daemon.ping()["pid"] == os.getpid()
+
+
+def test_daemon_reports_build_errors_with_nonzero_status(server, tmp_path, capsys):
+    write(tmp_path / ".pipe" / "pipeline_a.py", "raise RuntimeError('broken pipeline')\n")
+
+    assert daemon.forward_build(src_dir=".pipe", out_dir="out") == 1
+    assert "broken pipeline" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "message",
+    [["not", "a", "dict"], {"cmd": "build"}, {"cmd": "build", "cwd": "/nonexistent/dir"}],
+    ids=["list", "no-cwd", "missing-cwd"],
+)
+def test_daemon_answers_malformed_requests(server, message):
+    reply = daemon._request(message)
+    assert reply is not None and reply["rc"] == 1
+    assert "Traceback" in reply["output"]
+    assert daemon.ping() is not None
+
+
+def test_daemon_reimports_changed_helper_modules(server, tmp_path, monkeypatch):
+    src = tmp_path / ".pipe"
+    helper = src / "helpers.py"
+    write(helper, 'COMMAND = "make one"\n')
+    write(
+        src / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "import helpers\n"
+        "@job(name='a')\n"
+        "def a():\n"
+        "    shell(helpers.COMMAND)\n",
+    )
+    monkeypatch.syspath_prepend(str(src))
+    monkeypatch.delitem(sys.modules, "helpers", raising=False)
+    args = {"src_dir": ".pipe", "out_dir": "out", "use_cache": False}
+
+    assert daemon.forward_build(**args) == 0
+    assert "make one" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+
+    write(helper, 'COMMAND = "make two"\n')
+    st = helper.stat()
+    os.utime(helper, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert daemon.forward_build(**args) == 0
+    assert "make two" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+    sys.modules.pop("helpers", None)
+
+
+def test_daemon_reimports_importers_of_a_changed_helper(server, tmp_path, monkeypatch):
+    src = tmp_path / ".pipe"
+    leaf = src / "leaf.py"
+    write(leaf, 'CMD = "echo one"\n')
+    write(src / "middle.py", "from leaf import CMD\n")
+    write(
+        src / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "from middle import CMD\n"
+        "job(name='a')(lambda: shell(CMD))\n",
+    )
+    monkeypatch.syspath_prepend(str(src))
+    args = {"src_dir": ".pipe", "out_dir": "out", "use_cache": True}
+    try:
+        assert daemon.forward_build(**args) == 0
+        assert "echo one" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+
+        write(leaf, 'CMD = "echo two"\n')
+        st = leaf.stat()
+        os.utime(leaf, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        assert daemon.forward_build(**args) == 0
+        assert "echo two" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+    finally:
+        for name in ("leaf", "middle"):
+            sys.modules.pop(name, None)
+
+    # The build cache was filled with the new YAML, not the stale one
+    registry._pipelines = {"ci": Pipeline(name="ci")}
+    (tmp_path / "out" / "ci.yml").unlink()
+    assert cli_main(["build", "--src-dir", ".pipe", "--out-dir", "out", "--no-daemon"]) == 0
+    assert "echo two" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+    for name in ("leaf", "middle"):
+        sys.modules.pop(name, None)
+
+
+def test_daemon_output_matches_in_process_build(server, tmp_path, monkeypatch):
+    src = tmp_path / ".pipe"
+    write(
+        src / "helpers.py",
+        "from pygha import pipeline\nrelease = pipeline('release', on_push=['release-branch'])\n",
+    )
+    write(
+        src / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "import helpers\n"
+        "job(name='a', pipeline=helpers.release)(lambda: shell('echo one'))\n",
+    )
+    monkeypatch.syspath_prepend(str(src))
+    monkeypatch.delitem(sys.modules, "helpers", raising=False)
+    args = {"src_dir": ".pipe", "out_dir": "out", "use_cache": True}
+
+    assert daemon.forward_build(**args) == 0
+    # Only the pipeline file changes; the helper's triggers must survive
+    write(src / "pipeline_a.py", (src / "pipeline_a.py").read_text().replace("one", "two"))
+    assert daemon.forward_build(**args) == 0
+    served = (tmp_path / "out" / "release.yml").read_text(encoding="utf-8")
+    assert "echo two" in served and "release-branch" in served
+
+    registry._pipelines = {"ci": Pipeline(name="ci")}
+    assert cli_main(["build", "--src-dir", ".pipe", "--out-dir", "local", "--no-daemon"]) == 0
+    assert (tmp_path / "local" / "release.yml").read_text(encoding="utf-8") == served
+
+
+def test_daemon_builds_with_the_client_environment(server, tmp_path, monkeypatch):
+    write(
+        tmp_path / ".pipe" / "pipeline_a.py",
+        "import os\n"
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "job(name='a')(lambda: shell(os.environ.get('BUILD_COMMAND', 'daemon env')))\n",
+    )
+    monkeypatch.delenv("BUILD_COMMAND", raising=False)
+    sent = []
+    request = daemon._request
+    monkeypatch.setattr(
+        daemon, "_request", lambda msg, path=None: sent.append(msg) or request(msg, path)
+    )
+
+    reply = server.dispatch(
+        {
+            "cmd": "build",
+            "cwd": str(tmp_path),
+            "env": dict(os.environ, BUILD_COMMAND="client env"),
+            "args": {"src_dir": ".pipe", "out_dir": "out", "use_cache": False},
+        }
+    )
+
+    assert reply["rc"] == 0
+    assert "client env" in (tmp_path / "out" / "ci.yml").read_text(encoding="utf-8")
+    assert "BUILD_COMMAND" not in os.environ
+    assert daemon.forward_build(src_dir=".pipe", out_dir="out") == 0
+    assert sent[-1]["env"] == dict(os.environ)
+
+
+def test_malformed_reply_falls_back_to_in_process(sock):
+    class Garbage(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.rfile.readline()
+            self.wfile.write(b"not json\n")
+
+    srv = socketserver.UnixStreamServer(str(sock), Garbage)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert daemon.ping() is None
+        assert daemon.forward_build(src_dir=".pipe") is None
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_version_mismatch_falls_back_to_in_process(server, monkeypatch):
+    monkeypatch.setattr(daemon, "ping", lambda path=None: {"pid": 1, "version": "0.0.0-other"})
+    assert daemon.forward_build(src_dir=".pipe") is None
+
+
+def test_cli_build_prefers_daemon_unless_disabled(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(daemon, "forward_build", lambda **kw: calls.append(kw) or 7)
+    monkeypatch.setattr("pygha.cli.cmd_build", lambda *a, **k: 0)
+
+    assert cli_main(["build", "--src-dir", str(tmp_path)]) == 7
+    assert calls[0]["src_dir"] == str(tmp_path)
+
+    assert cli_main(["build", "--src-dir", str(tmp_path), "--no-daemon"]) == 0
+    assert len(calls) == 1
+
+
+def test_stop_shuts_the_server_down(sock, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    srv = daemon.BuildServer(sock)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+
+    assert daemon.stop() == 0
+    thread.join(timeout=5)
+    srv.server_close()
+    assert not thread.is_alive()
+
+
+def test_socket_path_prefers_xdg_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert daemon.socket_path(tmp_path).parent == tmp_path / "pygha"
+
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "relative/dir")
+    assert daemon.socket_path(tmp_path).parent.name == f"pygha-{os.getuid()}"
+
+
+@pytest.mark.parametrize("problem", ["mode", "owner", "symlink"])
+def test_serve_refuses_a_directory_it_does_not_own(sock, monkeypatch, capsys, problem):
+    if problem == "mode":
+        sock.parent.chmod(0o755)
+    elif problem == "owner":
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    else:
+        target = sock.parent.with_name(sock.parent.name + "-real")
+        sock.parent.rename(target)
+        sock.parent.symlink_to(target)
+
+    try:
+        assert daemon.serve(sock) == 1
+        assert "Refusing to start the daemon" in capsys.readouterr().out
+        assert not sock.exists()
+    finally:
+        if problem == "symlink":
+            sock.parent.unlink()
+            target.rename(sock.parent)
+
+
+def test_client_ignores_sockets_of_other_users(server, sock, monkeypatch):
+    assert daemon.ping() is not None
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    assert daemon.ping() is None
+    assert daemon.forward_build(src_dir=".pipe") is None
+
+
+def test_start_status_stop_background_process(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    if len(str(daemon.socket_path())) > 100:
+        pytest.skip("temporary directory path too long for AF_UNIX")
+
+    try:
+        assert cli_main(["daemon", "start"]) == 0
+        assert cli_main(["daemon", "status"]) == 0
+        assert daemon.ping()["pid"] != os.getpid()
+    finally:
+        cli_main(["daemon", "stop"])
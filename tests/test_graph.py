@@ -0,0 +1,221 @@
+import json
+import random
+
+import pytest
+
+from pygha.graph import (
+    InvalidPipelineError,
+    critical_path,
+    load_durations,
+    transitive_reduction,
+    validate,
+)
+from pygha.models import Job, Pipeline
+
+
+def _pipeline(edges: dict[str, set[str]]) -> Pipeline:
+    pipe = Pipeline(name="graph")
+    for name, deps in edges.items():
+        pipe.add_job(Job(name=name, depends_on=set(deps)))
+    return pipe
+
+
+@pytest.fixture
+def diamond():
+    #        build(2)
+    #       /        \
+    #   test(10)   docs(3)    lint(4)
+    #       \        /
+    #       deploy(1)
+    return _pipeline(
+        {
+            "build": set(),
+            "lint": set(),
+            "test": {"build"},
+            "docs": {"build"},
+            "deploy": {"test", "docs"},
+        }
+    )
+
+
+DURATIONS = {"build": 2, "lint": 4, "test": 10, "docs": 3, "deploy": 1}
+
+
+def test_critical_path_finds_longest_chain_and_slack(diamond):
+    report = critical_path(diamond, DURATIONS)
+
+    assert report.path == ["build", "test", "deploy"]
+    assert report.length == 13
+    assert report.earliest_start == {"build": 0, "lint": 0, "test": 2, "docs": 2, "deploy": 12}
+    assert report.slack == {"build": 0, "lint": 9, "test": 0, "docs": 7, "deploy": 0}
+    assert report.remaining == {"build": 13, "lint": 4, "test": 11, "docs": 4, "deploy": 1}
+    assert report.total_work == 20
+
+
+def test_wall_time_for_runner_counts(diamond):
+    one = critical_path(diamond, DURATIONS, runners=1)
+    assert one.min_wall_time == one.scheduled_wall_time == 20
+
+    two = critical_path(diamond, DURATIONS, runners=2)
+    assert two.min_wall_time == 13
+    # build+lint, then test+docs, then deploy: the critical chain is never delayed
+    assert two.scheduled_wall_time == 13
+
+    many = critical_path(diamond, DURATIONS, runners=8)
+    assert many.min_wall_time == many.scheduled_wall_time == 13
+
+
+def test_scheduler_prefers_the_longest_remaining_chain():
+    # With one free runner at t=0, starting 'short' first would delay 'long -> tail'
+    pipe = _pipeline({"short": set(), "long": set(), "tail": {"long"}})
+    report = critical_path(pipe, {"short": 5, "long": 5, "tail": 5}, runners=2)
+    assert report.scheduled_wall_time == 10
+
+
+def test_missing_durations_use_default(diamond):
+    report = critical_path(diamond, {"test": 10}, default=1)
+    assert report.length == 12
+    assert report.path == ["build", "test", "deploy"]
+
+
+def test_invalid_arguments_raise(diamond):
+    with pytest.raises(ValueError, match="runners"):
+        critical_path(diamond, DURATIONS, runners=0)
+    with pytest.raises(ValueError, match="invalid duration"):
+        critical_path(diamond, {**DURATIONS, "lint": -1})
+
+
+def test_empty_pipeline():
+    report = critical_path(Pipeline(name="empty"), {})
+    assert report.path == []
+    assert report.length == report.scheduled_wall_time == 0
+
+
+def test_load_durations(tmp_path):
+    path = tmp_path / "timings.json"
+    path.write_text(json.dumps({"build": 2, "test": 10.5}), encoding="utf-8")
+    assert load_durations(path) == {"build": 2.0, "test": 10.5}
+
+    path.write_text(json.dumps({"build": "slow"}), encoding="utf-8")
+    with pytest.raises(TypeError, match="'build'"):
+        load_durations(path)
+
+    path.write_text("[1, 2]", encoding="utf-8")
+    with pytest.raises(TypeError, match="JSON object"):
+        load_durations(path)
+
+    path.write_text("{", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_durations(path)
+
+
+def test_validate_clean_graph(diamond):
+    result = validate(diamond)
+    assert result.ok
+    assert result.messages() == []
+
+
+def test_validate_reports_every_problem_in_one_pass():
+    pipe = _pipeline(
+        {
+            "a": {"b"},
+            "b": {"c"},
+            "c": {"a"},
+            "self": {"self"},
+            "downstream": {"c"},
+            "further": {"downstream"},
+            "typo": {"biuld", "setup"},
+            "after-typo": {"typo"},
+            "fine": set(),
+            "also-fine": {"fine"},
+        }
+    )
+
+    result = validate(pipe)
+
+    assert not result.ok
+    assert result.missing == [("typo", "biuld"), ("typo", "setup")]
+    assert result.cycles == [["a", "b", "c", "a"], ["self", "self"]]
+    assert result.unreachable == ["downstream", "further", "after-typo"]
+
+
+def test_validate_reports_separate_cycles_and_shortest_path():
+    pipe = _pipeline({"x": {"y", "z"}, "y": {"x"}, "z": {"y"}, "p": {"q"}, "q": {"p"}})
+    assert validate(pipe).cycles == [["x", "y", "x"], ["p", "q", "p"]]
+
+
+def test_validate_handles_long_chains_without_recursion():
+    edges = {f"job{i}": {f"job{i + 1}"} for i in range(5000)}
+    edges["job5000"] = {"job0"}
+    result = validate(_pipeline(edges))
+    assert len(result.cycles) == 1
+    assert len(result.cycles[0]) == 5002
+
+
+def test_get_job_order_raises_structured_error():
+    pipe = _pipeline({"a": {"b"}, "b": {"a"}, "c": {"a"}, "d": {"missing"}})
+
+    with pytest.raises(InvalidPipelineError) as exc:
+        pipe.get_job_order()
+
+    assert isinstance(exc.value, ValueError)
+    assert exc.value.result == pipe.validate()
+    assert str(exc.value).splitlines() == [
+        "Job 'd' has an invalid dependency: 'missing'",
+        "Circular dependency detected! a -> b -> a",
+        "Jobs blocked by the errors above: c",
+    ]
+
+
+def test_transitive_reduction_drops_implied_needs():
+    pipe = _pipeline(
+        {
+            "build": set(),
+            "test": {"build"},
+            "lint": {"build"},
+            "deploy": {"build", "test", "lint"},
+            "notify": {"deploy", "build", "test"},
+        }
+    )
+    assert transitive_reduction(pipe) == {
+        "build": set(),
+        "test": {"build"},
+        "lint": {"build"},
+        "deploy": {"test", "lint"},
+        "notify": {"deploy"},
+    }
+
+
+def _closure(edges):
+    closure = {}
+
+    def visit(name):
+        if name not in closure:
+            closure[name] = set()
+            for dep in edges[name]:
+                closure[name] |= {dep} | visit(dep)
+        return closure[name]
+
+    for name in edges:
+        visit(name)
+    return closure
+
+
+def test_transitive_reduction_preserves_reachability_on_random_dags():
+    rnd = random.Random(7)
+    for _ in range(20):
+        n = rnd.randint(1, 60)
+        edges = {f"j{i}": {f"j{d}" for d in range(i) if rnd.random() < 0.2} for i in range(n)}
+        reduced = transitive_reduction(_pipeline(edges))
+
+        assert _closure(reduced) == _closure(edges)
+        # Minimal: no kept edge is implied by the other kept edges
+        for job, deps in reduced.items():
+            for dep in deps:
+                others = {d: (reduced[d] if d != job else deps - {dep}) for d in reduced}
+                assert dep not in _closure(others)[job]
+
+
+def test_transitive_reduction_raises_for_invalid_graph():
+    with pytest.raises(InvalidPipelineError):
+        transitive_reduction(_pipeline({"a": {"b"}, "b": {"a"}}))
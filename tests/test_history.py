@@ -0,0 +1,92 @@
+import time
+
+from pygha.history import KEEP, TimingHistory
+from pygha.models import Job, Pipeline
+from pygha.runner import JobResult, LocalRunner, RunResult, StepResult, _Schedule
+
+
+def run_result(*jobs: JobResult) -> RunResult:
+    return RunResult(jobs={job.name: job for job in jobs}, duration=0.0)
+
+
+def test_records_successful_runs_and_estimates_the_median(tmp_path):
+    history = TimingHistory(tmp_path / "cache" / "history.db")
+    assert history.job_estimates("ci") == {}
+    assert not (tmp_path / "cache").exists()
+
+    for duration in (10.0, 30.0, 20.0):
+        steps = [StepResult("setup", "success", 1.0), StepResult("2", "success", duration - 1)]
+        history.record("ci", run_result(JobResult("test", "success", duration, steps=steps)))
+    history.record(
+        "ci", run_result(JobResult("test", "failed", 99.0), JobResult("lint", "skipped"))
+    )
+    history.record("other", run_result(JobResult("test", "success", 1.0)))
+
+    assert history.job_estimates("ci") == {"test": 20.0}
+    assert history.step_estimates("ci", "test") == {"setup": 1.0, "2": 19.0}
+    assert (tmp_path / "cache" / ".gitignore").is_file()
+    history.close()
+
+
+def test_cached_steps_do_not_count_towards_job_timings(tmp_path):
+    history = TimingHistory(tmp_path / "history.db")
+    steps = [StepResult("build", "success", 0.01, cached=True), StepResult("test", "success", 5.0)]
+    history.record("ci", run_result(JobResult("ci", "success", 5.01, steps=steps)))
+    assert history.job_estimates("ci") == {}
+    assert history.step_estimates("ci", "ci") == {"test": 5.0}
+
+
+def test_only_recent_samples_are_kept(tmp_path):
+    history = TimingHistory(tmp_path / "history.db")
+    for i in range(KEEP + 5):
+        history.record("ci", run_result(JobResult("job", "success", float(i))))
+        time.sleep(0.001)  # distinct timestamps
+    (count,) = history._connect().execute("SELECT COUNT(*) FROM timings").fetchone()
+    assert count == KEEP
+    # Median of the five most recent
+    assert history.job_estimates("ci") == {"job": float(KEEP + 2)}
+
+
+def test_apply_sets_job_estimates(tmp_path):
+    history = TimingHistory(tmp_path / "history.db")
+    history.record("ci", run_result(JobResult("slow", "success", 60.0)))
+    pipe = Pipeline(name="ci")
+    pipe.add_job(Job(name="slow"))
+    pipe.add_job(Job(name="new"))
+    assert history.apply(pipe) == 1
+    assert pipe.jobs["slow"].estimate == 60.0
+    assert pipe.jobs["new"].estimate is None
+
+
+def test_schedule_starts_longest_chain_first():
+    pipe = Pipeline(name="ci")
+    pipe.add_job(Job(name="lint", estimate=5.0))
+    pipe.add_job(Job(name="build", estimate=2.0))
+    pipe.add_job(Job(name="test", depends_on={"build"}, estimate=30.0))
+    pipe.add_job(Job(name="docs"))  # no history: counts as an average job
+
+    schedule = _Schedule(pipe)
+    # build heads a 32s chain; docs is assumed to take (5+2+30)/3s
+    assert [schedule.pop_ready().name for _ in range(3)] == ["build", "docs", "lint"]
+
+    line = schedule.progress(workers=1)
+    assert line is not None and line.startswith("0/4 jobs done, about ")
+
+
+def test_priority_overrides_history():
+    pipe = Pipeline(name="ci")
+    pipe.add_job(Job(name="long", estimate=600.0))
+    pipe.add_job(Job(name="urgent", estimate=1.0, priority=10))
+    pipe.add_job(Job(name="plain"))
+    schedule = _Schedule(pipe)
+    assert [schedule.pop_ready().name for _ in range(3)] == ["urgent", "long", "plain"]
+
+
+def test_runner_reports_eta(capsys):
+    pipe = Pipeline(name="ci")
+    for name in "abc":
+        pipe.add_job(Job(name=name, estimate=90.0))
+    assert LocalRunner(pipe).run().ok
+    out = capsys.readouterr().out
+    assert "[pygha] 1/3 jobs done, about 3m 00s left" in out
+    assert "3/3 jobs done" not in out
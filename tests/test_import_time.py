@@ -0,0 +1,90 @@
+"""
+Start-up cost regression tests.
+
+Every pipeline file imports pygha and every CLI call imports pygha.cli,
+so these run in fresh interpreters with ``-X importtime``.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Wall-clock budgets fail on loaded machines, so the budget test only runs
+# when one is given (e.g. PYGHA_IMPORT_BUDGET_MS=150). CI sets a generous
+# one; the benchmark gate tracks cli/cold_start on every pull request.
+BUDGET_MS = os.environ.get("PYGHA_IMPORT_BUDGET_MS")
+
+HEAVY_MODULES = ("ruamel.yaml", "subprocess", "multiprocessing", "concurrent.futures", "pickle")
+
+
+def _run(code: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def _imported(stderr: str) -> dict[str, int]:
+    """Map top-level module names imported by pygha to cumulative microseconds."""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            result[name.strip()] = int(cumulative)
+    return result
+
+
+def _pygha_cost_ms(stderr: str) -> float:
+    """Cumulative import time of every top-level pygha import in this interpreter."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level entries have exactly one leading space before the name
+        if name.startswith(" pygha") and not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+SCENARIOS = {
+    "help": (
+        "from pygha.cli import main\ntry:\n    main(['--help'])\nexcept SystemExit:\n    pass\n"
+    ),
+    "argument-error": (
+        "from pygha.cli import main\n"
+        "try:\n"
+        "    main(['build', '--jobs', 'many'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    ),
+    "pipeline-file": "from pygha import job, pipeline\nfrom pygha.steps import shell, checkout\n",
+}
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_cold_start_does_not_load_heavy_modules(scenario):
+    proc = _run(SCENARIOS[scenario])
+    modules = _imported(proc.stderr)
+
+    assert any(name.startswith("pygha") for name in modules), proc.stderr[-2000:]
+    loaded = sorted(m for m in HEAVY_MODULES if m in modules)
+    assert loaded == [], f"{scenario} imported {loaded}"
+
+
+@pytest.mark.skipif(BUDGET_MS is None, reason="set PYGHA_IMPORT_BUDGET_MS to check the budget")
+def test_cli_import_within_budget():
+    budget = float(BUDGET_MS or 0)
+    # Best of three runs to keep scheduler noise out of the measurement
+    costs = [_pygha_cost_ms(_run(SCENARIOS["help"]).stderr) for _ in range(3)]
+    assert min(costs) > 0
+    assert min(costs) <= budget, (
+        f"importing pygha.cli took {min(costs):.1f} ms (budget {budget:.0f} ms); "
+        "check for new eager imports with `python -X importtime -c 'import pygha.cli'`"
+    )
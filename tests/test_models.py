@@ -188,3 +188,146 @@ def test_pipeline_get_job_order_circular_dependency_raises_error():
 
     with pytest.raises(ValueError, match="Circular dependency detected!"):
         pipe.get_job_order()
+
+
+def test_pipeline_get_job_order_keeps_insertion_order_for_independent_jobs():
+    pipe = Pipeline(name="insertion_order")
+    pipe.add_job(Job(name="build"))
+    pipe.add_job(Job(name="test", depends_on={"build"}))
+    pipe.add_job(Job(name="lint"))
+
+    assert [j.name for j in pipe.get_job_order()] == ["build", "test", "lint"]
+
+
+def test_pipeline_get_job_order_is_cached(monkeypatch):
+    pipe = Pipeline(name="cached")
+    pipe.add_job(Job(name="build"))
+    pipe.add_job(Job(name="test", depends_on={"build"}))
+
+    first = pipe.get_job_order()
+    monkeypatch.setattr(Pipeline, "_topological_order", lambda self: pytest.fail("recomputed"))
+    assert pipe.get_job_order() is first
+
+
+def test_pipeline_add_job_appends_to_cached_order(monkeypatch):
+    pipe = Pipeline(name="incremental")
+    pipe.add_job(Job(name="job0"))
+    pipe.get_job_order()
+
+    monkeypatch.setattr(Pipeline, "_topological_order", lambda self: pytest.fail("recomputed"))
+    for i in range(1, 200):
+        pipe.add_job(Job(name=f"job{i}", depends_on={f"job{i // 2}"}))
+        assert pipe.get_job_order()[-1].name == f"job{i}"
+
+    monkeypatch.undo()
+    incremental = [j.name for j in pipe.get_job_order()]
+    pipe.invalidate_job_order()
+    assert [j.name for j in pipe.get_job_order()] == incremental
+
+
+def test_pipeline_add_job_with_unknown_dependency_invalidates_cache():
+    pipe = Pipeline(name="forward_reference")
+    pipe.add_job(Job(name="deploy"))
+    pipe.get_job_order()
+
+    # 'test' is declared before the job it needs
+    pipe.add_job(Job(name="test", depends_on={"build"}))
+    with pytest.raises(ValueError, match="invalid dependency"):
+        pipe.get_job_order()
+
+    pipe.add_job(Job(name="build"))
+    assert [j.name for j in pipe.get_job_order()] == ["deploy", "build", "test"]
+
+
+def test_pipeline_job_order_notices_direct_edits():
+    pipe = Pipeline(name="direct_edits")
+    pipe.add_job(Job(name="build"))
+    pipe.get_job_order()
+
+    pipe.jobs["test"] = Job(name="test", depends_on={"build"})
+    assert [j.name for j in pipe.get_job_order()] == ["build", "test"]
+
+    pipe.jobs["build"].depends_on.add("test")
+    pipe.invalidate_job_order()
+    with pytest.raises(ValueError, match="Circular dependency detected!"):
+        pipe.get_job_order()
+
+
+def test_pipeline_get_job_levels_groups_parallel_jobs():
+    pipe = Pipeline(name="levels")
+    pipe.add_job(Job(name="deploy", depends_on={"test", "docs"}))
+    pipe.add_job(Job(name="build"))
+    pipe.add_job(Job(name="lint"))
+    pipe.add_job(Job(name="test", depends_on={"build"}))
+    pipe.add_job(Job(name="docs", depends_on={"build"}))
+
+    levels = [[j.name for j in level] for level in pipe.get_job_levels()]
+    assert levels == [["build", "lint"], ["test", "docs"], ["deploy"]]
+
+
+def test_pipeline_get_job_levels_empty_pipeline():
+    assert Pipeline(name="empty").get_job_levels() == []
+
+
+def _graph_pipeline():
+    pipe = Pipeline(name="graph")
+    for name, deps in [
+        ("build", set()),
+        ("lint", set()),
+        ("test", {"build"}),
+        ("docs", {"build"}),
+        ("deploy", {"test", "lint"}),
+    ]:
+        pipe.add_job(Job(name=name, depends_on=deps))
+    return pipe
+
+
+def test_pipeline_ancestors_and_descendants():
+    pipe = _graph_pipeline()
+
+    assert [j.name for j in pipe.ancestors("deploy")] == ["build", "lint", "test"]
+    assert [j.name for j in pipe.ancestors(pipe.jobs["build"])] == []
+    assert [j.name for j in pipe.descendants("build")] == ["test", "docs", "deploy"]
+    assert [j.name for j in pipe.descendants("deploy")] == []
+    with pytest.raises(KeyError, match="no job named 'nope'"):
+        pipe.ancestors("nope")
+
+
+def test_pipeline_reachability_index_is_rebuilt_when_jobs_change():
+    pipe = _graph_pipeline()
+    assert [j.name for j in pipe.descendants("lint")] == ["deploy"]
+    index = pipe._reach
+
+    pipe.add_job(Job(name="release", depends_on={"deploy"}))
+    assert [j.name for j in pipe.descendants("lint")] == ["deploy", "release"]
+    assert pipe._reach is not index
+
+    # Unchanged pipeline: the index is reused
+    index = pipe._reach
+    pipe.ancestors("release")
+    assert pipe._reach is index
+
+
+def test_pipeline_subgraph_is_closed_under_dependencies():
+    pipe = _graph_pipeline()
+    sub = pipe.subgraph(["deploy", "docs"])
+
+    assert [j.name for j in sub.get_job_order()] == ["build", "lint", "test", "docs", "deploy"]
+    assert sub.name == pipe.name
+    assert sub.pipeline_settings is pipe.pipeline_settings
+    assert sub.jobs["build"] is pipe.jobs["build"]
+
+    assert list(pipe.subgraph(["test"]).jobs) == ["build", "test"]
+    assert list(pipe.subgraph([]).jobs) == []
+
+
+def test_pipeline_pickle_drops_caches():
+    import pickle
+
+    pipe = _graph_pipeline()
+    pipe.subgraph(["deploy"])
+    copy = pickle.loads(pickle.dumps(pipe))
+
+    assert copy == pipe
+    assert copy._job_order is None and copy._reach is None
+    assert [j.name for j in copy.ancestors("deploy")] == ["build", "lint", "test"]
@@ -0,0 +1,107 @@
+import random
+import time
+
+import pytest
+
+from pygha.models import Job, Pipeline
+from pygha.paths import (
+    PathMatcher,
+    affected_jobs,
+    changed_files_from_git,
+    compile_glob,
+    workflow_paths,
+)
+
+
+@pytest.mark.parametrize(
+    "pattern, path, expected",
+    [
+        ("src/**", "src/pygha/cli.py", True),
+        ("src/**", "tests/test_cli.py", False),
+        ("*.py", "setup.py", True),
+        ("*.py", "src/setup.py", False),
+        ("**.py", "src/pygha/cli.py", True),
+        ("**/*.md", "README.md", True),
+        ("**/*.md", "docs/a/b.md", True),
+        ("docs/**/*.rst", "docs/index.rst", True),
+        ("docs/*", "docs/a/b.rst", False),
+        ("pyproject.toml", "pyproject.toml", True),
+        ("pyproject.toml", "sub/pyproject.toml", False),
+        ("file?.txt", "file.txt", True),
+        ("file?.txt", "fil.txt", True),
+        ("file?.txt", "files.txt", False),
+        ("ab+c", "abbbc", True),
+        ("v[12].txt", "v2.txt", True),
+        ("v[!12].txt", "v2.txt", False),
+        ("a.b", "axb", False),
+    ],
+)
+def test_glob_semantics(pattern, path, expected):
+    assert (compile_glob(pattern).match(path) is not None) is expected
+
+
+def _pipeline(*jobs: Job) -> Pipeline:
+    pipe = Pipeline(name="ci")
+    for job in jobs:
+        pipe.add_job(job)
+    return pipe
+
+
+def test_last_matching_pattern_wins():
+    matcher = PathMatcher(
+        [
+            Job(name="src", paths=["src/**", "!src/**/*.md", "src/keep.md"]),
+            Job(name="docs", paths=["**/*.md"]),
+        ]
+    )
+    assert matcher.affected(["src/a.py"]) == {"src"}
+    assert matcher.affected(["src/notes.md"]) == {"docs"}
+    assert matcher.affected(["src/keep.md"]) == {"src", "docs"}
+    assert matcher.affected(["./src/b.py", "src\\c.md"]) == {"src", "docs"}
+
+
+def test_jobs_without_paths_are_affected_by_any_change():
+    matcher = PathMatcher([Job(name="always"), Job(name="lint", paths=["src/**"])])
+    assert matcher.affected(["README.md"]) == {"always"}
+    assert matcher.affected([]) == set()
+
+
+def test_affected_jobs_include_dependents_in_order():
+    pipe = _pipeline(
+        Job(name="build", paths=["src/**"]),
+        Job(name="docs", paths=["docs/**"]),
+        Job(name="test", paths=["tests/**"], depends_on={"build"}),
+        Job(name="deploy", paths=["deploy/**"], depends_on={"test", "docs"}),
+    )
+    assert [j.name for j in affected_jobs(pipe, ["src/app.py"])] == ["build", "test", "deploy"]
+    assert [j.name for j in affected_jobs(pipe, ["docs/x.rst"])] == ["docs", "deploy"]
+    assert affected_jobs(pipe, ["unrelated.txt"]) == []
+
+
+def test_matcher_scales_to_many_jobs_and_files():
+    rnd = random.Random(7)
+    jobs = [Job(name=f"job{i}", paths=[f"pkg{i}/**", f"shared/{i % 10}/*.py"]) for i in range(1000)]
+    files = [f"pkg{rnd.randrange(2000)}/mod/{n}.py" for n in range(10_000)]
+
+    start = time.perf_counter()
+    result = PathMatcher(jobs).affected(files)
+    elapsed = time.perf_counter() - start
+
+    expected = {f"job{int(f.split('/')[0][3:])}" for f in files if int(f.split("/")[0][3:]) < 1000}
+    assert result == expected
+    # Naive matching is ~10M regex calls; the prefix index needs ~10k
+    assert elapsed < 2.0
+
+
+def test_workflow_paths_require_every_job():
+    pipe = _pipeline(Job(name="a", paths=["src/**"]), Job(name="b", paths=["src/**", "*.toml"]))
+    assert workflow_paths(pipe) == ["src/**", "*.toml"]
+
+    pipe.add_job(Job(name="c", paths=["docs/**", "!docs/drafts/**"]))
+    assert workflow_paths(pipe) is None
+    assert workflow_paths(Pipeline(name="empty")) is None
+
+
+def test_changed_files_from_git_reports_failures(tmp_path):
+    with pytest.raises(RuntimeError, match="git diff"):
+        changed_files_from_git("HEAD", cwd=tmp_path)
@@ -0,0 +1,236 @@
+import hashlib
+import http.client
+import json
+import threading
+
+import pytest
+
+from pygha.remote_cache import CacheServer, RemoteCache, RemoteCacheError
+from pygha.step_cache import StepCache
+from pygha.steps.builtin import RunShellStep
+
+
+@pytest.fixture
+def server(tmp_path):
+    srv = CacheServer(("127.0.0.1", 0), tmp_path / "server")
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def remote(server):
+    client = RemoteCache(f"http://127.0.0.1:{server.server_port}", max_connections=4)
+    yield client
+    client.close()
+
+
+def blob(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest(), path
+
+
+def test_blob_round_trip(tmp_path, remote):
+    digest, path = blob(tmp_path, "a.bin", b"x" * 200_000)
+    assert not remote.has(digest)
+    assert remote.missing([digest, digest]) == {digest}
+
+    remote.upload(digest, path)
+    assert remote.has(digest)
+    assert remote.missing([digest]) == set()
+
+    dest = tmp_path / "out" / "a.bin"
+    assert remote.download(digest, dest)
+    assert dest.read_bytes() == b"x" * 200_000
+    assert not remote.download("0" * 64, tmp_path / "out" / "none")
+
+    assert remote.get_action("1" * 64) is None
+    remote.put_action("1" * 64, b'{"format": 1, "files": []}')
+    assert remote.get_action("1" * 64) == b'{"format": 1, "files": []}'
+
+
+def test_server_rejects_content_with_another_hash(tmp_path, remote):
+    _, path = blob(tmp_path, "a.bin", b"payload")
+    with pytest.raises(RemoteCacheError, match="400"):
+        remote.upload("0" * 64, path)
+    assert not remote.has("0" * 64)
+    # The connection is still usable afterwards
+    assert remote.missing(["0" * 64]) == {"0" * 64}
+
+
+def test_server_rejects_bad_names(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+    conn.request("GET", "/cas/../../etc/passwd")
+    assert conn.getresponse().status == 404
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not json",
+        b'{"format": 1}',
+        b'{"format": 1, "files": [{"path": "out.txt"}]}',
+        b'{"format": 1, "files": [{"path": "../x", "digest": "%s", "mode": 420}]}' % (b"0" * 64),
+    ],
+)
+def test_server_rejects_invalid_action_records(server, remote, body):
+    with pytest.raises(RemoteCacheError, match="400"):
+        remote.put_action("1" * 64, body)
+    assert remote.get_action("1" * 64) is None
+    assert server.store.stats().entries == 0
+
+
+def test_concurrent_transfers(tmp_path, remote):
+    items = [blob(tmp_path, f"{i}.bin", bytes([i]) * (1000 + i)) for i in range(40)]
+    remote.upload_many(items)
+    assert remote.missing(d for d, _ in items) == set()
+
+    dest = [(d, tmp_path / "down" / d) for d, _ in items]
+    remote.download_many(dest)
+    assert all(p.read_bytes() == src.read_bytes() for (_, p), (_, src) in zip(dest, items))
+    with pytest.raises(RemoteCacheError, match="not found"):
+        remote.download_many([("0" * 64, tmp_path / "x"), ("f" * 64, tmp_path / "y")])
+
+
+def test_step_cache_shares_results_through_remote(tmp_path, remote):
+    first, second = tmp_path / "one", tmp_path / "two"
+    for root in (first, second):
+        root.mkdir()
+        (root / "in.txt").write_text("source")
+    step = RunShellStep(command="gen", inputs=("in.txt",), outputs=("out",))
+
+    producer = StepCache(first / "store", root=first, remote=remote)
+    key = producer.key(step)
+    (first / "out").mkdir()
+    (first / "out" / "result.txt").write_text("built")
+    assert producer.store(key, step)
+
+    consumer = StepCache(second / "store", root=second, remote=remote)
+    assert consumer.key(step) == key
+    assert consumer.restore(key)
+    assert (second / "out" / "result.txt").read_text() == "built"
+    assert (consumer.hits, consumer.remote_hits, consumer.remote_error) == (1, 1, None)
+
+    # The entry is now local: no second trip to the server
+    assert consumer.restore(key)
+    assert consumer.remote_hits == 1
+
+
+def plant_action(server, key, action):
+    """Store an action record on the server, as one that does not validate uploads would."""
+    path = server.store.action_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(action), encoding="utf-8")
+
+
+def put_hostile_action(tmp_path, server, remote, **record):
+    """Publish an action restoring one uploaded blob, with ``record`` overriding its fields."""
+    digest, path = blob(tmp_path, "payload.bin", b"attacker")
+    remote.upload(digest, path)
+    entry = {"path": "out.txt", "digest": digest, "mode": 0o644, **record}
+    plant_action(server, "a" * 64, {"format": 1, "files": [entry]})
+    root = tmp_path / "work" / "repo"
+    root.mkdir(parents=True)
+    return StepCache(tmp_path / "store", root=root, remote=remote)
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        {"path": "../escaped.txt"},
+        {"path": "out/../../escaped.txt"},
+        {"path": "..\\escaped.txt"},
+        {"path": "/tmp/escaped.txt"},
+        {"path": ""},
+        {"digest": "../../payload"},
+        {"digest": "A" * 64},
+        {"mode": "755"},
+        {"mode": True},
+    ],
+)
+def test_step_cache_rejects_hostile_action_records(tmp_path, server, remote, record):
+    cache = put_hostile_action(tmp_path, server, remote, **record)
+
+    assert not cache.restore("a" * 64)
+    assert cache.misses == 1 and cache.hits == 0
+    # A bad record is a miss, not a reason to stop using the remote
+    assert cache.remote is remote and cache.remote_error is None
+    assert not (tmp_path / "work" / "escaped.txt").exists()
+    assert not any(cache.root.iterdir())
+    assert not cache.action_path("a" * 64).exists()
+
+
+def test_step_cache_rejects_symlinked_escape(tmp_path, server, remote):
+    cache = put_hostile_action(tmp_path, server, remote, path="link/escaped.txt")
+    (cache.root / "link").symlink_to(tmp_path / "work")
+
+    assert not cache.restore("a" * 64)
+    assert not (tmp_path / "work" / "escaped.txt").exists()
+
+
+@pytest.mark.parametrize(
+    "action",
+    [
+        {"format": 1},
+        {"format": 1, "files": {"path": "out.txt"}},
+        {"format": 1, "files": ["out.txt"]},
+        {"format": 1, "files": [{"path": "out.txt", "mode": 0o644}]},
+        [1, 2],
+    ],
+)
+def test_step_cache_treats_malformed_action_as_miss(tmp_path, server, remote, action):
+    plant_action(server, "a" * 64, action)
+    cache = StepCache(tmp_path / "store", root=tmp_path, remote=remote)
+
+    assert not cache.restore("a" * 64)
+    assert cache.misses == 1 and cache.remote is remote
+
+
+def test_step_cache_masks_restored_mode(tmp_path, server, remote):
+    cache = put_hostile_action(tmp_path, server, remote, mode=0o4777)
+
+    assert cache.restore("a" * 64)
+    assert (cache.root / "out.txt").read_bytes() == b"attacker"
+    assert (cache.root / "out.txt").stat().st_mode & 0o7777 == 0o777
+
+
+def test_store_survives_a_server_answering_garbage(tmp_path, remote, monkeypatch):
+    (tmp_path / "in.txt").write_text("source")
+    (tmp_path / "out.txt").write_text("built")
+    step = RunShellStep(command="gen", inputs=("in.txt",), outputs=("out.txt",))
+    cache = StepCache(tmp_path / "store", root=tmp_path, remote=remote)
+    key = cache.key(step)
+
+    # A reply naming files nobody asked about never makes the client upload them
+    monkeypatch.setattr(remote, "missing", lambda digests: {*digests, "../../../etc/passwd"})
+    assert cache.store(key, step)
+    assert cache.remote_error is None and remote.get_action(key) is not None
+
+    monkeypatch.setattr(remote, "missing", lambda digests: json.loads(b"<html>"))
+    assert cache.store(key, step)
+    assert cache.remote is None and cache.remote_error is not None
+    assert cache.restore(key)
+
+
+def test_unreachable_remote_falls_back_to_local(tmp_path):
+    (tmp_path / "in.txt").write_text("source")
+    (tmp_path / "out.txt").write_text("built")
+    step = RunShellStep(command="gen", inputs=("in.txt",), outputs=("out.txt",))
+    cache = StepCache(
+        tmp_path / "store", root=tmp_path, remote=RemoteCache("http://127.0.0.1:9", timeout=2)
+    )
+    key = cache.key(step)
+
+    assert not cache.restore(key)
+    assert cache.remote_error is not None and cache.remote is None
+    assert cache.store(key, step)
+    assert cache.restore(key)
+
+
+def test_url_is_validated():
+    with pytest.raises(ValueError):
+        RemoteCache("ftp://example.com")
@@ -0,0 +1,146 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+from pygha import job
+from pygha.async_runner import AsyncRunner
+from pygha.models import Job, Pipeline, Step
+from pygha.resources import Capacity, ResourcePool, machine_capacity
+from pygha.runner import LocalRunner
+
+
+def drain(pool: ResourcePool) -> list[str]:
+    started = []
+    while (next_job := pool.pop()) is not None:
+        started.append(next_job.name)
+    return started
+
+
+def test_best_fit_fills_the_machine_largest_first():
+    pool = ResourcePool(Capacity(cpus=4))
+    for rank, (name, cpus) in enumerate(
+        [("lint", 1), ("unit", 1), ("integration", 3), ("docs", 2)]
+    ):
+        pool.push(Job(name=name, cpus=cpus), rank)
+
+    assert drain(pool) == ["integration", "lint"]
+    pool.release(Job(name="integration"))
+    assert drain(pool) == ["docs", "unit"]
+    assert len(pool) == 0
+
+
+def test_fractional_cpus_add_up_exactly():
+    pool = ResourcePool(Capacity(cpus=1))
+    for i in range(10):
+        pool.push(Job(name=f"j{i}", cpus=0.1), i)
+    assert len(drain(pool)) == 10
+
+
+def test_memory_and_exclusive_groups():
+    pool = ResourcePool(Capacity(cpus=8, memory=8 << 30))
+    pool.push(Job(name="big", memory=6 << 30), 0)
+    pool.push(Job(name="also-big", memory=4 << 30), 1)
+    pool.push(Job(name="db1", exclusive_group="db"), 2)
+    pool.push(Job(name="db2", exclusive_group="db"), 3)
+
+    assert drain(pool) == ["big", "db1"]
+    pool.release(Job(name="db1"))
+    assert drain(pool) == ["db2"]
+    pool.release(Job(name="big"))
+    assert drain(pool) == ["also-big"]
+
+
+def test_oversized_job_runs_alone_instead_of_never():
+    pool = ResourcePool(Capacity(cpus=2, memory=1 << 30))
+    pool.push(Job(name="huge", cpus=64, memory=1 << 40), 0)
+    pool.push(Job(name="small"), 1)
+    assert drain(pool) == ["huge"]
+    pool.release(Job(name="huge"))
+    assert drain(pool) == ["small"]
+
+
+def test_large_job_is_not_starved_by_small_ones():
+    pool = ResourcePool(Capacity(cpus=2))
+    for i in range(2):
+        pool.push(Job(name=f"small{i}"), i)
+    running = drain(pool)
+    pool.push(Job(name="large", cpus=2), 10)
+
+    # Small jobs keep arriving and would always fit in the CPU just freed;
+    # after overtaking the large one twice they have to wait for it
+    started = []
+    for i in range(2, 10):
+        pool.push(Job(name=f"small{i}"), i)
+        pool.release(Job(name=running.pop(0)))
+        new = drain(pool)
+        running += new
+        started += new
+        if "large" in new:
+            break
+    assert started == ["small2", "small3", "large"]
+
+
+def test_without_capacity_only_groups_limit():
+    pool = ResourcePool()
+    for i in range(100):
+        pool.push(Job(name=f"j{i}", cpus=16, exclusive_group="x" if i < 2 else None), i)
+    assert len(drain(pool)) == 99
+
+
+def test_machine_capacity():
+    capacity = machine_capacity()
+    assert capacity.cpus >= 1
+    assert capacity.memory is None or capacity.memory > 0
+
+
+def test_job_decorator_accepts_resources():
+    pipe = Pipeline(name="res")
+
+    @job(pipeline=pipe, cpus=4, memory="2G", exclusive_group="db")
+    def integration():
+        pass
+
+    declared = pipe.jobs["integration"]
+    assert (declared.cpus, declared.memory, declared.exclusive_group) == (4, 2 << 30, "db")
+    with pytest.raises(ValueError):
+        job(pipeline=pipe, cpus=-1)
+
+
+@dataclass
+class Track(Step):
+    """Records the largest number of jobs running at once."""
+
+    state: dict[str, int] | None = None
+    lock: Any = None
+
+    def execute(self, context: Any) -> None:
+        assert self.state is not None
+        with self.lock:
+            self.state["now"] += 1
+            self.state["peak"] = max(self.state["peak"], self.state["now"])
+        time.sleep(0.05)
+        with self.lock:
+            self.state["now"] -= 1
+
+    def to_github_dict(self) -> dict[str, Any]:
+        return {"run": "true"}
+
+
+@pytest.mark.parametrize("Runner", [LocalRunner, AsyncRunner])
+@pytest.mark.parametrize(
+    ("cpus", "group", "peak"),
+    [(2, None, 2), (1, None, 4), (1, "db", 1)],
+)
+def test_runners_respect_capacity(Runner, cpus, group, peak):
+    state = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    pipe = Pipeline(name="res")
+    for i in range(6):
+        step = Track(state=state, lock=lock)
+        pipe.add_job(Job(name=f"j{i}", steps=[step], cpus=cpus, exclusive_group=group))
+
+    assert Runner(pipe, jobs=6, capacity=Capacity(cpus=4)).run().ok
+    assert state["peak"] == peak
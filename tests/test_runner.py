@@ -0,0 +1,237 @@
+import shlex
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+
+from pygha.async_runner import AsyncRunner
+from pygha.graph import InvalidPipelineError
+from pygha.models import Job, Pipeline, Step
+from pygha.runner import JobContext, LocalRunner
+from pygha.steps.builtin import RunShellStep
+
+# Every scheduling test runs against both backends
+backends = pytest.mark.parametrize("Runner", [LocalRunner, AsyncRunner])
+
+
+@dataclass
+class Sleep(Step):
+    """Records when it ran; fails when asked to."""
+
+    seconds: float = 0.0
+    fail: bool = False
+    log: list[tuple[str, str, float]] = field(default_factory=list)
+
+    def execute(self, context: Any) -> None:
+        self.log.append((context.job.name, "start", time.perf_counter()))
+        time.sleep(self.seconds)
+        self.log.append((context.job.name, "end", time.perf_counter()))
+        if self.fail:
+            raise RuntimeError("boom")
+
+    def to_github_dict(self) -> dict[str, Any]:
+        return {"run": "true"}
+
+
+def _pipeline(spec: dict[str, tuple[set[str], list[Step]]]) -> Pipeline:
+    pipe = Pipeline(name="local")
+    for name, (deps, steps) in spec.items():
+        pipe.add_job(Job(name=name, depends_on=deps, steps=steps))
+    return pipe
+
+
+def _python(code: str) -> RunShellStep:
+    return RunShellStep(command=f"{shlex.quote(sys.executable)} -c {shlex.quote(code)}")
+
+
+@backends
+def test_jobs_start_as_soon_as_their_dependencies_succeed(Runner):
+    log: list[tuple[str, str, float]] = []
+    pipe = _pipeline(
+        {
+            "slow": (set(), [Sleep(seconds=0.4, log=log)]),
+            "fast": (set(), [Sleep(seconds=0.05, log=log)]),
+            "after_fast": ({"fast"}, [Sleep(seconds=0.05, log=log)]),
+            "after_both": ({"slow", "after_fast"}, [Sleep(log=log)]),
+        }
+    )
+
+    result = Runner(pipe, jobs=2).run()
+
+    assert result.ok
+    times = {(job, event): t for job, event, t in log}
+    # Level-by-level scheduling would hold 'after_fast' back until 'slow' is done
+    assert times["after_fast", "start"] < times["slow", "end"]
+    assert times["after_both", "start"] >= times["slow", "end"]
+    assert list(result.jobs) == ["slow", "fast", "after_fast", "after_both"]
+
+
+@backends
+def test_independent_jobs_overlap(Runner):
+    pipe = _pipeline({name: (set(), [Sleep(seconds=0.3)]) for name in "abcd"})
+    start = time.perf_counter()
+    assert Runner(pipe, jobs=4).run().ok
+    assert time.perf_counter() - start < 0.9  # serial would be 1.2s
+
+
+@backends
+def test_steps_run_in_order_and_failure_stops_the_job(Runner):
+    log: list[tuple[str, str, float]] = []
+    pipe = _pipeline(
+        {
+            "only": (
+                set(),
+                [Sleep(log=log), Sleep(fail=True, log=log), Sleep(seconds=5, log=log)],
+            ),
+            "later": ({"only"}, [Sleep(log=log)]),
+        }
+    )
+
+    result = Runner(pipe).run()
+
+    assert not result.ok
+    assert result.jobs["only"].status == "failed"
+    assert result.jobs["only"].error == "boom"
+    assert [(s.label, s.status) for s in result.jobs["only"].steps] == [
+        ("1", "success"),
+        ("2", "failed"),
+    ]
+    assert result.jobs["later"].status == "skipped"
+    assert [event for _, event, _ in log] == ["start", "end", "start", "end"]
+
+
+@backends
+def test_failure_cancels_running_siblings(Runner):
+    pipe = _pipeline(
+        {
+            "sleeper": (set(), [_python("import time; time.sleep(30)"), Sleep()]),
+            "broken": (set(), [Sleep(seconds=0.2, fail=True)]),
+            "waiting": (set(), [Sleep()]),
+        }
+    )
+
+    start = time.perf_counter()
+    result = Runner(pipe, jobs=2).run()
+
+    assert time.perf_counter() - start < 10
+    assert [r.status for r in result.jobs.values()] == ["cancelled", "failed", "skipped"]
+    assert result.count("cancelled") == 1
+
+
+@backends
+def test_shell_output_is_prefixed_and_exit_codes_fail(Runner, capsys):
+    pipe = _pipeline(
+        {
+            "hello": (set(), [_python("print('hi there')")]),
+            "bad": ({"hello"}, [_python("import sys; sys.exit(3)")]),
+        }
+    )
+
+    result = Runner(pipe).run()
+
+    assert "hi there" in capsys.readouterr().out
+    assert result.jobs["bad"].status == "failed"
+    assert "exit status 3" in result.jobs["bad"].error
+
+
+@dataclass
+class Buggy(Step):
+    """Raises what no step raises on purpose."""
+
+    def execute(self, context: Any) -> None:
+        {}["missing"]
+
+    def to_github_dict(self) -> dict[str, Any]:
+        return {"run": "true"}
+
+
+@backends
+def test_a_bug_in_a_step_stops_the_run_with_its_traceback(Runner, capsys):
+    pipe = _pipeline(
+        {
+            "sleeper": (set(), [_python("import time; time.sleep(30)")]),
+            "buggy": (set(), [Buggy()]),
+        }
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(KeyError, match="missing"):
+        Runner(pipe, jobs=2).run()
+
+    assert time.perf_counter() - start < 10
+    assert "step raised KeyError, stopping the run" in capsys.readouterr().out
+
+
+def test_run_command_refuses_to_start_after_cancel():
+    cancelled = threading.Event()
+    cancelled.set()
+    context = JobContext(Job(name="x"), cancelled)
+    with pytest.raises(BaseException, match="x"):
+        context.run_command([sys.executable, "-c", "pass"])
+
+
+@backends
+def test_invalid_graphs_are_rejected_before_running(Runner):
+    pipe = _pipeline({"a": ({"missing"}, [Sleep()])})
+    with pytest.raises(InvalidPipelineError):
+        Runner(pipe).run()
+    with pytest.raises(ValueError):
+        Runner(pipe, jobs=0)
+
+
+def test_async_backend_runs_many_commands_concurrently():
+    pipe = _pipeline(
+        {f"shard{i}": (set(), [_python("import time; time.sleep(0.5)")]) for i in range(100)}
+    )
+
+    start = time.perf_counter()
+    result = AsyncRunner(pipe, jobs=100).run()
+
+    assert result.ok
+    assert time.perf_counter() - start < 10  # serial would be 50s
+    assert threading.active_count() < 20  # no thread per command
+
+
+def test_async_output_has_job_and_step_prefixes(capsys):
+    pipe = _pipeline(
+        {
+            "lint": (
+                set(),
+                [
+                    RunShellStep(command=_python("print('first')").command, name="ruff"),
+                    _python("print('x' * 5000); print('second')"),
+                ],
+            )
+        }
+    )
+
+    assert AsyncRunner(pipe).run().ok
+
+    out = capsys.readouterr().out.splitlines()
+    assert "[lint/ruff] first" in out
+    assert "[lint/2] second" in out
+    assert f"[lint/2] {'x' * 5000}" in out
+    assert out[0] == "[lint] started" and out[-1].startswith("[lint] success after")
+
+
+def test_async_step_timeouts():
+    slow = _python("import time; time.sleep(30)")
+    pipe = _pipeline(
+        {
+            "limited": (set(), [RunShellStep(command=slow.command, timeout_minutes=0.005)]),
+        }
+    )
+
+    start = time.perf_counter()
+    result = AsyncRunner(pipe).run()
+    assert time.perf_counter() - start < 10
+    assert result.jobs["limited"].status == "failed"
+    assert "timed out after 0.3s" in result.jobs["limited"].error
+
+    pipe = _pipeline({"default": (set(), [slow]), "threaded": (set(), [Sleep(seconds=0.1)])})
+    result = AsyncRunner(pipe, jobs=2, step_timeout=0.5).run()
+    assert result.jobs["default"].status == "failed"
+    assert result.jobs["threaded"].status == "success"
@@ -0,0 +1,115 @@
+import asyncio
+import shutil
+import time
+
+import pytest
+
+from pygha.async_runner import AsyncRunner
+from pygha.models import Job, Pipeline
+from pygha.shell_session import BashSession
+from pygha.steps.builtin import RunShellStep
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+
+
+def _run_session(scripts):
+    lines: list[str] = []
+
+    async def on_line(line):
+        lines.append(line)
+
+    async def main():
+        session = BashSession(on_line)
+        try:
+            return [await session.run(script) for script in scripts]
+        finally:
+            await session.close()
+
+    return asyncio.run(main()), lines
+
+
+def test_state_carries_over_between_scripts():
+    codes, lines = _run_session(
+        [
+            "export GREETING=hello; cd /",
+            "echo $GREETING from $(pwd)",
+            "printf 'no newline'",
+            "echo a | tr a b; false | true",
+            "exit 7",
+            "echo ${GREETING:-fresh session}",
+        ]
+    )
+    assert codes == [0, 0, 0, 1, 7, 0]
+    assert lines == ["hello from /", "no newline", "b", "fresh session"]
+
+
+def test_scripts_do_not_read_the_session_input():
+    codes, lines = _run_session(["cat; echo done", "echo still here"])
+    assert codes == [0, 0]
+    assert lines == ["done", "still here"]
+
+
+def test_first_failing_command_fails_the_script():
+    codes, lines = _run_session(
+        [
+            "export KEPT=yes",
+            "echo $KEPT; false; echo not reached",
+            "echo ${KEPT:-fresh session}",
+            "set +e; false; echo opted out",
+            "(exit 3)",
+        ]
+    )
+    assert codes == [0, 1, 0, 0, 3]
+    assert lines == ["yes", "fresh session", "opted out"]
+
+
+def test_syntax_errors_only_fail_their_step():
+    codes, _ = _run_session(["if then", "true"])
+    assert codes[0] != 0 and codes[1] == 0
+
+
+def _pipeline(*steps: RunShellStep) -> Pipeline:
+    pipe = Pipeline(name="session")
+    pipe.add_job(Job(name="job", steps=list(steps)))
+    return pipe
+
+
+def test_runner_keeps_step_boundaries(capsys):
+    pipe = _pipeline(
+        RunShellStep(command="export N=41", name="set"),
+        RunShellStep(command="echo $((N + 1)) | cat"),
+        RunShellStep(command="test $N = 0", name="check"),
+        RunShellStep(command="echo never"),
+    )
+
+    result = AsyncRunner(pipe, shell_session=True).run()
+
+    job = result.jobs["job"]
+    assert job.status == "failed"
+    assert [(s.label, s.status, s.returncode) for s in job.steps] == [
+        ("set", "success", None),
+        ("2", "success", None),
+        ("check", "failed", 1),
+    ]
+    out = capsys.readouterr().out
+    assert "[job/2] 42" in out and "never" not in out
+
+
+def test_many_tiny_steps_share_one_process():
+    steps = [RunShellStep(command=f"X=$((${{X:-0}} + {i}))") for i in range(60)]
+    steps.append(RunShellStep(command="test $X = 1770"))
+    pipe = _pipeline(*steps)
+
+    start = time.perf_counter()
+    result = AsyncRunner(pipe, shell_session=True).run()
+    assert result.ok, result.jobs["job"]
+    assert len(result.jobs["job"].steps) == 61
+    assert time.perf_counter() - start < 10
+
+
+def test_timeouts_kill_the_session():
+    pipe = _pipeline(RunShellStep(command="sleep 30", timeout_minutes=0.005))
+    start = time.perf_counter()
+    result = AsyncRunner(pipe, shell_session=True).run()
+    assert time.perf_counter() - start < 10
+    assert "timed out" in result.jobs["job"].error
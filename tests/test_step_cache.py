@@ -0,0 +1,153 @@
+import os
+import shlex
+import sys
+import time
+
+import pytest
+
+from pygha.async_runner import AsyncRunner
+from pygha.models import Job, Pipeline
+from pygha.runner import LocalRunner
+from pygha.step_cache import StepCache, expand_inputs, format_size, parse_size
+from pygha.steps.builtin import RunShellStep
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def project(tmp_path):
+    write(tmp_path / "src" / "pkg" / "a.py", "A = 1\n")
+    write(tmp_path / "src" / "pkg" / "gen" / "b.py", "B = 2\n")
+    write(tmp_path / "pyproject.toml", "[project]\n")
+    write(tmp_path / ".git" / "HEAD", "ref\n")
+    return tmp_path
+
+
+def test_expand_inputs(project):
+    assert expand_inputs(["src/**/*.py", "pyproject.toml"], project) == [
+        "pyproject.toml",
+        "src/pkg/a.py",
+        "src/pkg/gen/b.py",
+    ]
+    assert expand_inputs(["src", "!src/**/gen/**", "$HOME"], project) == ["src/pkg/a.py"]
+    assert expand_inputs(["**"], project) == ["pyproject.toml", "src/pkg/a.py", "src/pkg/gen/b.py"]
+    assert expand_inputs(["missing/**", "nope.txt"], project) == []
+
+
+def test_key_tracks_command_inputs_and_environment(project, monkeypatch):
+    cache = StepCache(project / "store", root=project)
+    step = RunShellStep(command="make", inputs=("src/**", "$MODE"))
+    assert cache.key(RunShellStep(command="make")) is None
+
+    monkeypatch.setenv("MODE", "release")
+    key = cache.key(step)
+    assert key == cache.key(RunShellStep(command="make", inputs=("src/**", "$MODE")))
+    assert key != cache.key(RunShellStep(command="make -j", inputs=("src/**", "$MODE")))
+
+    monkeypatch.setenv("MODE", "debug")
+    assert cache.key(step) != key
+    monkeypatch.setenv("MODE", "release")
+
+    time.sleep(0.01)
+    write(project / "src" / "pkg" / "a.py", "A = 2\n")
+    assert cache.key(step) != key
+
+
+def test_store_and_restore_outputs(project):
+    cache = StepCache(project / "store", root=project)
+    step = RunShellStep(command="build", inputs=("src/**",), outputs=("dist", "report.txt"))
+    key = cache.key(step)
+    assert not cache.restore(key)
+    assert not cache.store(key, step)  # outputs missing
+
+    write(project / "dist" / "pkg.whl", "wheel")
+    write(project / "report.txt", "ok")
+    os.chmod(project / "report.txt", 0o600)
+    assert cache.store(key, step)
+
+    (project / "dist" / "pkg.whl").unlink()
+    (project / "report.txt").unlink()
+    assert cache.restore(key)
+    assert (project / "dist" / "pkg.whl").read_text() == "wheel"
+    assert (project / "report.txt").stat().st_mode & 0o777 == 0o600
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_prune_evicts_least_recently_used(project):
+    cache = StepCache(project / "store", root=project)
+    keys = []
+    for i in range(3):
+        write(project / f"out{i}.bin", str(i) * 1000)
+        step = RunShellStep(
+            command=f"gen {i}", inputs=("pyproject.toml",), outputs=(f"out{i}.bin",)
+        )
+        keys.append(cache.key(step))
+        assert cache.store(keys[-1], step)
+        os.utime(project / "store" / "actions" / f"{keys[-1]}.json", (i, i))
+    assert cache.restore(keys[0])  # now the most recently used
+
+    assert cache.stats().size == 3000
+    assert cache.prune(2000) == (1, 1000)
+    assert cache.restore(keys[0]) and cache.restore(keys[2])
+    assert not cache.restore(keys[1])
+
+    assert cache.prune(0) == (2, 2000)
+    stats = cache.stats()
+    assert (stats.entries, stats.objects, stats.size) == (0, 0, 0)
+
+
+def test_prune_and_stats_skip_malformed_actions(project):
+    cache = StepCache(project / ".pygha-cache" / "steps", root=project)
+    write(project / "out.bin", "x" * 1000)
+    step = RunShellStep(command="gen", outputs=("out.bin",))
+    assert cache.store(cache.key(step), step)
+    for key, text in (("b" * 64, '{"format": 1}'), ("c" * 64, '{"format": 1, "files": 3}')):
+        write(cache.action_path(key), text)
+
+    assert cache.stats().entries == 1
+    assert cache.prune(0) == (1, 1000)
+
+
+def test_sizes():
+    assert parse_size("500M") == 500 << 20
+    assert parse_size("2GiB") == 2 << 30
+    assert parse_size("1.5k") == 1536
+    assert parse_size("0") == 0
+    with pytest.raises(ValueError):
+        parse_size("lots")
+    assert format_size(512) == "512 B"
+    assert format_size(3 << 20) == "3.0 MiB"
+
+
+@pytest.mark.parametrize("Runner", [LocalRunner, AsyncRunner])
+def test_runner_skips_cached_steps(project, monkeypatch, Runner):
+    monkeypatch.chdir(project)
+    script = project / "build.py"
+    write(
+        script,
+        "import pathlib\n"
+        "count = pathlib.Path('count.txt')\n"
+        "count.write_text(str(int(count.read_text()) + 1 if count.exists() else 1))\n"
+        "pathlib.Path('dist').mkdir(exist_ok=True)\n"
+        "pathlib.Path('dist/out.txt').write_text(pathlib.Path('src/pkg/a.py').read_text())\n",
+    )
+    command = f"{shlex.quote(sys.executable)} build.py"
+    step = RunShellStep(command=command, inputs=("src/**",), outputs=("dist",))
+    pipe = Pipeline(name="cached")
+    pipe.add_job(Job(name="build", steps=[step]))
+    cache = StepCache(project / "store", root=project)
+
+    assert Runner(pipe, cache=cache).run().ok
+    (project / "dist" / "out.txt").unlink()
+    result = Runner(pipe, cache=cache).run()
+
+    assert result.jobs["build"].steps[0].cached
+    assert (project / "count.txt").read_text() == "1"
+    assert (project / "dist" / "out.txt").read_text() == "A = 1\n"
+
+    write(project / "src" / "pkg" / "a.py", "A = 3\n")
+    assert not Runner(pipe, cache=cache).run().jobs["build"].steps[0].cached
+    assert (project / "count.txt").read_text() == "2"
@@ -158,6 +158,13 @@ def test_shell_named_to_github_dict():
     assert s.to_github_dict() == {"name": "Run tests", "run": "pytest -v"}
 
 
+def test_shell_timeout_to_github_dict():
+    s = RunShellStep(command="pytest -v", timeout_minutes=10.0)
+    assert s.to_github_dict() == {"run": "pytest -v", "timeout-minutes": 10}
+    s = RunShellStep(command="pytest -v", timeout_minutes=1.5)
+    assert s.to_github_dict()["timeout-minutes"] == 1.5
+
+
 def test_shell_execute_runs_subprocess(monkeypatch):
     called = {}
 
@@ -0,0 +1,82 @@
+import json
+
+from pygha import trace
+from pygha.async_runner import AsyncRunner
+from pygha.cli import main as cli_main
+from pygha.models import Job, Pipeline
+from pygha.steps.builtin import RunShellStep
+
+
+def spans(path):
+    return [e for e in json.loads(path.read_text())["traceEvents"] if e["ph"] == "X"]
+
+
+def test_span_is_a_shared_no_op_when_disabled():
+    assert not trace.enabled()
+    assert trace.span("a") is trace.span("b", "cat", lane=1, x=1)
+
+
+def test_tracing_records_nested_spans(tmp_path):
+    out = tmp_path / "trace.json"
+    with trace.tracing(out):
+        assert trace.enabled()
+        with trace.span("outer", "test", n=1), trace.span("inner", "test"):
+            pass
+        try:
+            with trace.span("broken"):
+                raise KeyError("x")
+        except KeyError:
+            pass
+    assert not trace.enabled()
+
+    data = json.loads(out.read_text())
+    assert {
+        "name": "process_name",
+        "ph": "M",
+        "pid": data["traceEvents"][0]["pid"],
+        "args": {"name": "pygha"},
+    } == data["traceEvents"][0]
+    inner, outer, broken = spans(out)
+    assert (outer["name"], outer["cat"], outer["args"]) == ("outer", "test", {"n": 1})
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert broken["args"] == {"error": "KeyError"}
+
+
+def test_concurrent_jobs_get_their_own_lanes(tmp_path):
+    pipe = Pipeline(name="ci")
+    for name in "abc":
+        pipe.add_job(Job(name=name, steps=[RunShellStep(command="sleep 0.2")]))
+    out = tmp_path / "run.json"
+    with trace.tracing(out):
+        assert AsyncRunner(pipe, jobs=3).run().ok
+
+    events = spans(out)
+    jobs = {e["name"]: e["tid"] for e in events if e["cat"] == "job"}
+    assert len(set(jobs.values())) == 3
+    steps = {e["name"]: e["tid"] for e in events if e["cat"] == "step"}
+    assert steps == {f"{name}/1": tid for name, tid in jobs.items()}
+
+
+def test_build_trace_covers_the_phases(tmp_path, capsys):
+    src_dir = tmp_path / ".pipe"
+    src_dir.mkdir()
+    (src_dir / "pipeline_a.py").write_text(
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "job(name='build')(lambda: shell('make'))\n"
+    )
+    out = tmp_path / "build.json"
+    args = ["build", "--src-dir", str(src_dir), "--out-dir", str(tmp_path / "wf"), "--no-daemon"]
+    assert cli_main([*args, "--trace", str(out)]) == 0
+    assert f"trace spans to {out}" in capsys.readouterr().out
+
+    names = {e["name"] for e in spans(out)}
+    assert {
+        "discover",
+        "run_path",
+        "get_job_order",
+        "to_dict",
+        "emit",
+        "write",
+        "manifest",
+    } <= names
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import shlex
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+from pygha.async_runner import AsyncRunner
+from pygha.models import Job, Pipeline, Step
+from pygha.runner import JobResult, LocalRunner, RunResult, StepResult
+from pygha.steps.builtin import RunShellStep
+from pygha.usage import HAVE_WAIT4, ResourceUsage, format_table, to_json
+
+pytestmark = pytest.mark.skipif(not HAVE_WAIT4, reason="needs os.wait4")
+
+MIB = 1 << 20
+
+ALLOCATE = "import sys; data = bytearray(int(sys.argv[1]) << 20); sum(range(300_000))"
+
+
+def python(*args: str) -> str:
+    return shlex.join([sys.executable, "-c", *args])
+
+
+@dataclass
+class TwoCommands(Step):
+    """Runs two commands in one step."""
+
+    def execute(self, context: Any) -> None:
+        for size in ("150", "10"):
+            assert context.run_command(shlex.split(python(ALLOCATE, size))) == 0
+
+    def to_github_dict(self) -> dict[str, Any]:
+        return {"run": "true"}
+
+
+@pytest.mark.parametrize("Runner", [LocalRunner, AsyncRunner])
+def test_steps_report_their_commands_usage(Runner):
+    pipe = Pipeline(name="usage")
+    pipe.add_job(Job(name="big", steps=[RunShellStep(command=python(ALLOCATE, "200"))]))
+    pipe.add_job(Job(name="small", steps=[RunShellStep(command=python("pass"))]))
+    pipe.add_job(Job(name="both", steps=[TwoCommands()]))
+
+    result = Runner(pipe, jobs=3).run()
+    assert result.ok
+    big, small, both = (result.jobs[name].steps[0].usage for name in ("big", "small", "both"))
+    assert big is not None and small is not None and both is not None
+
+    assert big.max_rss > 200 * MIB
+    assert big.cpu > 0
+    # Reaped one by one, so jobs running at the same time do not mix
+    assert small.max_rss < big.max_rss - 100 * MIB
+    # Two commands: CPU adds up, memory is the larger peak
+    assert 150 * MIB < both.max_rss < big.max_rss
+    assert both.cpu > small.cpu
+
+
+def test_async_reaps_without_pidfds_outside_the_default_executor(monkeypatch):
+    def no_pidfd(pid: int) -> int:
+        raise OSError("no pidfds here")
+
+    monkeypatch.setattr(os, "pidfd_open", no_pidfd, raising=False)
+    pipe = Pipeline(name="usage")
+    pipe.add_job(Job(name="a", steps=[TwoCommands()]))
+    pipe.add_job(Job(name="b", steps=[TwoCommands()]))
+
+    async def run() -> RunResult:
+        # execute() steps take every thread of the default executor
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(2))
+        return await asyncio.wait_for(AsyncRunner(pipe, jobs=2).run_async(), 10)
+
+    result = asyncio.run(run())
+    assert result.ok
+    for name in ("a", "b"):
+        usage = result.jobs[name].steps[0].usage
+        assert usage is not None and usage.max_rss > 150 * MIB
+
+
+def test_steps_without_commands_have_no_usage():
+    @dataclass
+    class Nothing(Step):
+        def execute(self, context: Any) -> None:
+            pass
+
+        def to_github_dict(self) -> dict[str, Any]:
+            return {"run": "true"}
+
+    pipe = Pipeline(name="usage")
+    pipe.add_job(Job(name="idle", steps=[Nothing()]))
+    assert LocalRunner(pipe).run().jobs["idle"].steps[0].usage is None
+
+
+def test_usage_adds_up():
+    a = ResourceUsage(1.0, 0.5, 10, 1, 2, 3, 4)
+    b = ResourceUsage(2.0, 0.25, 30, 1, 1, 1, 1)
+    assert a + b == ResourceUsage(3.0, 0.75, 30, 2, 3, 4, 5)
+    assert (a + b).cpu == 3.75
+
+
+def test_table_and_json():
+    usage = ResourceUsage(1.5, 0.25, 64 * MIB, 8, 16, 10, 2)
+    steps = [
+        StepResult("build", "success", 2.0, usage=usage),
+        StepResult("test", "success", 0.1, cached=True),
+    ]
+    result = RunResult(jobs={"ci": JobResult("ci", "success", 2.1, steps=steps)}, duration=2.2)
+
+    header, build, test, total = format_table(result)
+    assert header.split()[:4] == ["step", "wall", "user", "sys"]
+    assert build.split() == [
+        "ci/build",
+        "2.00s",
+        "1.50s",
+        "0.25s",
+        "64.0",
+        "MiB",
+        "8",
+        "16",
+        "10/2",
+    ]
+    assert test.split() == ["ci/test", "0.10s", "cached"]
+    assert total.split()[:2] == ["total", "2.20s"]
+
+    report = to_json(result, "ci")
+    steps_json = report["jobs"][0]["steps"]
+    assert steps_json[0]["usage"]["max_rss"] == 64 * MIB
+    assert steps_json[1] == {
+        "label": "test",
+        "status": "success",
+        "duration": 0.1,
+        "cached": True,
+        "usage": None,
+    }
@@ -0,0 +1,232 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from pygha import registry
+from pygha.models import Pipeline
+from pygha.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    Watcher,
+    affected_files,
+    make_watcher,
+    watch,
+)
+
+from .conftest import write
+
+pytestmark = pytest.mark.usefixtures("clean_registry")
+
+
+def _uses_helper(job_name: str) -> str:
+    return (
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "import helpers\n"
+        f"@job(name={job_name!r})\n"
+        "def body():\n"
+        "    shell(helpers.COMMAND)\n"
+    )
+
+
+class ScriptedWatcher(Watcher):
+    """Replays a list of callbacks; each returns the change set for one wait()."""
+
+    def __init__(self, root, script):
+        super().__init__(root)
+        self.script = list(script)
+        self.closed = False
+
+    def wait(self, timeout=None):
+        if not self.script:
+            raise KeyboardInterrupt
+        return self.script.pop(0)()
+
+    def close(self):
+        self.closed = True
+
+
+def test_watch_rebuilds_only_files_importing_changed_helper(tmp_path, monkeypatch, capsys):
+    src = tmp_path / ".pipe"
+    write(src / "helpers.py", 'COMMAND = "make one"\n')
+    write(src / "pipeline_a.py", _uses_helper("a"))
+    write(
+        src / "release_pipeline.py",
+        "from pygha import job, pipeline\n"
+        "from pygha.steps import shell\n"
+        "@job(name='publish', pipeline=pipeline('release'))\n"
+        "def publish():\n"
+        "    shell('twine upload dist/*')\n",
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(src))
+    monkeypatch.delitem(sys.modules, "helpers", raising=False)
+
+    def edit_helper():
+        write(src / "helpers.py", 'COMMAND = "make two, longer"\n')
+        return {(src / "helpers.py").resolve()}
+
+    watcher = ScriptedWatcher(src, [edit_helper])
+    try:
+        assert watch(str(src), "out", watcher=watcher) == 0
+    finally:
+        sys.modules.pop("helpers", None)
+
+    out = capsys.readouterr().out
+    rebuild = out.split("Change detected", 1)[1]
+    assert "rebuilding pipeline_a.py" in rebuild
+    assert f"Running {src / 'pipeline_a.py'}" in rebuild
+    assert f"Cached {src / 'release_pipeline.py'}" in rebuild
+    assert f"Unchanged {Path('out') / 'release.yml'}" in rebuild
+    assert "Stopped watching" in out
+    assert watcher.closed
+    assert "make two, longer" in (Path("out") / "ci.yml").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize(
+    "broken",
+    ["raise RuntimeError('boom')\n", "def (\n", "undefined_name\n", "import not_a_module\n"],
+    ids=["raises", "syntax", "name", "import"],
+)
+def test_watch_survives_broken_pipeline_file(tmp_path, monkeypatch, capsys, broken):
+    src = tmp_path / ".pipe"
+    write(src / "pipeline_a.py", broken)
+    monkeypatch.chdir(tmp_path)
+
+    def fix():
+        write(src / "pipeline_a.py", "from pygha import pipeline\npipeline('fixed')\n")
+        return {(src / "pipeline_a.py").resolve()}
+
+    assert watch(str(src), "out", watcher=ScriptedWatcher(src, [fix])) == 0
+
+    assert "Build failed" in capsys.readouterr().out
+    assert (Path("out") / "fixed.yml").exists()
+
+
+def test_watch_reimports_modules_that_import_a_changed_helper(tmp_path, monkeypatch, capsys):
+    src = tmp_path / ".pipe"
+    write(src / "leaf.py", 'CMD = "echo one"\n')
+    write(src / "middle.py", "from leaf import CMD\n")
+    write(
+        src / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "from middle import CMD\n"
+        "job(name='a')(lambda: shell(CMD))\n",
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(src))
+
+    def edit_leaf():
+        write(src / "leaf.py", 'CMD = "echo two"\n')
+        return {(src / "leaf.py").resolve()}
+
+    try:
+        assert watch(str(src), "out", watcher=ScriptedWatcher(src, [edit_leaf])) == 0
+        workflow = (Path("out") / "ci.yml").read_text(encoding="utf-8")
+        assert "echo two" in workflow and "echo one" not in workflow
+
+        # The build cache holds the new YAML, not the stale one
+        for name in ("leaf", "middle"):
+            sys.modules.pop(name, None)
+        (Path("out") / "ci.yml").unlink()
+        registry._pipelines = {"ci": Pipeline(name="ci")}
+        assert watch(str(src), "out", watcher=ScriptedWatcher(src, [])) == 0
+        assert "echo two" in (Path("out") / "ci.yml").read_text(encoding="utf-8")
+    finally:
+        for name in ("leaf", "middle"):
+            sys.modules.pop(name, None)
+
+
+def test_watch_keeps_pipelines_configured_in_unchanged_helpers(tmp_path, monkeypatch):
+    src = tmp_path / ".pipe"
+    write(
+        src / "helpers.py",
+        "from pygha import pipeline\nrelease = pipeline('release', on_push=['release-branch'])\n",
+    )
+    write(
+        src / "pipeline_a.py",
+        "from pygha import job\n"
+        "from pygha.steps import shell\n"
+        "import helpers\n"
+        "job(name='a', pipeline=helpers.release)(lambda: shell('echo one'))\n",
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(src))
+    monkeypatch.delitem(sys.modules, "helpers", raising=False)
+
+    def edit_pipeline():
+        text = (src / "pipeline_a.py").read_text(encoding="utf-8")
+        write(src / "pipeline_a.py", text.replace("echo one", "echo two"))
+        return {(src / "pipeline_a.py").resolve()}
+
+    try:
+        assert watch(str(src), "out", watcher=ScriptedWatcher(src, [edit_pipeline])) == 0
+    finally:
+        sys.modules.pop("helpers", None)
+
+    workflow = (Path("out") / "release.yml").read_text(encoding="utf-8")
+    assert "echo two" in workflow
+    assert "release-branch" in workflow and "main" not in workflow
+
+
+def test_affected_files_follows_transitive_imports(tmp_path):
+    write(tmp_path / "base.py", "")
+    write(tmp_path / "helpers.py", "import base\n")
+    write(tmp_path / "pipeline_a.py", "import helpers\n")
+    write(tmp_path / "pipeline_b.py", "import os\n")
+    files = [tmp_path / "pipeline_a.py", tmp_path / "pipeline_b.py"]
+
+    changed = {(tmp_path / "base.py").resolve()}
+    assert affected_files(files, changed, [tmp_path]) == [tmp_path / "pipeline_a.py"]
+
+    changed = {(tmp_path / "pipeline_b.py").resolve()}
+    assert affected_files(files, changed, [tmp_path]) == [tmp_path / "pipeline_b.py"]
+
+
+def test_polling_watcher_reports_modified_created_and_deleted(tmp_path):
+    write(tmp_path / "pipeline_a.py", "x = 1\n")
+    write(tmp_path / "gone.py", "")
+    write(tmp_path / "notes.txt", "")
+    watcher = PollingWatcher(tmp_path, interval=0.01)
+
+    write(tmp_path / "pipeline_a.py", "x = 22\n")
+    write(tmp_path / "new.py", "")
+    write(tmp_path / "notes.txt", "ignored")
+    (tmp_path / "gone.py").unlink()
+
+    changed = watcher.wait(timeout=1)
+    assert changed == {
+        (tmp_path / name).resolve() for name in ("pipeline_a.py", "new.py", "gone.py")
+    }
+    assert watcher.wait(timeout=0.05) == set()
+
+
+def test_watcher_tracks_helpers_outside_root(tmp_path):
+    src = tmp_path / ".pipe"
+    src.mkdir()
+    helper = tmp_path / "lib" / "helpers.py"
+    write(helper, "A = 1\n")
+
+    watcher = PollingWatcher(src, interval=0.01)
+    watcher.track([helper])
+    write(helper, "A = 22\n")
+
+    assert watcher.wait(timeout=1) == {helper.resolve()}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_watcher_reports_python_changes(tmp_path):
+    watcher = make_watcher(tmp_path)
+    if not isinstance(watcher, InotifyWatcher):
+        pytest.skip("inotify unavailable in this environment")
+    try:
+        (tmp_path / "pkg").mkdir()
+        watcher.wait(timeout=0.2)  # picks up the new directory
+        write(tmp_path / "pkg" / "helpers.py", "A = 1\n")
+        write(tmp_path / "readme.md", "ignored")
+
+        assert watcher.wait(timeout=2) == {(tmp_path / "pkg" / "helpers.py").resolve()}
+    finally:
+        watcher.close()
@@ -143,3 +143,90 @@ def test_to_yaml_pretty_and_key_order():
     ).lstrip()
 
     assert out.strip() == expected.strip()
+
+
+def test_to_yaml_stream_yields_header_then_one_chunk_per_job():
+    pipeline = _build_pipeline_basic()
+    chunks = list(GitHubTranspiler(pipeline).to_yaml_stream())
+
+    assert chunks[0].startswith("name: CI\non:\n")
+    assert chunks[1] == "jobs:\n"
+    assert chunks[2].startswith("  build:\n")
+    assert chunks[3].startswith("  test:\n")
+    assert "".join(chunks) == GitHubTranspiler(pipeline).to_yaml()
+
+
+def test_to_yaml_stream_renders_jobs_lazily():
+    pipeline = _build_pipeline_basic()
+    stream = GitHubTranspiler(pipeline).to_yaml_stream()
+    next(stream)
+    next(stream)
+
+    # A job added before it is reached still shows up: nothing was pre-rendered
+    pipeline.jobs["build"].steps.append(RunShellStep(command="echo late"))
+    assert "echo late" in next(stream)
+
+
+def test_write_streams_to_file_handle(tmp_path):
+    pipeline = _build_pipeline_with_checkout_params()
+    path = tmp_path / "ci.yml"
+    with path.open("w", encoding="utf-8") as f:
+        GitHubTranspiler(pipeline).write(f)
+
+    assert path.read_text(encoding="utf-8") == GitHubTranspiler(pipeline).to_yaml()
+
+
+def test_streamed_output_matches_full_ruamel_dump():
+    from io import StringIO
+
+    from ruamel.yaml import YAML
+
+    pipeline = _build_pipeline_basic()
+    # Forces the ruamel fallback for this job only (the line would be folded)
+    pipeline.jobs["test"].steps.append(RunShellStep(command="echo " + "word " * 30))
+
+    yaml12 = YAML()
+    yaml12.indent(mapping=2, sequence=4, offset=2)
+    yaml12.default_flow_style = False
+    buffer = StringIO()
+    yaml12.dump(GitHubTranspiler(pipeline).to_dict(), buffer)
+
+    assert GitHubTranspiler(pipeline).to_yaml() == buffer.getvalue()
+
+
+def test_to_yaml_without_jobs():
+    out = GitHubTranspiler(Pipeline(name="empty")).to_yaml()
+    assert out.endswith("\njobs: {}\n")
+
+
+def test_reduce_needs_emits_minimal_needs():
+    pipeline = _build_pipeline_basic()
+    deploy = FakeJob(
+        name="deploy", steps=[RunShellStep(command="make deploy")], depends_on=["build", "test"]
+    )
+    pipeline.add_job(deploy)
+
+    full = GitHubTranspiler(pipeline).to_dict()
+    reduced = GitHubTranspiler(pipeline, reduce_needs=True).to_dict()
+
+    assert full["jobs"]["deploy"]["needs"] == ["build", "test"]
+    assert reduced["jobs"]["deploy"]["needs"] == ["test"]
+    assert reduced["jobs"]["test"]["needs"] == ["build"]
+    assert (
+        "needs:\n      - test\n    steps" in GitHubTranspiler(pipeline, reduce_needs=True).to_yaml()
+    )
+
+
+def test_job_paths_become_workflow_path_filters():
+    from pygha.models import Job
+
+    pipeline = Pipeline(name="CI")
+    pipeline.add_job(Job(name="lint", paths=["src/**", "pyproject.toml"]))
+    pipeline.add_job(Job(name="docs", paths=["docs/**", "src/**"], depends_on={"lint"}))
+
+    on = GitHubTranspiler(pipeline).to_dict()["on"]
+    assert on["push"]["paths"] == ["src/**", "pyproject.toml", "docs/**"]
+
+    # One job without paths (or any '!' exclusion) means the workflow always runs
+    pipeline.add_job(Job(name="release"))
+    assert "paths" not in (GitHubTranspiler(pipeline).to_dict()["on"]["push"] or {})
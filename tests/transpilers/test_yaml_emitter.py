@@ -0,0 +1,264 @@
+"""
+Differential tests: the fast emitter must produce exactly what ruamel does.
+
+Every document in the corpus is rendered both ways; documents the fast
+emitter declines must raise UnsupportedShape rather than drift.
+"""
+
+import random
+from io import StringIO
+
+import pytest
+from ruamel.yaml import YAML
+
+from pygha.models import Pipeline
+from pygha.steps.builtin import CheckoutStep, RunShellStep
+from pygha.transpilers import github, yaml_emitter
+from pygha.transpilers.github import GitHubTranspiler
+from pygha.transpilers.yaml_emitter import UnsupportedShape, emit
+
+
+def ruamel_dump(document):
+    yaml12 = YAML()
+    yaml12.indent(mapping=2, sequence=4, offset=2)
+    yaml12.default_flow_style = False
+    buffer = StringIO()
+    yaml12.dump(document, buffer)
+    return buffer.getvalue()
+
+
+SCALARS = [
+    "plain",
+    "echo hello world",
+    "3.11",
+    "3",
+    "08",
+    "0o17",
+    "0x1F",
+    "1e5",
+    ".5",
+    ".inf",
+    ".NaN",
+    "true",
+    "False",
+    "yes",
+    "on",
+    "off",
+    "null",
+    "~",
+    "<<",
+    "=",
+    "2024-01-01",
+    "2024-1-1 10:00:00",
+    "_1",
+    "+_",
+    "a,b",
+    "a:b",
+    "a: b",
+    "key:",
+    "?x",
+    "? x",
+    ":x",
+    "- item",
+    "-item",
+    "---",
+    "...x",
+    "#comment",
+    "a #b",
+    "a#b",
+    "it's",
+    "'quoted'",
+    '"double"',
+    "back\\slash",
+    "[list]",
+    "{map}",
+    "&anchor",
+    "*alias",
+    "!tag",
+    "|",
+    ">",
+    "%directive",
+    "@at",
+    "`tick`",
+    " leading",
+    "trailing ",
+    "tab\there",
+    "line one\nline two",
+    "\nleading break",
+    "trailing break\n",
+    "make build\n",
+    "café",
+    "✨ sparkle",
+    "nbsp here",
+    "bom﻿",
+    "next\x85line",
+    "sep line",
+    "nul\x00",
+    "bell\x07",
+    "del\x7f",
+    "",
+    "x" * 70,
+    "x" * 90,
+    "pytest -v --cov=src " + "word " * 20,
+    "${{ matrix.python-version }}",
+    "actions/setup-python@v5",
+    "src/**/*.py",
+]
+
+
+@pytest.mark.parametrize("value", SCALARS)
+def test_scalar_values_match_ruamel(value):
+    document = {"key": value, "seq": [value, "after"], "nested": {"inner": value}}
+    expected = ruamel_dump(document)
+    try:
+        assert emit(document) == expected
+    except UnsupportedShape:
+        # Declining is fine; silently producing different bytes is not
+        pass
+
+
+@pytest.mark.parametrize("key", [k for k in SCALARS if k])
+def test_scalar_keys_match_ruamel(key):
+    document = {key: "value", "jobs": {key: {"runs-on": "ubuntu-latest"}}}
+    expected = ruamel_dump(document)
+    try:
+        assert emit(document) == expected
+    except UnsupportedShape:
+        pass
+
+
+STRUCTURES = [
+    {"name": "CI", "on": {"push": None, "pull_request": None}, "jobs": {}},
+    {"name": "CI", "on": {"push": {"branches": []}}, "jobs": {"a": {"steps": []}}},
+    {"flags": [True, False, 0, 42, -7], "empty": {}, "none": None},
+    {
+        "jobs": {
+            "build": {
+                "runs-on": "ubuntu-latest",
+                "needs": ["lint", "test"],
+                "steps": [
+                    {"uses": "actions/checkout@v4"},
+                    {
+                        "uses": "actions/checkout@v4",
+                        "with": {"repository": "octocat/hello-world", "ref": "main"},
+                    },
+                    {"run": "make build", "env": {"A": "1", "B": "two"}},
+                    {"name": "Matrix", "with": {"versions": ["3.11", "3.12"]}},
+                ],
+            }
+        }
+    },
+]
+
+
+@pytest.mark.parametrize("document", STRUCTURES)
+def test_structures_match_ruamel(document):
+    assert emit(document) == ruamel_dump(document)
+
+
+def test_randomized_corpus_matches_ruamel():
+    rnd = random.Random(20240601)
+    alphabet = list("abxz09_-.:#,[]{}&*!|>'\"%@`?~= \t\n\\/$") + [
+        "é",
+        " ",
+        "\x85",
+        "---",
+        "true",
+        "null",
+        "0x1f",
+        "1e5",
+    ]
+
+    def text():
+        return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 10)))
+
+    def value(depth=0):
+        roll = rnd.random()
+        if depth < 3 and roll < 0.2:
+            return {text() or "k": value(depth + 1) for _ in range(rnd.randint(0, 3))}
+        if depth < 3 and roll < 0.35:
+            return [
+                rnd.choice([text(), {text() or "k": value(depth + 1)}, 7, True]) for _ in range(3)
+            ]
+        if roll < 0.4:
+            return None
+        if roll < 0.45:
+            return rnd.choice([True, False, 0, 42, -7])
+        return text()
+
+    fast = 0
+    for _ in range(3000):
+        document = {text() or "k": value() for _ in range(rnd.randint(1, 4))}
+        try:
+            rendered = emit(document)
+        except UnsupportedShape:
+            continue
+        assert rendered == ruamel_dump(document), repr(document)
+        fast += 1
+    assert fast > 500
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        {},
+        {"seq": [None]},
+        {"seq": [[1, 2]]},
+        {"seq": [{}]},
+        {"value": 1.5},
+        {1: "int key"},
+        {"": "empty key"},
+        {"k" * 128: "long key"},
+        {"multi\nline": "key"},
+        {"long": "x" * 80},
+    ],
+)
+def test_unsupported_shapes_are_declined(document):
+    with pytest.raises(UnsupportedShape):
+        emit(document)
+
+
+def _pipeline():
+    pipeline = Pipeline(name="CI")
+
+    class Job:
+        def __init__(self, name, steps, depends_on=None):
+            self.name = name
+            self.steps = steps
+            self.runner_image = None
+            self.depends_on = depends_on
+
+    pipeline.add_job(Job("build", [CheckoutStep(), RunShellStep(command="make build")]))
+    pipeline.add_job(Job("test", [RunShellStep(command="pytest -v")], depends_on=["build"]))
+    return pipeline
+
+
+def test_transpiler_uses_fast_path_for_typical_workflows(monkeypatch):
+    pipeline = _pipeline()
+    expected = ruamel_dump(GitHubTranspiler(pipeline).to_dict())
+
+    def fail():
+        raise AssertionError("ruamel fallback used")
+
+    monkeypatch.setattr(github, "_ruamel", fail)
+    assert GitHubTranspiler(pipeline).to_yaml() == expected
+
+
+def test_transpiler_falls_back_to_ruamel(monkeypatch):
+    pipeline = _pipeline()
+    pipeline.jobs["build"].steps.append(RunShellStep(command="echo " + "long " * 30))
+    expected = ruamel_dump(GitHubTranspiler(pipeline).to_dict())
+
+    calls = []
+    real = yaml_emitter.emit
+
+    def spy(document):
+        try:
+            return real(document)
+        except UnsupportedShape:
+            calls.append(document)
+            raise
+
+    monkeypatch.setattr(yaml_emitter, "emit", spy)
+    assert GitHubTranspiler(pipeline).to_yaml() == expected
+    assert len(calls) == 1